@@ -0,0 +1,154 @@
+import argparse
+import draughts
+import engine_wrapper
+import json
+import logging
+import multiprocessing
+import multiprocessing.util
+import os
+import time
+import yaml
+from draughts.PDN import PDNReader
+from draughts.convert import fen_from_variant, move_from_variant
+from config import check_engine, engine_profile_config
+from rich.logging import RichHandler
+
+logger = logging.getLogger(__name__)
+
+worker_engine_cfg = None
+worker_engines = {}
+
+
+def pdn_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for file_name in sorted(os.listdir(path)):
+                if file_name.lower().endswith((".pdn", ".pgn")):
+                    yield os.path.join(path, file_name)
+        else:
+            yield path
+
+
+def read_positions(paths, done):
+    """Yield every position of every game that doesn't have a result in `done` yet."""
+    for file_name in pdn_files(paths):
+        try:
+            games = PDNReader(filename=file_name).games
+        except Exception:
+            logger.exception(f"Could not read {file_name}:")
+            continue
+        for game_index, game in enumerate(games):
+            variant = game.variant or "standard"
+            fen = game.tags.get("FEN")
+            board = draughts.Game(variant, fen_from_variant(fen, variant=variant) if fen else "startpos")
+            for ply, pdn_move in enumerate(game.moves):
+                key = (file_name, game_index, ply)
+                if key not in done:
+                    yield key, variant, board.copy(), pdn_move
+                try:
+                    move = draughts.Move(board, pdn_move=move_from_variant(pdn_move, variant=variant))
+                    board.push(move.board_move)
+                except Exception:
+                    logger.warning(f"Illegal move {pdn_move} in game {game_index + 1} of {file_name}.")
+                    break
+
+
+def init_worker(engine_cfg):
+    global worker_engine_cfg
+    worker_engine_cfg = engine_cfg
+    logging.getLogger("engine_wrapper").setLevel(logging.WARNING)
+    multiprocessing.util.Finalize(None, quit_engines, exitpriority=10)
+
+
+def quit_engines():
+    for engine in worker_engines.values():
+        engine.quit()
+
+
+def analyse_position(args):
+    key, variant, board, pdn_move, movetime = args
+    engine_variant = engine_wrapper.parse_variant(variant)
+    if engine_variant not in worker_engines:
+        worker_engines[engine_variant] = engine_wrapper.create_engine({"engine": worker_engine_cfg}, engine_variant,
+                                                                      movetime / 1000)
+    engine = worker_engines[engine_variant]
+    result = engine.search_for(board, movetime, False)
+    info = result.info or {}
+    return {"file": key[0], "game": key[1], "ply": key[2], "fen": board.get_li_fen(), "played": pdn_move,
+            "best": result.move.pdn_move if result.move else None, "score": info.get("score"),
+            "depth": info.get("depth"), "pv": info.get("pv")}
+
+
+def read_progress(output_file):
+    done = set()
+    if os.path.exists(output_file):
+        with open(output_file) as output:
+            for line in output:
+                try:
+                    analysis = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                done.add((analysis["file"], analysis["game"], analysis["ply"]))
+    return done
+
+
+def cut_off(output_file):
+    """Whether the last result in `output_file` was cut off when the analysis was stopped."""
+    if not os.path.exists(output_file):
+        return False
+    with open(output_file, "rb") as output:
+        output.seek(0, os.SEEK_END)
+        if output.tell() == 0:
+            return False
+        output.seek(-1, os.SEEK_END)
+        return output.read(1) != b"\n"
+
+
+def analyse(engine_cfg, paths, output_file, workers, movetime):
+    done = read_progress(output_file)
+    if done:
+        logger.info(f"Resuming: {len(done)} positions already analysed.")
+    positions = ((*position, movetime) for position in read_positions(paths, done))
+    count = 0
+    start_time = time.time()
+    last_report = start_time
+    pool = multiprocessing.Pool(workers, initializer=init_worker, initargs=(engine_cfg,))
+    with open(output_file, "a") as output:
+        if cut_off(output_file):
+            # Otherwise the first new result would be appended to the cut off line and be lost.
+            output.write("\n")
+        for analysis in pool.imap_unordered(analyse_position, positions):
+            output.write(json.dumps(analysis) + "\n")
+            output.flush()
+            count += 1
+            if time.time() > last_report + 10:
+                last_report = time.time()
+                logger.info(f"{count} positions analysed, {count / (last_report - start_time):.1f} positions/s")
+    pool.close()
+    pool.join()
+    elapsed = time.time() - start_time
+    logger.info(f"Finished: {count} positions in {elapsed:.0f} s ({count / max(elapsed, 1e-9):.1f} positions/s)")
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyse the positions of PDN games with an engine pool")
+    parser.add_argument("paths", nargs="+", help="PDN files or directories with PDN files (e.g. your pgn_directory).")
+    parser.add_argument("--config", default="./config.yml", help="Configuration file of the engine.")
+    parser.add_argument("--profile", help="Engine profile to use.")
+    parser.add_argument("--output", default="analysis.jsonl", help="File the results are appended to (one JSON per line).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of engines (defaults to one per core).")
+    parser.add_argument("--movetime", type=int, default=1000, help="Search time per position in milliseconds.")
+    parser.add_argument("-v", action="store_true", help="Make output more verbose.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.v else logging.INFO, handlers=[RichHandler()], format="%(message)s")
+    with open(args.config) as stream:
+        config = yaml.safe_load(stream)
+    engine_cfg = engine_profile_config(config["engine"], args.profile)
+    check_engine(engine_cfg, "engine")
+    analyse(engine_cfg, args.paths, args.output, args.workers, args.movetime)
+
+
+if __name__ == "__main__":
+    main()
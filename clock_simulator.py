@@ -0,0 +1,197 @@
+"""
+Play simulated games through the time management of lidraughts-bot to tune `move_overhead`, `move_overhead_inc` and
+`fake_think_time` without playing on lidraughts.
+
+How much of its time the engine uses and how long the bot takes to send a move are replayed from the moves recorded in
+the `stats` database. The network latency, which lidraughts charges to the clock, is drawn from a log-normal
+distribution. The simulation is deterministic: every combination of parameters is played with the same random numbers.
+"""
+
+import argparse
+import draughts
+import draughts.engine
+import importlib
+import itertools
+import json
+import logging
+import math
+import random
+import signal
+import time
+import model
+from game_stats import connect
+
+lidraughts_bot = importlib.import_module("lidraughts-bot")
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE = {"usage": 0.04, "bot_overhead": 50}
+
+
+class SimulatedBoard:
+    def __init__(self, plies):
+        self.move_stack = [None] * plies
+
+    def whose_turn(self):
+        return draughts.WHITE
+
+
+class SimulatedEngine:
+    def __init__(self, usage):
+        self.usage = usage
+        self.search_time = 0
+
+    def search_with_ponder(self, board, wtime, btime, winc, binc, ponder, draw_offered):
+        self.search_time = self.usage * (max(wtime, 0) + max(winc, 0))
+        return draughts.engine.PlayResult(None, None)
+
+
+class LatencyModel:
+    """Log-normal network latency in ms with the given median and 99th percentile."""
+    def __init__(self, median, p99):
+        self.mu = math.log(median)
+        self.sigma = max(math.log(p99 / median) / 2.326, 1e-9)
+
+    def sample(self, rng):
+        return rng.lognormvariate(self.mu, self.sigma)
+
+
+def simulated_game(base, increment):
+    game_info = {"id": "simulate", "speed": "simulated", "clock": {"initial": base, "increment": increment},
+                 "variant": {"name": "Standard"}, "initialFen": "startpos", "white": {"name": "bot"},
+                 "black": {"name": "opponent"},
+                 "state": {"moves": "", "wtime": base, "btime": base, "winc": increment, "binc": increment}}
+    return model.Game(game_info, "bot", "https://lidraughts.org/", 20)
+
+
+def load_samples(database, base, increment):
+    """The recorded engine time usage and bot overhead of every move and the number of moves of every game."""
+    samples = []
+    game_lengths = []
+    if database:
+        connection = connect(database)
+        rows = connection.execute("SELECT moves.clock_before, moves.search_time, moves.latency FROM moves "
+                                  "JOIN games USING (game_id) WHERE games.clock_initial = ? AND games.clock_increment = ?",
+                                  (base, increment)).fetchall()
+        for clock_before, search_time, latency in rows:
+            if clock_before:
+                samples.append({"usage": search_time * 1000 / (clock_before + increment),
+                                "bot_overhead": max(0, (latency - search_time) * 1000)})
+        game_lengths = [plies // 2 for plies, in connection.execute(
+            "SELECT plies FROM games WHERE clock_initial = ? AND clock_increment = ? AND result != 'aborted'",
+            (base, increment)) if plies]
+        connection.close()
+    return samples or [DEFAULT_SAMPLE], game_lengths or [60]
+
+
+def play_game(rng, base, increment, samples, game_lengths, latency, move_overhead, move_overhead_inc, fake_think):
+    """Play one game of the bot against a clock. Returns whether it flagged and the time left in ms."""
+    game = simulated_game(base, increment)
+    config = {"fake_think_time": fake_think}
+    clock = base
+    for move_number in range(1, rng.choice(game_lengths)):
+        sample = rng.choice(samples)
+        network = latency.sample(rng)
+        board = SimulatedBoard(2 * move_number)
+        game.state = {**game.state, "wtime": clock, "btime": clock}
+
+        fake_time = lidraughts_bot.fake_think_time(config, board, game) * 1000
+        engine = SimulatedEngine(sample["usage"])
+        lidraughts_bot.choose_move(engine, board, game, False, time.perf_counter_ns(), move_overhead, move_overhead_inc)
+
+        # The engine keeps searching until the fake think time has passed.
+        clock -= max(fake_time, engine.search_time) + sample["bot_overhead"] + network
+        if clock < 0:
+            return True, 0
+        clock += increment
+    return False, clock
+
+
+def simulate(base, increment, samples, game_lengths, latency, grid, games, seed):
+    results = []
+    for move_overhead, move_overhead_inc, fake_think in grid:
+        rng = random.Random(seed)
+        outcomes = [play_game(rng, base, increment, samples, game_lengths, latency, move_overhead, move_overhead_inc,
+                              fake_think) for _ in range(games)]
+        flags = sum(flagged for flagged, _ in outcomes)
+        results.append({"move_overhead": move_overhead, "move_overhead_inc": move_overhead_inc, "fake_think_time": fake_think,
+                        "flag_probability": flags / games,
+                        "mean_time_left": sum(time_left for _, time_left in outcomes) / games / base})
+    return results
+
+
+def recommend(results, max_flag_probability, fake_think):
+    """The smallest overheads that flag rarely enough, because every ms of overhead is thinking time lost."""
+    safe = [result for result in results
+            if result["flag_probability"] <= max_flag_probability and result["fake_think_time"] == fake_think]
+    if not safe:
+        return None
+    return min(safe, key=lambda result: (result["move_overhead"], result["move_overhead_inc"]))
+
+
+def time_controls(database, requested):
+    if requested:
+        return [(int(float(base) * 1000), int(float(increment) * 1000))
+                for base, increment in (tc.split("+") for tc in requested)]
+    connection = connect(database)
+    rows = connection.execute("SELECT DISTINCT clock_initial, clock_increment FROM games WHERE speed != 'correspondence' "
+                              "ORDER BY clock_initial, clock_increment").fetchall()
+    connection.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate the clock of the bot to tune its time management")
+    parser.add_argument("--database", help="The database in `stats: database` of config.yml with recorded games.")
+    parser.add_argument("--tc", nargs="+", help="Time controls as base seconds+increment seconds (e.g. 60+1). "
+                                                "Defaults to the ones in the database.")
+    parser.add_argument("--games", type=int, default=2000, help="Simulated games per combination of parameters.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random numbers.")
+    parser.add_argument("--latency-median", type=float, default=80, help="Median network latency in ms.")
+    parser.add_argument("--latency-p99", type=float, default=600, help="99th percentile of the network latency in ms.")
+    parser.add_argument("--move-overhead", type=int, nargs="+", default=[0, 250, 500, 1000, 2000, 3000])
+    parser.add_argument("--move-overhead-inc", type=int, nargs="+", default=[0, 50, 100, 200, 400])
+    parser.add_argument("--fake-think-time", choices=["false", "true", "both"], default="false")
+    parser.add_argument("--max-flag-probability", type=float, default=0.01, help="The flag probability to accept.")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    args = parser.parse_args()
+
+    # lidraughts-bot.py replaces the SIGINT handler when it is imported, so Ctrl+C wouldn't stop the simulation.
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    logging.basicConfig(level=logging.WARNING)
+    if not args.tc and not args.database:
+        parser.error("Give --tc or a --database with recorded games.")
+    fake_think_values = {"false": [False], "true": [True], "both": [False, True]}[args.fake_think_time]
+    grid = list(itertools.product(args.move_overhead, args.move_overhead_inc, fake_think_values))
+    latency = LatencyModel(args.latency_median, args.latency_p99)
+
+    report = {}
+    for base, increment in time_controls(args.database, args.tc):
+        samples, game_lengths = load_samples(args.database, base, increment)
+        results = simulate(base, increment, samples, game_lengths, latency, grid, args.games, args.seed)
+        tc = f"{base / 1000:g}+{increment / 1000:g}"
+        report[tc] = {"recorded_moves": len(samples) if samples != [DEFAULT_SAMPLE] else 0, "results": results,
+                      "recommended": {fake_think: recommend(results, args.max_flag_probability, fake_think)
+                                      for fake_think in fake_think_values}}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for tc, tc_report in report.items():
+        print(f"{tc} ({tc_report['recorded_moves']} recorded moves)")
+        print("  move_overhead move_overhead_inc fake_think_time  flag probability  mean time left")
+        for result in tc_report["results"]:
+            print(f"  {result['move_overhead']:13} {result['move_overhead_inc']:17} {str(result['fake_think_time']):>15}"
+                  f"  {result['flag_probability']:16.2%}  {result['mean_time_left']:14.1%}")
+        for fake_think, best in tc_report["recommended"].items():
+            if best is None:
+                print(f"  No combination with fake_think_time {fake_think} flags in less than "
+                      f"{args.max_flag_probability:.1%} of the games.")
+            else:
+                print(f"  Recommended with fake_think_time {fake_think}: move_overhead {best['move_overhead']}, "
+                      f"move_overhead_inc {best['move_overhead_inc']} ({best['flag_probability']:.2%} flags)")
+
+
+if __name__ == "__main__":
+    main()
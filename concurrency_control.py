@@ -0,0 +1,129 @@
+import json
+import logging
+import os
+import statistics
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def move_metrics(game_id, info, search_time, latency, threads):
+    """The event a game sends to the controller after every move of the bot."""
+    return {"type": "move_metrics", "game_id": game_id, "nps": info.get("nps"), "threads": threads,
+            "search_time": search_time, "latency": latency}
+
+
+def load_per_core():
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        # Windows has no load average.
+        return None
+
+
+class ConcurrencyController:
+    """
+    Changes the number of games played at the same time, between `min_games` and `challenge: concurrency`, with the load
+    of the computer.
+
+    Every `interval` seconds the load average, the nps of the engines compared with their nps when only one game is
+    played, and the time the bot needs besides the search to send a move are checked. One bad check lowers the limit,
+    `raise_after` good checks in a row raise it.
+    """
+    def __init__(self, config, max_games):
+        self.enabled = config.get("enabled", False)
+        self.max_games = max_games
+        self.min_games = min(config.get("min_games", 1), max_games)
+        self.interval = config.get("interval", 60)
+        self.max_load = config.get("max_load", 1.0)
+        self.min_nps_ratio = config.get("min_nps_ratio", 0.7)
+        self.max_overhead = config.get("max_overhead", 0.5)
+        self.raise_after = config.get("raise_after", 3)
+        self.metrics_file = config.get("metrics_file")
+        self.baseline_nps = config.get("baseline_nps")
+        self.baseline_samples = []
+        self.samples = []
+        self.good_checks = 0
+        self.limit = max_games if not self.enabled else config.get("start_games", max_games)
+        self.limit = max(self.min_games, min(self.limit, max_games))
+
+    def record(self, metrics, games):
+        if not self.enabled:
+            return
+        nps = metrics.get("nps")
+        if nps:
+            # An engine with more threads has more nps, so the nps per thread is compared.
+            nps_per_thread = float(nps) / (metrics.get("threads") or 1)
+            metrics = {**metrics, "nps_per_thread": nps_per_thread}
+            if games == 1 and not self.baseline_nps:
+                # The calibration: the speed of the engine when it has the computer to itself.
+                self.baseline_samples = (self.baseline_samples + [nps_per_thread])[-100:]
+        self.samples.append(metrics)
+
+    def baseline(self):
+        if self.baseline_nps:
+            return self.baseline_nps
+        return statistics.median(self.baseline_samples) if len(self.baseline_samples) >= 5 else None
+
+    def measure(self):
+        nps = [sample["nps_per_thread"] for sample in self.samples if "nps_per_thread" in sample]
+        overheads = sorted(max(0, sample["latency"] - sample["search_time"]) for sample in self.samples)
+        baseline = self.baseline()
+        self.samples = []
+        return {"load_per_core": load_per_core(),
+                "nps_ratio": statistics.median(nps) / baseline if nps and baseline else None,
+                "p90_overhead": overheads[int(0.9 * (len(overheads) - 1))] if overheads else None}
+
+    def problems(self, signals):
+        problems = []
+        if signals["load_per_core"] is not None and signals["load_per_core"] > self.max_load:
+            problems.append(f"load average {signals['load_per_core']:.2f} per core")
+        if signals["nps_ratio"] is not None and signals["nps_ratio"] < self.min_nps_ratio:
+            problems.append(f"engines search at {signals['nps_ratio']:.0%} of their speed")
+        if signals["p90_overhead"] is not None and signals["p90_overhead"] > self.max_overhead:
+            problems.append(f"sending a move takes {signals['p90_overhead']:.2f} s besides the search")
+        return problems
+
+    def has_room(self, signals):
+        # Only raise the limit while well below every threshold, so it doesn't go up and down all the time.
+        return ((signals["load_per_core"] is None or signals["load_per_core"] < 0.7 * self.max_load)
+                and (signals["nps_ratio"] is None or signals["nps_ratio"] > (1 + self.min_nps_ratio) / 2)
+                and (signals["p90_overhead"] is None or signals["p90_overhead"] < self.max_overhead / 2))
+
+    def check(self, games):
+        """Measure the load and change the limit. `games` is the number of games played now."""
+        if not self.enabled:
+            return self.limit
+        signals = self.measure()
+        problems = self.problems(signals)
+        old_limit = self.limit
+        if problems:
+            self.good_checks = 0
+            self.limit = max(self.min_games, min(self.limit, games) - 1)
+        elif self.has_room(signals) and games >= self.limit:
+            self.good_checks += 1
+            if self.good_checks >= self.raise_after:
+                self.good_checks = 0
+                self.limit = min(self.max_games, self.limit + 1)
+        else:
+            self.good_checks = 0
+
+        if self.limit < old_limit:
+            logger.info(f"Playing at most {self.limit} games at the same time instead of {old_limit}: {', '.join(problems)}.")
+        elif self.limit > old_limit:
+            logger.info(f"Playing at most {self.limit} games at the same time instead of {old_limit}.")
+        else:
+            logger.debug(f"Concurrency stays at {self.limit}: {signals}")
+        self.export(signals, games, old_limit, problems)
+        return self.limit
+
+    def export(self, signals, games, old_limit, problems):
+        if not self.metrics_file:
+            return
+        record = {"time": time.time(), "games": games, "old_limit": old_limit, "limit": self.limit,
+                  "baseline_nps": self.baseline(), "problems": problems, **signals}
+        try:
+            with open(self.metrics_file, "a") as metrics_file:
+                metrics_file.write(json.dumps(record) + "\n")
+        except OSError:
+            logger.exception(f"Could not write to {self.metrics_file}:")
@@ -1,5 +1,6 @@
 import yaml
 import os
+import copy
 import os.path
 import logging
 
@@ -38,19 +39,63 @@ def load_config(config_file):
         if CONFIG["token"] == "xxxxxxxxxxxxxxxx":
             raise Exception("Your config.yml has the default Lidraughts API token. This is probably wrong.")
 
-        if not os.path.isdir(CONFIG["engine"]["dir"]):
-            raise Exception(f'Your engine directory `{CONFIG["engine"]["dir"]}` is not a directory.')
+        check_engine(CONFIG["engine"], "engine")
 
-        working_dir = CONFIG["engine"].get("working_dir")
-        if working_dir and not os.path.isdir(working_dir):
-            raise Exception(f"Your engine's working directory `{working_dir}` is not a directory.")
+        profiles = CONFIG["engine"].get("profiles") or {}
+        if not isinstance(profiles, dict):
+            raise Exception("´engine´ subsection `profiles` must be a dictionary with indented keys followed by colons.")
+        for profile_name in profiles:
+            check_engine(engine_profile_config(CONFIG["engine"], profile_name), f"engine profile `{profile_name}`")
+            logger.debug(f"Engine profile `{profile_name}` is valid.")
 
-        engine = os.path.join(CONFIG["engine"]["dir"], CONFIG["engine"]["name"])
+        for rule in CONFIG["engine"].get("routing") or []:
+            if rule.get("profile") not in profiles:
+                raise Exception(f"The engine routing rule {rule} uses the unknown profile `{rule.get('profile')}`.")
 
-        if not os.path.isfile(engine) and CONFIG["engine"]["protocol"] != "homemade":
-            raise Exception(f"The engine {engine} file does not exist.")
+    return CONFIG
 
-        if not os.access(engine, os.X_OK) and CONFIG["engine"]["protocol"] != "homemade":
-            raise Exception(f"The engine {engine} doesn't have execute (x) permission. Try: chmod +x {engine}")
 
-    return CONFIG
+def check_engine(engine_cfg, section_name):
+    protocol = engine_cfg.get("protocol")
+    if protocol == "remote":
+        workers = (engine_cfg.get("remote") or {}).get("workers")
+        if not workers or not all(isinstance(worker, str) and ":" in worker for worker in workers):
+            raise Exception(f"The `remote` subsection of your {section_name} needs a list of `workers` as host:port.")
+        return
+
+    if not os.path.isdir(engine_cfg["dir"]):
+        raise Exception(f'The directory `{engine_cfg["dir"]}` of your {section_name} is not a directory.')
+
+    working_dir = engine_cfg.get("working_dir")
+    if working_dir and not os.path.isdir(working_dir):
+        raise Exception(f"The working directory `{working_dir}` of your {section_name} is not a directory.")
+
+    if protocol not in ["hub", "dxp", "cb", "homemade"]:
+        raise Exception(f"Invalid protocol `{protocol}` in your {section_name}. "
+                        "Expected hub, dxp, cb, homemade, or remote.")
+
+    engine = os.path.join(engine_cfg["dir"], engine_cfg["name"])
+
+    if not os.path.isfile(engine) and protocol != "homemade":
+        raise Exception(f"The engine {engine} file does not exist.")
+
+    if not os.access(engine, os.X_OK) and protocol != "homemade":
+        raise Exception(f"The engine {engine} doesn't have execute (x) permission. Try: chmod +x {engine}")
+
+
+def merge_dicts(base, overrides):
+    merged = copy.deepcopy(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_dicts(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def engine_profile_config(engine_cfg, profile_name):
+    base = {key: value for key, value in engine_cfg.items() if key not in ["profiles", "routing"]}
+    if profile_name is None:
+        return copy.deepcopy(base)
+    profile = (engine_cfg.get("profiles") or {})[profile_name] or {}
+    return merge_dicts(base, profile)
@@ -4,12 +4,12 @@ logger = logging.getLogger(__name__)
 
 
 class Conversation:
-    def __init__(self, game, engine, xhr, version, challenge_queue):
+    def __init__(self, game, engine, xhr, version, challengers):
         self.game = game
         self.engine = engine
         self.xhr = xhr
         self.version = version
-        self.challengers = challenge_queue
+        self.challengers = challengers
 
     command_prefix = "!"
 
@@ -36,8 +36,9 @@ class Conversation:
         elif cmd == "eval":
             self.send_reply(line, "I don't tell that to my opponent, sorry.")
         elif cmd == "queue":
-            if self.challengers:
-                challengers = ", ".join([f"@{challenger.challenger_name}" for challenger in reversed(self.challengers)])
+            challenger_names = self.challengers.get([])
+            if challenger_names:
+                challengers = ", ".join([f"@{challenger_name}" for challenger_name in reversed(challenger_names)])
                 self.send_reply(line, f"Challenge queue: {challengers}")
             else:
                 self.send_reply(line, "No challenges queued.")
@@ -0,0 +1,129 @@
+import draughts
+import draughts.engine
+import engine_wrapper
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CorrespondenceAnalysis:
+    """
+    Keeps analysing the positions of our ongoing correspondence games while no other game is being played.
+
+    When it is our turn, the position itself is analysed. When it is the opponent's turn, the engine guesses their reply
+    and analyses the position after it. The next check-in of the game plays the stored move if the position is the same
+    and it was searched for at least `correspondence.move_time` in one search. Searches don't add up, so each slice
+    searches a position longer than the one before, until a search lasts `move_time`.
+    """
+    def __init__(self, manager, config):
+        correspondence_cfg = config.get("correspondence") or {}
+        self.enabled = correspondence_cfg.get("background_analysis", False)
+        self.slice_time = correspondence_cfg.get("analysis_slice", 30)
+        self.min_time = correspondence_cfg.get("move_time", 60)
+        self.positions = manager.dict() if self.enabled else {}
+        self.results = manager.dict() if self.enabled else {}
+        self.live_games = manager.Event() if self.enabled else None
+
+    def add_position(self, game):
+        if not self.enabled:
+            return
+        moves = game.state["moves"]
+        self.positions[game.id] = {"variant": game.variant_name, "initial_fen": game.initial_fen, "moves": moves,
+                                   "color": game.my_color}
+        game_results = self.results.get(game.id) or {}
+        self.results[game.id] = {key: result for key, result in game_results.items() if key.startswith(moves)}
+
+    def remove(self, game_id):
+        if self.enabled:
+            self.positions.pop(game_id, None)
+            self.results.pop(game_id, None)
+
+    def set_live_games(self, live):
+        if not self.enabled:
+            return
+        if live:
+            self.live_games.set()
+        else:
+            self.live_games.clear()
+
+    def get_move(self, game_id, moves, board, engine):
+        """Get the stored move for the position after `moves`, or None if no search of it was long enough."""
+        result = (self.results.get(game_id) or {}).get(moves) if self.enabled else None
+        if result is None or result["time"] < self.min_time:
+            return None
+        logger.info(f"Playing the move found by background analysis after {result['time']:.0f} s.")
+        move = draughts.Move(board, li_api_move=result["move"])
+        return engine.process_playresult(board, draughts.engine.PlayResult(move, None, result["info"]))
+
+    def run(self, config, logging_queue, game_logging_configurer, logging_level):
+        game_logging_configurer(logging_queue, logging_level)
+        engines = {}
+        try:
+            while True:
+                if self.live_games.is_set() or not self.positions:
+                    time.sleep(1)
+                    continue
+                for game_id, position in list(self.positions.items()):
+                    if self.live_games.is_set():
+                        break
+                    self.analyse(engines, config, game_id, position)
+        finally:
+            for engine in engines.values():
+                engine.quit()
+
+    def search(self, engine, board, search_time):
+        # Stop the search as soon as a live game needs the CPU.
+        searching = threading.Event()
+        searching.set()
+
+        def stop_when_needed():
+            while searching.is_set():
+                if self.live_games.wait(0.1):
+                    engine.stop()
+                    break
+        watcher = threading.Thread(target=stop_when_needed)
+        watcher.start()
+        try:
+            return engine.search_for(board, search_time * 1000, False)
+        finally:
+            searching.clear()
+            watcher.join()
+
+    def analyse(self, engines, config, game_id, position):
+        variant = engine_wrapper.parse_variant(position["variant"])
+        if variant not in engines:
+            engines[variant] = engine_wrapper.create_engine(config, variant, self.slice_time, "correspondence")
+        engine = engines[variant]
+
+        board = draughts.Game(position["variant"].lower(), position["initial_fen"])
+        moves = position["moves"].split()
+        for move in moves:
+            board.push_str_move(move)
+        if board.is_over():
+            return
+
+        our_turn = (board.whose_turn() == draughts.WHITE) == (position["color"] == "white")
+        if not our_turn:
+            reply = self.search(engine, board, self.slice_time / 4)
+            if reply.move is None or self.live_games.is_set():
+                return
+            moves += reply.move.li_api_move
+            for move in reply.move.li_api_move:
+                board.push_str_move(move)
+            if board.is_over():
+                return
+
+        key = " ".join(moves)
+        game_results = self.results.get(game_id) or {}
+        previous = game_results.get(key) or {"time": 0}
+        search_time = min(previous["time"] + self.slice_time, max(self.min_time, self.slice_time))
+        result = self.search(engine, board, search_time)
+        if result.move is None or self.live_games.is_set():
+            return
+        # The search wasn't stopped, so it is at least as long as the stored one and replaces it.
+        info = result.info or {}
+        game_results[key] = {"move": result.move.li_api_move, "info": info, "time": search_time}
+        self.results[game_id] = game_results
+        logger.debug(f"Background analysis of {game_id} after {key.split()[-1:]}: {info} ({search_time:.0f} s)")
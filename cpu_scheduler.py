@@ -0,0 +1,97 @@
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CpuScheduler:
+    """
+    Shares a budget of engine threads between the games played at the same time.
+
+    Every game process reports whether it is its turn and how much time is left on its clock.
+    The engines that have to move get the spare threads, the one with the least time left first.
+    Engines waiting for their opponent keep one thread and may only ponder while there are free cores.
+    Engines playing much weaker opponents (low priority) keep one thread.
+    """
+    def __init__(self, shared_state, config):
+        self.state = shared_state
+        self.enabled = config.get("enabled", False)
+        self.total_threads = config.get("threads") or os.cpu_count() or 1
+        self.max_threads = config.get("max_threads_per_engine") or self.total_threads
+
+    def register(self, game_id, low_priority=False):
+        if self.enabled:
+            self.state[game_id] = {"to_move": False, "clock": 0, "threads": 1, "search_time": 0.0,
+                                   "start_time": time.time(), "low_priority": low_priority}
+
+    def unregister(self, game_id):
+        if self.enabled:
+            self.state.pop(game_id, None)
+
+    def update(self, game_id, to_move, clock):
+        if not self.enabled or game_id not in self.state:
+            return
+        entry = self.state[game_id]
+        entry["to_move"] = to_move
+        entry["clock"] = clock
+        self.state[game_id] = entry
+
+    def record_search(self, game_id, seconds):
+        if not self.enabled or game_id not in self.state:
+            return
+        entry = self.state[game_id]
+        entry["search_time"] += seconds
+        self.state[game_id] = entry
+
+    def allocations(self):
+        entries = dict(self.state)
+        threads = {game_id: 1 for game_id in entries}
+        ponder = {game_id: False for game_id in entries}
+        movers = sorted((game_id for game_id, entry in entries.items() if entry["to_move"]),
+                        key=lambda game_id: entries[game_id]["clock"])
+        waiters = sorted((game_id for game_id, entry in entries.items() if not entry["to_move"]),
+                         key=lambda game_id: entries[game_id]["clock"])
+
+        growing = [game_id for game_id in movers if not entries[game_id].get("low_priority")]
+        spare = self.total_threads - len(entries)
+        while spare > 0 and any(threads[game_id] < self.max_threads for game_id in growing):
+            for game_id in growing:
+                if spare > 0 and threads[game_id] < self.max_threads:
+                    threads[game_id] += 1
+                    spare -= 1
+
+        free_cores = self.total_threads - sum(threads[game_id] for game_id in movers)
+        for game_id in waiters:
+            if free_cores > 0:
+                ponder[game_id] = True
+                free_cores -= 1
+        return threads, ponder
+
+    def allocation(self, game_id):
+        """Get the number of threads and whether pondering is allowed for the engine of a game."""
+        if not self.enabled or game_id not in self.state:
+            return None, True
+        threads, ponder = self.allocations()
+        entry = self.state[game_id]
+        entry["threads"] = threads[game_id]
+        self.state[game_id] = entry
+        return threads[game_id], ponder[game_id]
+
+    def utilization(self, game_id):
+        entry = self.state.get(game_id) if self.enabled else None
+        if not entry:
+            return None
+        elapsed = time.time() - entry["start_time"]
+        return entry["search_time"] / elapsed if elapsed > 0 else 0.0
+
+    def log_utilization(self):
+        if not self.enabled:
+            return
+        for game_id in list(self.state.keys()):
+            entry = self.state.get(game_id)
+            utilization = self.utilization(game_id)
+            if entry is None or utilization is None:
+                continue
+            logger.info(f"Engine of {game_id}: {entry['threads']} threads, {utilization:.0%} busy, "
+                        f"{'to move' if entry['to_move'] else 'waiting'}")
@@ -1,20 +1,55 @@
 import os
 import draughts
 import draughts.engine
+import json
 import subprocess
+import sys
+import threading
+import time
 import logging
 from enum import Enum
+from config import engine_profile_config
+from process_limits import limit_engine_process
 
 logger = logging.getLogger(__name__)
 
 
-def create_engine(config, variant, initial_time):
-    cfg = config["engine"]
+def parse_variant(variant):
+    variant = variant.lower()
+
+    if variant in ["standard", "from position"]:
+        return "normal"
+    elif variant == "breakthrough":
+        return "bt"
+    elif variant == "antidraughts":
+        return "losing"
+    elif variant == "frysk!":
+        return "frisian"
+    else:
+        return variant
+
+
+def select_engine_profile(config, variant, speed):
+    for rule in config["engine"].get("routing") or []:
+        variants = rule.get("variants")
+        speeds = rule.get("speeds")
+        if (variants is None or variant in variants) and (speeds is None or speed in speeds):
+            return rule["profile"]
+    return None
+
+
+def create_engine(config, variant, initial_time, speed=None, cores=None):
+    profile_name = select_engine_profile(config, variant, speed)
+    cfg = engine_profile_config(config["engine"], profile_name)
     engine_path = os.path.join(cfg["dir"], cfg["name"])
     engine_working_dir = cfg.get("working_dir") or os.getcwd()
     engine_type = cfg.get("protocol")
     engine_options = cfg.get("engine_options")
     draw_or_resign = cfg.get("draw_or_resign") or {}
+    if engine_type == "remote":
+        import remote_engine
+        logger.info(f"Engine profile for {variant} {speed}: {profile_name or 'default'} (remote)")
+        return remote_engine.RemoteEngine(cfg.get("remote") or {}, variant, initial_time, speed, {}, draw_or_resign)
     commands = [engine_path, cfg["engine_argument"]]
     if engine_options:
         for k, v in engine_options.items():
@@ -30,14 +65,28 @@ def create_engine(config, variant, initial_time):
         Engine = CBEngine
     elif engine_type == "homemade":
         Engine = getHomemadeEngine(cfg["name"])
+        if cfg.get("homemade_process", False):
+            import homemade_hub
+            Engine = HubEngine
+            commands = homemade_hub.hub_command(cfg["name"])
     else:
         raise ValueError(
             f"    Invalid engine type: {engine_type}. Expected hub, dxp, cb, or homemade.")
     options = cfg.get(f"{engine_type}_options") or {}
+    if engine_type in ["dxp", "cb"]:
+        options["deadline"] = cfg.get("deadline") or {}
+    transcript_dir = cfg.get("transcript_dir")
+    if transcript_dir and engine_type in ["hub", "dxp"]:
+        os.makedirs(transcript_dir, exist_ok=True)
+        options["transcript"] = os.path.join(transcript_dir, f"{engine_type}-{time.strftime('%Y%m%d-%H%M%S')}-"
+                                                             f"{os.getpid()}-{threading.get_ident()}.jsonl")
     options["variant"] = variant
     options["initial-time"] = initial_time
+    logger.info(f"Engine profile for {variant} {speed}: {profile_name or 'default'} ({cfg['name']}, {options})")
     logger.debug(f"Starting engine: {' '.join(commands)}")
-    return Engine(commands, options, stderr, draw_or_resign, cwd=engine_working_dir)
+    engine = Engine(commands, options, stderr, draw_or_resign, cwd=engine_working_dir)
+    limit_engine_process(engine, cfg.get("limits") or {}, cores)
+    return engine
 
 
 class Termination(str, Enum):
@@ -82,7 +131,63 @@ PONDERPV_CHARACTERS = 12  # the length of ", ponderpv: "
 MAX_CHAT_MESSAGE_LEN = 140  # maximum characters in a chat message
 
 
+class Transcript:
+    """Writes every line exchanged with an engine to a JSON lines file, with the time since the engine was started."""
+    def __init__(self, filename):
+        self.file = open(filename, "w")
+        self.start_time = time.monotonic()
+        self.lock = threading.Lock()
+        logger.info(f"Recording the engine protocol to {filename}")
+
+    def write(self, direction, line):
+        with self.lock:
+            if self.file.closed:
+                return
+            self.file.write(json.dumps({"time": round(time.monotonic() - self.start_time, 6), "direction": direction,
+                                        "line": line}) + "\n")
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+class RecordingHubEngine(draughts.engine.HubEngine):
+    def __init__(self, command, transcript, **popen_args):
+        self.transcript = transcript
+        super().__init__(command, **popen_args)
+
+    def send(self, line):
+        self.transcript.write("send", line)
+        super().send(line)
+
+    def recv(self):
+        line = super().recv()
+        self.transcript.write("receive", line)
+        return line
+
+
+def record_dxp(transcript):
+    """Record the messages of the DXP connection. pydraughts has one connection per process."""
+    sock = sys.modules["draughts.engines.dxp_communication.dxp_run"].mySock
+    send = sock.send
+    receive = sock.receive
+
+    def recorded_send(message):
+        transcript.write("send", message)
+        return send(message)
+
+    def recorded_receive():
+        message = receive()
+        transcript.write("receive", message)
+        return message
+    sock.send = recorded_send
+    sock.receive = recorded_receive
+
+
 class EngineWrapper:
+    can_search_again = True
+
     def __init__(self, options, draw_or_resign):
         self.scores = []
         self.draw_or_resign = draw_or_resign
@@ -161,6 +266,18 @@ class EngineWrapper:
     def search(self, board, time_limit, ponder, draw_offered):
         pass
 
+    def search_longer(self, board, movetime, draw_offered, result):
+        """Search the same position again and use the new result instead of `result`, the last one found."""
+        entries = len(self.move_commentary)
+        new_result = self.search_for(board, movetime, draw_offered)
+        if new_result.move is None:
+            return result
+        if len(self.move_commentary) > entries:
+            # Homemade engines that return a bare PlayResult don't add an entry for either search.
+            del self.move_commentary[-2]
+            del self.scores[-2]
+        return new_result
+
     def process_playresult(self, board, result):
         self.last_move_info = result.info.copy()
         self.move_commentary.append(self.last_move_info.copy())
@@ -202,8 +319,9 @@ class EngineWrapper:
         if for_chat:
             bot_stats = [f"{stat}: {info[stat]}" for stat in stats if stat in info and stat != "ponderpv"]
             len_bot_stats = len(", ".join(bot_stats)) + PONDERPV_CHARACTERS
-            ponder_pv = info["ponderpv"]
-            ponder_pv = ponder_pv.split()
+            ponder_pv = info.get("ponderpv", [])
+            if isinstance(ponder_pv, str):
+                ponder_pv = ponder_pv.split()
             try:
                 while len(" ".join(ponder_pv)) + len_bot_stats > MAX_CHAT_MESSAGE_LEN:
                     ponder_pv.pop()
@@ -232,14 +350,27 @@ class EngineWrapper:
     def kill_process(self):
         self.engine.kill_process()
 
+    def process_id(self):
+        process = getattr(self.engine, "p", None)
+        return process.pid if process else None
+
     def ponderhit(self):
         pass
 
+    def set_threads(self, threads):
+        pass
+
 
 class HubEngine(EngineWrapper):
     def __init__(self, commands, options, stderr, draw_or_resign, **popen_args):
         super().__init__(options, draw_or_resign)
-        self.engine = draughts.engine.HubEngine(commands, **popen_args)
+        transcript = options.pop("transcript", None)
+        if transcript:
+            self.transcript = Transcript(transcript)
+            self.engine = RecordingHubEngine(commands, self.transcript, **popen_args)
+        else:
+            self.transcript = None
+            self.engine = draughts.engine.HubEngine(commands, **popen_args)
 
         if "bb-size" in options and options["bb-size"] == "auto":
             if "variant" in options and options["variant"] != "normal":
@@ -258,6 +389,7 @@ class HubEngine(EngineWrapper):
 
         self.engine.configure(options)
         self.engine.init()
+        self.threads = options.get("threads")
 
     def search(self, board, time_limit, ponder, draw_offered):
         time_limit = self.add_go_commands(time_limit)
@@ -269,39 +401,250 @@ class HubEngine(EngineWrapper):
 
     def quit(self):
         self.engine.quit()
+        if self.transcript is not None:
+            self.transcript.close()
 
     def ponderhit(self):
         self.engine.ponderhit()
 
+    def set_threads(self, threads):
+        if threads is None or threads == self.threads or "threads" not in self.engine.options:
+            return
+        logger.debug(f"Setting engine threads from {self.threads} to {threads}")
+        self.engine.setoption("threads", threads)
+        self.threads = threads
+
+
+def captured_pieces(board):
+    """The most pieces the side to move can capture."""
+    return max(sum(square is not None for square in captures) for captures in board.legal_moves()[1])
+
+
+def fallback_move(board):
+    """A move found without an engine: the one that lets the opponent capture the fewest pieces."""
+    def pieces_lost(board_move):
+        next_board = board.copy()
+        next_board.push(board_move)
+        return 0 if next_board.is_over() else captured_pieces(next_board)
+    return draughts.Move(board, board_move=min(board.legal_moves()[0], key=pieces_lost))
+
+
+def position_key(board):
+    return f"{board.variant} {board.get_li_fen()}"
+
+
+def clock_budget(time_limit, moves_to_go, max_fraction):
+    """The time in seconds to search a move for, or None if `time_limit` has no time."""
+    if time_limit.movetime is not None:
+        return time_limit.movetime
+    if time_limit.time is None:
+        return None
+    inc = max(time_limit.inc or 0, 0)
+    remaining = max(time_limit.time, 0)
+    return min(remaining / moves_to_go + inc * 0.8, remaining * max_fraction)
+
+
+class DeadlineEngine(EngineWrapper):
+    """
+    An engine that can't be stopped, so every search gets a deadline calculated from the clock.
+
+    When the engine misses the deadline, its search is abandoned and a fallback move is played.
+    """
+    def __init__(self, options, draw_or_resign):
+        super().__init__(options, draw_or_resign)
+        deadline_cfg = options.pop("deadline", {}) or {}
+        self.moves_to_go = deadline_cfg.get("moves_to_go", 30)
+        self.grace = deadline_cfg.get("grace", 2)
+        self.max_fraction = deadline_cfg.get("max_fraction", 0.5)
+        self.search_thread = None
+        self.searches = 0
+        self.overruns = 0
+        self.searching_again = False
+
+    def move_budget(self, time_limit):
+        """The time in seconds the engine should use and the time after which its search is abandoned."""
+        budget = clock_budget(time_limit, self.moves_to_go, self.max_fraction)
+        if budget is None:
+            return None, None
+        if time_limit.movetime is not None:
+            return budget, budget * self.grace
+        inc = max(time_limit.inc or 0, 0)
+        remaining = max(time_limit.time, 0)
+        return budget, min(budget * self.grace, remaining * self.max_fraction + inc * 0.5)
+
+    def wait_for_engine(self, deadline):
+        """Wait until an earlier search is done. Returns False if it isn't done before the deadline."""
+        if self.search_thread is not None:
+            self.search_thread.join(max(0, deadline - time.monotonic()))
+            if self.search_thread.is_alive():
+                return False
+            self.search_thread = None
+        return True
+
+    def play_before(self, deadline, search):
+        """Run `search` in a thread and return its result, or None if it takes longer than the deadline."""
+        result = {}
+
+        def run_search():
+            try:
+                result["move"] = search()
+            except Exception as err:
+                result["error"] = err
+        self.search_thread = threading.Thread(target=run_search)
+        self.search_thread.start()
+        if not self.wait_for_engine(deadline):
+            return None
+        if "error" in result:
+            raise result["error"]
+        return result["move"]
+
+    def search_with_deadline(self, board, time_limit, search):
+        legal_moves = board.legal_moves()[0]
+        if len(legal_moves) == 1:
+            return self.process_playresult(board, draughts.engine.PlayResult(draughts.Move(board, board_move=legal_moves[0]),
+                                                                             None, {}))
+        self.searches += 1
+        start_time = time.monotonic()
+        budget, allowed_time = self.move_budget(time_limit)
+        deadline = start_time + allowed_time if allowed_time is not None else float("inf")
+        result = None
+        if self.wait_for_engine(deadline):
+            if budget is not None:
+                # Waiting for an earlier search took some of the time.
+                budget = min(budget, (deadline - time.monotonic()) / self.grace)
+            result = self.play_before(deadline, lambda: search(budget))
+        if (result is None or result.move is None) and self.searching_again:
+            # The move found before is better than a fallback move.
+            logger.info(f"The engine didn't search again within {allowed_time or 0:.2f} s. Keeping the move found before.")
+            self.search_abandoned()
+            return draughts.engine.PlayResult(None, None)
+        if result is None or result.move is None:
+            self.overruns += 1
+            logger.warning(f"The engine didn't move within {allowed_time or 0:.2f} s (budget {budget or 0:.2f} s). "
+                           "Playing a fallback move. "
+                           f"Deadline overruns: {self.overruns} of {self.searches} searches.")
+            self.search_abandoned()
+            result = draughts.engine.PlayResult(fallback_move(board), None, {})
+        else:
+            logger.debug(f"The engine used {time.monotonic() - start_time:.2f} s of its {budget} s budget.")
+        return self.process_playresult(board, result)
+
+    def search_abandoned(self):
+        pass
+
+    def search_longer(self, board, movetime, draw_offered, result):
+        self.searching_again = True
+        try:
+            return super().search_longer(board, movetime, draw_offered, result)
+        finally:
+            self.searching_again = False
+
+    def quit(self):
+        if self.searches:
+            logger.info(f"Deadline overruns: {self.overruns} of {self.searches} searches.")
+
+
+class DXPEngine(DeadlineEngine):
+    # The engine keeps its own game, so it can't search the same position twice.
+    can_search_again = False
 
-class DXPEngine(EngineWrapper):
     def __init__(self, commands, options, stderr, draw_or_resign, **popen_args):
         super().__init__(options, draw_or_resign)
+        transcript = options.pop("transcript", None)
         self.engine = draughts.engine.DXPEngine(commands, options=options, **popen_args)
+        self.transcript = None
+        if transcript:
+            self.transcript = Transcript(transcript)
+            record_dxp(self.transcript)
+        self.restart_game = False
 
     def search(self, board, time_limit, ponder, draw_offered):
         if ponder:
             return draughts.engine.PlayResult(None, None)
         time_limit = self.add_go_commands(time_limit)
-        result = self.engine.play(board)
-        return self.process_playresult(board, result)
+
+        def search(budget):
+            # DXP engines keep their own clock, so the budget can't be sent to them.
+            if self.restart_game:
+                # The engine's game no longer matches ours, so it starts a new one from the current position.
+                self.engine.quit()
+                self.engine.game_started = False
+                self.restart_game = False
+                engine_board = draughts.Game(board.variant, board.get_li_fen())
+                result = self.engine.play(engine_board)
+                if result.move is not None:
+                    result.move = draughts.Move(board, board_move=result.move.board_move)
+                return result
+            return self.engine.play(board)
+        return self.search_with_deadline(board, time_limit, search)
+
+    def search_abandoned(self):
+        self.restart_game = True
 
     def quit(self):
+        super().quit()
         self.engine.quit()
+        if self.transcript is not None:
+            self.transcript.close()
 
 
-class CBEngine(EngineWrapper):
+class CBEngine(DeadlineEngine):
     def __init__(self, commands, options, stderr, draw_or_resign, **popen_args):
         super().__init__(options, draw_or_resign)
+        self.emulate_ponder = options.pop("emulate-ponder", False)
         self.engine = draughts.engine.CheckerBoardEngine(commands)
         self.engine.configure(options)
+        self.ponder_result = {}
+        self.ponder_hits = 0
+        self.ponder_searches = 0
 
     def search(self, board, time_limit, ponder, draw_offered):
         if ponder:
             return draughts.engine.PlayResult(None, None)
         time_limit = self.add_go_commands(time_limit)
-        result = self.engine.play(board, time_limit)
-        return self.process_playresult(board, result)
+        if time_limit.depth is not None or time_limit.nodes is not None:
+            result = self.engine.play(board, time_limit)
+            return self.process_playresult(board, result)
+
+        def search(budget):
+            if self.ponder_result.get("key") == position_key(board):
+                self.ponder_hits += 1
+                logger.info(f"Emulated ponder hit ({self.ponder_hits} of {self.ponder_searches}).")
+                return self.ponder_result["result"]
+            return self.engine.play(board, draughts.engine.Limit(movetime=budget))
+        result = self.search_with_deadline(board, time_limit, search)
+        if self.emulate_ponder and result.move is not None:
+            self.start_pondering(board, result.move, self.move_budget(time_limit)[0])
+        return result
+
+    def start_pondering(self, board, move, budget):
+        # CheckerBoard engines get the whole position every time, so the expected reply of the opponent and our answer
+        # to it can be searched while the opponent thinks. Both searches are short because they can't be stopped.
+        self.ponder_result = {}
+        if budget is None or not self.wait_for_engine(time.monotonic()):
+            return
+        ponder_board = board.copy()
+        ponder_board.push(move.board_move)
+        if ponder_board.is_over():
+            return
+        self.ponder_searches += 1
+
+        def ponder():
+            reply = self.engine.play(ponder_board, draughts.engine.Limit(movetime=budget / 4))
+            if reply.move is None:
+                return
+            ponder_board.push(reply.move.board_move)
+            if ponder_board.is_over():
+                return
+            result = self.engine.play(ponder_board, draughts.engine.Limit(movetime=budget))
+            self.ponder_result = {"key": position_key(ponder_board), "result": result}
+        self.search_thread = threading.Thread(target=ponder)
+        self.search_thread.start()
+
+    def quit(self):
+        super().quit()
+        if self.ponder_searches:
+            logger.info(f"Emulated ponder hits: {self.ponder_hits} of {self.ponder_searches}.")
 
 
 def getHomemadeEngine(name):
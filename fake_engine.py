@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+A fake Hub engine, to test and benchmark the bot without a real engine.
+
+It answers every search after a fixed think time with a move chosen at random, but always the same one for the same
+position and seed. With `--transcripts`, it replays the answers of a real engine recorded with `transcript_dir`: when
+the bot sends a position that is in a transcript, the recorded lines are sent again, with their recorded timing.
+
+Use it like any other Hub engine, e.g. with `dir: "./"`, `name: "fake_engine.py"` and
+  engine_options:
+    think-time: 200
+    transcripts: "transcripts/"
+"""
+
+import argparse
+import draughts
+import draughts.engine
+import glob
+import json
+import logging
+import os
+import random
+import sys
+import threading
+from engine_wrapper import clock_budget
+from homemade_hub import HubServer
+from strategies import MinimalEngine
+
+logger = logging.getLogger(__name__)
+
+
+class FakeEngine(MinimalEngine):
+    """Thinks for `think_time` seconds (less if the clock or movetime is shorter) and plays a deterministic move."""
+    think_time = 0.1
+    seed = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stop_event = threading.Event()
+        self.ponderhit_event = threading.Event()
+
+    def search(self, board, time_limit, ponder, draw_offered):
+        if not ponder:
+            # Left over from an earlier search, like in IterativeDeepeningEngine.
+            self.stop_event.clear()
+            self.ponderhit_event.clear()
+        time_limit = self.add_go_commands(time_limit)
+        think_time = self.think_time
+        budget = clock_budget(time_limit, 30, 0.5)
+        if budget is not None:
+            think_time = min(think_time, budget)
+        try:
+            if ponder:
+                while not self.ponderhit_event.is_set() and not self.stop_event.wait(0.01):
+                    pass
+            self.stop_event.wait(think_time)
+        finally:
+            self.stop_event.clear()
+            self.ponderhit_event.clear()
+
+        board_moves = sorted(board.legal_moves()[0])
+        board_move = random.Random(f"{self.seed} {board.get_li_fen()}").choice(board_moves)
+        move = draughts.Move(board, board_move=board_move)
+        info = {"depth": 1, "nodes": len(board_moves), "score": {"cp": 0}, "pv": f'"{move.hub_move}"'}
+        return self.process_playresult(board, draughts.engine.PlayResult(move, None, info))
+
+    def stop(self):
+        self.stop_event.set()
+
+    def ponderhit(self):
+        self.ponderhit_event.set()
+
+
+def load_transcripts(filenames):
+    """The recorded answers to every command, and to every search by its position, with their delays."""
+    replies = {}
+    searches = {}
+    for filename in filenames:
+        with open(filename) as transcript_file:
+            lines = [json.loads(line) for line in transcript_file if line.strip()]
+        position = None
+        key = None
+        sent_time = 0
+        for entry in lines:
+            if entry["direction"] == "send":
+                line = entry["line"]
+                if line.startswith("pos "):
+                    position = line
+                if line.startswith("go "):
+                    key = (position, line)
+                    searches[key] = []
+                    sent_time = entry["time"]
+                elif line == "hub":
+                    key = line
+                    replies[key] = []
+                    sent_time = entry["time"]
+                elif line not in ["stop", "ponder-hit"]:
+                    # A search ends with its done line, even after a stop.
+                    key = None
+            elif key is not None:
+                answers = searches[key] if isinstance(key, tuple) else replies[key]
+                answers.append((entry["time"] - sent_time, entry["line"]))
+    # The bot would wait forever for a search that was cut off.
+    searches = {key: answers for key, answers in searches.items()
+                if any(line.startswith("done") for _, line in answers)}
+    return replies, searches
+
+
+def transcript_files(paths):
+    filenames = []
+    for path in paths:
+        filenames += sorted(glob.glob(os.path.join(path, "*.jsonl"))) if os.path.isdir(path) else [path]
+    return filenames
+
+
+class ReplayHubServer(HubServer):
+    def __init__(self, engine_name, transcripts, output=sys.stdout):
+        super().__init__(engine_name, output, FakeEngine)
+        self.replies, self.searches = load_transcripts(transcripts)
+        self.position = None
+        self.replay_stop = threading.Event()
+        logger.info(f"Loaded {len(self.searches)} searches from {len(transcripts)} transcripts.")
+
+    def replay(self, answers):
+        # After a stop, the rest of the answers are sent at once.
+        sent_time = 0
+        for delay, line in answers:
+            self.replay_stop.wait(max(0, delay - sent_time))
+            sent_time = delay
+            self.send(line)
+
+    def handle(self, line):
+        command = line.strip()
+        if command.startswith("pos "):
+            self.position = command
+        if command == "hub" and command in self.replies:
+            for _, reply in self.replies[command]:
+                self.send(reply)
+            return True
+        if command.startswith("go ") and (self.position, command) in self.searches:
+            self.start_engine()
+            self.wait_for_search()
+            self.replay_stop.clear()
+            self.search_thread = threading.Thread(target=self.replay, args=(self.searches[(self.position, command)],),
+                                                  name="replay")
+            self.search_thread.start()
+            return True
+        if command == "stop" and self.replaying():
+            self.replay_stop.set()
+            return True
+        return super().handle(line)
+
+    def replaying(self):
+        return self.search_thread is not None and self.search_thread.is_alive() and self.search_thread.name == "replay"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="A fake Hub engine")
+    parser.add_argument("protocol", nargs="?", default="hub", help="Only hub is supported.")
+    parser.add_argument("--think-time", type=float, default=100, help="Think time per move in ms.")
+    parser.add_argument("--seed", type=int, default=0, help="Another seed chooses other moves.")
+    parser.add_argument("--transcripts", nargs="*", default=[], help="Transcript files or directories to replay.")
+    parser.add_argument("--name", default="FakeEngine", help="Name of the engine.")
+    parser.add_argument("--log", help="Write the log of the engine to this file.")
+    args = parser.parse_args()
+
+    # The GUI reads stdout and stderr, so only warnings are logged there.
+    logging.basicConfig(level=logging.DEBUG if args.log else logging.WARNING, filename=args.log)
+    FakeEngine.think_time = args.think_time / 1000
+    FakeEngine.seed = args.seed
+    transcripts = transcript_files(args.transcripts)
+    if transcripts:
+        server = ReplayHubServer(args.name, transcripts)
+    else:
+        server = HubServer(args.name, Engine=FakeEngine)
+    server.run(sys.stdin)
+
+
+if __name__ == "__main__":
+    main()
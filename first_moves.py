@@ -0,0 +1,126 @@
+"""
+A table of the first moves of both sides for the start positions the bot plays from, so it doesn't have to search
+in the 30 seconds lidraughts gives for the first move.
+
+Build it once with a long search for every legal move:
+python3 first_moves.py --config config.yml --variants standard frisian --movetime 30000 --output first_moves.json
+"""
+
+import argparse
+import draughts
+import engine_wrapper
+import json
+import logging
+import math
+import os
+import random
+import yaml
+from config import check_engine, engine_profile_config
+from engine_wrapper import position_key
+from rich.logging import RichHandler
+
+logger = logging.getLogger(__name__)
+
+
+def score_cp(score):
+    if not score:
+        return 0
+    if "cp" in score:
+        return score["cp"]
+    win = score.get("win", 0)
+    return 10000 - win if win > 0 else -10000 - win
+
+
+class FirstMoveTable:
+    def __init__(self, filename):
+        self.table = {}
+        if filename and os.path.exists(filename):
+            with open(filename) as table_file:
+                self.table = json.load(table_file)
+            logger.debug(f"Loaded first moves for {len(self.table)} positions from {filename}.")
+
+    def choose(self, board):
+        """A move for the position chosen at random by the weights of the moves, or None if it isn't in the table."""
+        entries = self.table.get(position_key(board))
+        if not entries:
+            return None
+        legal_moves = board.legal_moves()[0]
+        entries = [entry for entry in entries if entry["move"] in legal_moves]
+        if not entries:
+            return None
+        entry = random.choices(entries, weights=[entry["weight"] for entry in entries])[0]
+        return draughts.Move(board, board_move=entry["move"])
+
+
+def evaluate_moves(engine, board, movetime, margin, temperature):
+    """Search the position after every legal move and weigh the moves by their score."""
+    scores = []
+    for board_move in board.legal_moves()[0]:
+        next_board = board.copy()
+        next_board.push(board_move)
+        result = engine.search_for(next_board, movetime, False)
+        score = -score_cp((result.info or {}).get("score"))
+        scores.append((score, board_move))
+        logger.info(f"{draughts.Move(board, board_move=board_move).pdn_move}: {score}")
+    best_score = max(score for score, _ in scores)
+    return [{"move": board_move, "pdn": draughts.Move(board, board_move=board_move).pdn_move, "score": score,
+             "weight": round(math.exp((score - best_score) / temperature), 4)}
+            for score, board_move in sorted(scores, key=lambda scored_move: -scored_move[0])
+            if score >= best_score - margin]
+
+
+def build_table(engine_cfg, positions, movetime, margin, temperature, table):
+    """Add the moves for the start positions and for the replies to every move in them to `table`."""
+    for variant, fen in positions:
+        engine = engine_wrapper.create_engine({"engine": engine_cfg}, engine_wrapper.parse_variant(variant), movetime / 1000)
+        try:
+            board = draughts.Game(variant, fen)
+            logger.info(f"Analysing {variant} {board.get_li_fen()}")
+            entries = evaluate_moves(engine, board, movetime, margin, temperature)
+            table[position_key(board)] = entries
+            for entry in entries:
+                reply_board = board.copy()
+                reply_board.push(entry["move"])
+                if reply_board.is_over():
+                    continue
+                logger.info(f"Analysing the replies to {entry['pdn']}")
+                table[position_key(reply_board)] = evaluate_moves(engine, reply_board, movetime, margin, temperature)
+        finally:
+            engine.quit()
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the table of first moves")
+    parser.add_argument("--config", default="./config.yml", help="Configuration file of the engine.")
+    parser.add_argument("--profile", help="Engine profile to use.")
+    parser.add_argument("--variants", nargs="+", default=["standard"], help="Variants to build the table for.")
+    parser.add_argument("--fens", help="File with one start position (FEN) per line, used for every variant.")
+    parser.add_argument("--movetime", type=int, default=30000, help="Search time per move in milliseconds.")
+    parser.add_argument("--margin", type=int, default=30, help="Leave out moves more than this many cp worse than the best.")
+    parser.add_argument("--temperature", type=float, default=15,
+                        help="A move this many cp worse than the best is played e (2.7) times less often.")
+    parser.add_argument("--output", default="first_moves.json", help="The table is added to this file.")
+    parser.add_argument("-v", action="store_true", help="Make output more verbose.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.v else logging.INFO, handlers=[RichHandler()], format="%(message)s")
+    with open(args.config) as stream:
+        config = yaml.safe_load(stream)
+    engine_cfg = engine_profile_config(config["engine"], args.profile)
+    check_engine(engine_cfg, "engine")
+    fens = ["startpos"]
+    if args.fens:
+        with open(args.fens) as fens_file:
+            fens = [line.strip() for line in fens_file if line.strip() and not line.startswith("#")]
+
+    table = FirstMoveTable(args.output).table
+    positions = [(variant, fen) for variant in args.variants for fen in fens]
+    build_table(engine_cfg, positions, args.movetime, args.margin, args.temperature, table)
+    with open(args.output, "w") as table_file:
+        json.dump(table, table_file, indent=1)
+    logger.info(f"The table has first moves for {len(table)} positions.")
+
+
+if __name__ == "__main__":
+    main()
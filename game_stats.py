@@ -0,0 +1,211 @@
+import argparse
+import json
+import logging
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    game_id TEXT PRIMARY KEY,
+    end_time REAL,
+    opponent TEXT,
+    opponent_rating INTEGER,
+    opponent_title TEXT,
+    color TEXT,
+    variant TEXT,
+    speed TEXT,
+    clock_initial INTEGER,
+    clock_increment INTEGER,
+    result TEXT,
+    status TEXT,
+    plies INTEGER,
+    time_left INTEGER
+);
+CREATE TABLE IF NOT EXISTS moves (
+    game_id TEXT,
+    ply INTEGER,
+    clock_before INTEGER,
+    clock_after INTEGER,
+    search_time REAL,
+    latency REAL,
+    depth INTEGER,
+    nps INTEGER,
+    score TEXT,
+    ponder TEXT,
+    threads INTEGER,
+    concurrency INTEGER,
+    PRIMARY KEY (game_id, ply)
+);
+"""
+
+
+def connect(database):
+    connection = sqlite3.connect(database, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def game_result(game):
+    winner = game.state.get("winner")
+    status = game.state.get("status")
+    if winner:
+        return "win" if winner == game.my_color else "loss"
+    if status == "draw":
+        return "draw"
+    if status == "aborted":
+        return "aborted"
+    return "unfinished"
+
+
+def integer(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class GameStats:
+    """Collects the timing of every move of a game and writes them to an SQLite database when the game ends."""
+    def __init__(self, config, game):
+        self.database = config.get("database")
+        self.enabled = bool(self.database)
+        self.game = game
+        self.moves = []
+
+    def my_clock(self):
+        return self.game.state[f"{self.game.my_color[0]}time"]
+
+    def record_move(self, ply, clock_before, search_time, latency, info, ponder, threads, concurrency):
+        if not self.enabled:
+            return
+        self.moves.append({"game_id": self.game.id, "ply": ply, "clock_before": clock_before, "clock_after": None,
+                           "search_time": search_time, "latency": latency, "depth": integer(info.get("depth")),
+                           "nps": integer(info.get("nps")), "score": json.dumps(info.get("score")), "ponder": ponder,
+                           "threads": threads, "concurrency": concurrency})
+
+    def update_clock(self):
+        # The clock after our move (with the increment) is only known from the next game state.
+        if self.enabled and self.moves and self.moves[-1]["clock_after"] is None:
+            self.moves[-1]["clock_after"] = self.my_clock()
+
+    def save(self, board):
+        if not self.enabled:
+            return
+        self.update_clock()
+        game = self.game
+        game_row = (game.id, time.time(), game.opponent.name, game.opponent.rating, game.opponent.title, game.my_color,
+                    game.variant_name, game.speed, game.clock_initial, game.clock_increment, game_result(game),
+                    game.state.get("status"), len(board.move_stack), self.my_clock())
+        try:
+            connection = connect(self.database)
+            with connection:
+                connection.execute("INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                   game_row)
+                connection.executemany("INSERT OR REPLACE INTO moves VALUES (:game_id, :ply, :clock_before, :clock_after, "
+                                       ":search_time, :latency, :depth, :nps, :score, :ponder, :threads, :concurrency)",
+                                       self.moves)
+            connection.close()
+        except sqlite3.Error:
+            logger.exception(f"Could not save the statistics of {game.id}:")
+            return
+        logger.debug(f"Saved {len(self.moves)} moves of {game.id} to {self.database}.")
+        self.moves = []
+
+
+def percentile(values, fraction):
+    values = sorted(value for value in values if value is not None)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else None
+
+
+def speed_summary(connection, speed, since):
+    games = connection.execute("SELECT result, status, time_left, clock_initial FROM games WHERE speed = ? AND end_time >= ?",
+                               (speed, since)).fetchall()
+    moves = connection.execute("SELECT moves.clock_before, moves.clock_after, moves.search_time, moves.latency, moves.nps, "
+                               "moves.ponder, moves.concurrency, games.clock_initial FROM moves JOIN games USING (game_id) "
+                               "WHERE games.speed = ? AND games.end_time >= ?", (speed, since)).fetchall()
+    finished = [row for row in games if row[0] in ("win", "loss", "draw")]
+    flags = sum(row[0] == "loss" and row[1] == "outoftime" for row in games)
+    time_left = [row[2] / row[3] for row in finished if row[2] is not None and row[3]]
+    low_clock = [row[1] < 0.1 * row[7] for row in moves if row[1] is not None and row[7]]
+    usage = [row[2] * 1000 / row[0] for row in moves if row[0]]
+    ponder = [row[5] for row in moves if row[5]]
+    nps_by_concurrency = {}
+    for row in moves:
+        if row[4] is not None and row[6] is not None:
+            nps_by_concurrency.setdefault(row[6], []).append(row[4])
+
+    summary = {
+        "games": len(games),
+        "wins": sum(row[0] == "win" for row in games),
+        "draws": sum(row[0] == "draw" for row in games),
+        "losses": sum(row[0] == "loss" for row in games),
+        "flags": flags,
+        "flag_rate": flags / len(finished) if finished else 0,
+        "moves": len(moves),
+        "mean_time_left": sum(time_left) / len(time_left) if time_left else None,
+        "min_time_left": min(time_left) if time_left else None,
+        "low_clock_rate": sum(low_clock) / len(low_clock) if low_clock else 0,
+        "p95_clock_usage": percentile(usage, 0.95),
+        "mean_search_time": sum(row[2] for row in moves) / len(moves) if moves else None,
+        "p95_latency": percentile([row[3] for row in moves], 0.95),
+        "ponder_hit_rate": ponder.count("hit") / len(ponder) if ponder else None,
+        "nps_by_concurrency": {concurrency: sum(values) / len(values)
+                               for concurrency, values in sorted(nps_by_concurrency.items())},
+    }
+    risks = []
+    if summary["flag_rate"] > 0.02:
+        risks.append(f"{summary['flag_rate']:.0%} of games lost on time")
+    if summary["low_clock_rate"] > 0.1:
+        risks.append(f"{summary['low_clock_rate']:.0%} of moves leave less than 10% of the initial time")
+    if summary["p95_clock_usage"] is not None and summary["p95_clock_usage"] > 0.2:
+        risks.append(f"5% of moves use more than {summary['p95_clock_usage']:.0%} of the clock")
+    summary["risks"] = risks
+    return summary
+
+
+def print_summary(speed, summary):
+    def fraction(value):
+        return "-" if value is None else f"{value:.1%}"
+
+    def seconds(value):
+        return "-" if value is None else f"{value:.2f} s"
+    print(f"{speed}: {summary['games']} games (+{summary['wins']} ={summary['draws']} -{summary['losses']}), "
+          f"{summary['flags']} lost on time ({fraction(summary['flag_rate'])}), {summary['moves']} moves")
+    print(f"  time left at the end: mean {fraction(summary['mean_time_left'])}, "
+          f"min {fraction(summary['min_time_left'])} of the initial time")
+    print(f"  search time: mean {seconds(summary['mean_search_time'])}, clock used by a move: "
+          f"p95 {fraction(summary['p95_clock_usage'])}, decision latency: p95 {seconds(summary['p95_latency'])}")
+    print(f"  moves with less than 10% of the initial time left: {fraction(summary['low_clock_rate'])}, "
+          f"ponder hits: {fraction(summary['ponder_hit_rate'])}")
+    if summary["nps_by_concurrency"]:
+        nps = ", ".join(f"{concurrency} games: {value:.0f}" for concurrency, value in summary["nps_by_concurrency"].items())
+        print(f"  nps by number of simultaneous games: {nps}")
+    for risk in summary["risks"]:
+        print(f"  RISK: {risk}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize the time usage of the bot's games by speed")
+    parser.add_argument("--database", default="stats.sqlite", help="The database in `stats: database` of config.yml.")
+    parser.add_argument("--speed", help="Only show this speed (e.g. bullet).")
+    parser.add_argument("--days", type=float, help="Only use the games of the last days.")
+    parser.add_argument("--json", action="store_true", help="Print the summaries as JSON.")
+    args = parser.parse_args()
+
+    connection = connect(args.database)
+    since = time.time() - args.days * 86400 if args.days else 0
+    speeds = [args.speed] if args.speed else [row[0] for row in connection.execute("SELECT DISTINCT speed FROM games "
+                                                                                   "ORDER BY speed")]
+    summaries = {speed: speed_summary(connection, speed, since) for speed in speeds}
+    if args.json:
+        print(json.dumps(summaries, indent=2))
+    else:
+        for speed, summary in summaries.items():
+            print_summary(speed, summary)
+
+
+if __name__ == "__main__":
+    main()
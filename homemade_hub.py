@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+A homemade engine from strategies.py as a Hub engine in its own process, so its search doesn't hold the GIL of the bot
+and runs on another core.
+
+The bot starts it by itself with `homemade_process: true`. Other Hub GUIs can use it as well:
+python3 homemade_hub.py --engine MaterialSearch
+
+Compare it with running the engine inside the bot:
+python3 homemade_hub.py --engine MaterialSearch --benchmark
+"""
+
+import argparse
+import draughts
+import draughts.engine
+import logging
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+import yaml
+from engine_wrapper import HubEngine, fallback_move, getHomemadeEngine
+from first_moves import score_cp
+
+logger = logging.getLogger(__name__)
+
+MAX_DEPTH = 100
+VARIANTS = ["normal", "frisian", "losing", "bt", "russian", "brazilian", "english", "italian", "turkish"]
+
+
+def hub_command(engine_name):
+    # HubEngine starts the engine through the shell, so the path is quoted.
+    return [sys.executable, f'"{os.path.realpath(__file__)}"', f"--engine={engine_name}"]
+
+
+def parse_args(arg):
+    """The name=value pairs of a Hub command."""
+    pairs = {}
+    for item in re.split(r' +(?![^"]*"(?:(?:[^"]*"){2})*[^"]*$)', arg.strip()):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            pairs[name] = value.strip('"')
+    return pairs
+
+
+def parse_level(arg):
+    level = parse_args(arg)
+    limit = {}
+    if "time" in level:
+        limit["inc"] = float(level.get("inc", 0))
+        # The GUI took the increment off, since Hub engines add it before they search.
+        limit["time"] = float(level["time"]) + limit["inc"]
+    if "move-time" in level:
+        limit["movetime"] = float(level["move-time"])
+    if "depth" in level:
+        limit["depth"] = int(level["depth"])
+    if "nodes" in level:
+        limit["nodes"] = int(level["nodes"])
+    # Without a level the engine searches until it is stopped.
+    return draughts.engine.Limit(**limit) if limit else draughts.engine.Limit(depth=MAX_DEPTH)
+
+
+def info_line(info):
+    fields = [f"{name}={info[name]}" for name in ["depth", "nodes", "nps", "time"] if name in info]
+    if "score" in info:
+        fields.append(f"score={score_cp(info['score']) / 100:.2f}")
+    if info.get("pv"):
+        fields.append(f'pv="{info["pv"].strip(chr(34))}"')
+    return f"info {' '.join(fields)}"
+
+
+class HubServer:
+    def __init__(self, engine_name, output=sys.stdout, Engine=None):
+        self.engine_name = engine_name
+        self.Engine = Engine or getHomemadeEngine(engine_name)
+        self.output = output
+        self.output_lock = threading.Lock()
+        self.options = {}
+        self.engine = None
+        self.board = None
+        self.limit = parse_level("")
+        self.search_thread = None
+        # A stop or ponder-hit while the engine doesn't search would end its next search at once.
+        self.search_lock = threading.Lock()
+        self.searching = False
+
+    def send(self, line):
+        with self.output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def start_engine(self):
+        if self.engine is None:
+            # The bot decides about draws and resigning with its own settings.
+            self.engine = self.Engine([], dict(self.options), None, {})
+
+    def set_position(self, arg):
+        position = parse_args(arg)
+        board = draughts.Game(self.options.get("variant", "normal"), position["pos"])
+        for hub_move in position.get("moves", "").split():
+            board.push(draughts.Move(board, hub_move=hub_move).board_move)
+        self.board = board
+
+    def search(self, board, limit, ponder):
+        try:
+            result = self.engine.search(board, limit, ponder, False)
+            move = draughts.Move(board, board_move=result.move.board_move)
+            info = result.info or {}
+        except Exception:
+            logger.exception("The search failed:")
+            move, result, info = fallback_move(board), None, {}
+        with self.search_lock:
+            self.searching = False
+        self.send(info_line(info))
+        done = f"done move={move.hub_move}"
+        if result is not None and result.ponder is not None:
+            ponder_board = board.copy()
+            ponder_board.push(move.board_move)
+            done += f" ponder={draughts.Move(ponder_board, board_move=result.ponder.board_move).hub_move}"
+        self.send(done)
+
+    def wait_for_search(self):
+        if self.search_thread is not None:
+            self.search_thread.join()
+            self.search_thread = None
+
+    def handle(self, line):
+        """Handle one command from the GUI. Returns False when the engine has to quit."""
+        command, _, arg = line.strip().partition(" ")
+        if command == "hub":
+            self.send(f"id name={self.engine_name}")
+            self.send(f'param name=variant value=normal type=enum values="{" ".join(VARIANTS)}"')
+            self.send("wait")
+        elif command == "set-param":
+            param = parse_args(arg)
+            self.options[param["name"]] = yaml.safe_load(param["value"])
+        elif command == "init":
+            self.start_engine()
+            self.send("ready")
+        elif command == "ping":
+            self.send("pong")
+        elif command == "pos":
+            self.wait_for_search()
+            self.set_position(arg)
+        elif command == "level":
+            self.limit = parse_level(arg)
+        elif command == "go":
+            self.start_engine()
+            self.wait_for_search()
+            self.searching = True
+            self.search_thread = threading.Thread(target=self.search, args=(self.board, self.limit, arg == "ponder"))
+            self.search_thread.start()
+        elif command == "stop":
+            with self.search_lock:
+                if self.searching:
+                    self.engine.stop()
+        elif command == "ponder-hit":
+            with self.search_lock:
+                if self.searching:
+                    self.engine.ponderhit()
+        elif command == "quit":
+            if self.engine is not None:
+                self.engine.stop()
+                self.wait_for_search()
+                self.engine.quit()
+            return False
+        elif command not in ["new-game", ""]:
+            logger.warning(f"Unknown Hub command: {line.strip()}")
+        return True
+
+    def run(self, lines):
+        for line in lines:
+            if not self.handle(line):
+                break
+
+
+class Heartbeat:
+    """Measures how late a thread of the bot wakes up while the engine searches, as the stream reader would."""
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.delays = []
+        self.running = threading.Event()
+
+    def run(self):
+        while self.running.is_set():
+            start_time = time.perf_counter()
+            time.sleep(self.interval)
+            self.delays.append(time.perf_counter() - start_time - self.interval)
+
+    def __enter__(self):
+        self.running.set()
+        self.thread = threading.Thread(target=self.run)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.running.clear()
+        self.thread.join()
+
+
+def benchmark_engine(engine, variant, movetime, moves):
+    board = draughts.Game(variant)
+    nodes = 0
+    search_time = 0
+    with Heartbeat() as heartbeat:
+        for _ in range(moves):
+            if board.is_over():
+                break
+            start_time = time.perf_counter()
+            result = engine.search_for(board, movetime, False)
+            search_time += time.perf_counter() - start_time
+            nodes += int(result.info.get("nodes", 0))
+            board.push(result.move.board_move)
+    engine.quit()
+    delays = sorted(heartbeat.delays)
+    return {"moves": len(board.move_stack), "nps": nodes / search_time if search_time else 0,
+            "mean_move_time": search_time / max(len(board.move_stack), 1),
+            "p50_wakeup_delay": statistics.median(delays), "p99_wakeup_delay": delays[int(0.99 * (len(delays) - 1))],
+            "max_wakeup_delay": delays[-1]}
+
+
+def benchmark(engine_name, variant, movetime, moves):
+    options = {"variant": variant}
+    in_process = getHomemadeEngine(engine_name)([], dict(options), None, {})
+    out_of_process = HubEngine(hub_command(engine_name), dict(options), None, {})
+    return {"in process": benchmark_engine(in_process, variant, movetime, moves),
+            "own process": benchmark_engine(out_of_process, variant, movetime, moves)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a homemade engine as a Hub engine")
+    parser.add_argument("--engine", required=True, help="Name of the engine class in strategies.py.")
+    parser.add_argument("--log", help="Write the log of the engine to this file.")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Play some moves with the engine in this process and in its own process.")
+    parser.add_argument("--variant", default="normal", help="Variant of the benchmark.")
+    parser.add_argument("--movetime", type=int, default=500, help="Search time per move of the benchmark in ms.")
+    parser.add_argument("--moves", type=int, default=20, help="Moves of the benchmark.")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        logging.basicConfig(level=logging.WARNING)
+        for mode, result in benchmark(args.engine, args.variant, args.movetime, args.moves).items():
+            print(f"{mode}: {result['moves']} moves, {result['nps']:.0f} nps, {result['mean_move_time'] * 1000:.0f} ms per "
+                  f"move, other threads wake up late by {result['p50_wakeup_delay'] * 1000:.2f} ms (p50), "
+                  f"{result['p99_wakeup_delay'] * 1000:.2f} ms (p99), {result['max_wakeup_delay'] * 1000:.2f} ms (max)")
+        return
+
+    # The GUI reads stdout and stderr, so only warnings are logged there.
+    logging.basicConfig(level=logging.DEBUG if args.log else logging.WARNING, filename=args.log)
+    HubServer(args.engine).run(sys.stdin)
+
+
+if __name__ == "__main__":
+    main()
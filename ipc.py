@@ -0,0 +1,187 @@
+"""
+Channels between the processes of lidraughts-bot, built on shared memory instead of a `multiprocessing.Manager`.
+
+Every message is a JSON value, stored in the ring buffer as a 4-byte little-endian length followed by the UTF-8 JSON.
+The locks and semaphores of a channel can only be given to a process when it is created (as an argument of
+`multiprocessing.Process` or as `initargs` of a pool), not through `Pool.apply_async`.
+"""
+
+import json
+import logging
+import logging.handlers
+import multiprocessing
+import struct
+import time
+from multiprocessing import shared_memory
+from queue import Empty, Full
+
+HEADER = struct.Struct("<QQ")  # Total bytes read, total bytes written.
+LENGTH = struct.Struct("<I")
+
+
+class RingBuffer:
+    def __init__(self, capacity=1 << 20):
+        self.capacity = capacity
+        self.shm = shared_memory.SharedMemory(create=True, size=HEADER.size + capacity)
+        HEADER.pack_into(self.shm.buf, 0, 0, 0)
+        self.lock = multiprocessing.Lock()
+        self.items = multiprocessing.Semaphore(0)
+
+    def _write(self, position, data):
+        start = position % self.capacity
+        first_part = min(len(data), self.capacity - start)
+        self.shm.buf[HEADER.size + start:HEADER.size + start + first_part] = data[:first_part]
+        self.shm.buf[HEADER.size:HEADER.size + len(data) - first_part] = data[first_part:]
+
+    def _read(self, position, size):
+        start = position % self.capacity
+        first_part = min(size, self.capacity - start)
+        data = bytes(self.shm.buf[HEADER.size + start:HEADER.size + start + first_part])
+        return data + bytes(self.shm.buf[HEADER.size:HEADER.size + size - first_part])
+
+    def put(self, message, block=True, timeout=None):
+        data = json.dumps(message, default=str).encode("utf-8")
+        data = LENGTH.pack(len(data)) + data
+        if len(data) > self.capacity:
+            raise ValueError(f"Message of {len(data)} bytes doesn't fit in a ring buffer of {self.capacity} bytes.")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                read, written = HEADER.unpack_from(self.shm.buf, 0)
+                if written - read + len(data) <= self.capacity:
+                    self._write(written, data)
+                    HEADER.pack_into(self.shm.buf, 0, read, written + len(data))
+                    self.items.release()
+                    return
+            if not block or (deadline is not None and time.monotonic() > deadline):
+                raise Full
+            time.sleep(0.001)
+
+    def put_nowait(self, message):
+        self.put(message, block=False)
+
+    def get(self, block=True, timeout=None):
+        if not self.items.acquire(block, timeout):
+            raise Empty
+        with self.lock:
+            read, written = HEADER.unpack_from(self.shm.buf, 0)
+            size, = LENGTH.unpack(self._read(read, LENGTH.size))
+            data = self._read(read + LENGTH.size, size)
+            HEADER.pack_into(self.shm.buf, 0, read + LENGTH.size + size, written)
+        return json.loads(data.decode("utf-8"))
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def empty(self):
+        with self.lock:
+            read, written = HEADER.unpack_from(self.shm.buf, 0)
+        return read == written
+
+    def close(self):
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+class Mailbox:
+    """Holds the latest JSON value written to it, e.g. the list of queued challengers."""
+    def __init__(self, capacity=1 << 16):
+        self.capacity = capacity
+        self.shm = shared_memory.SharedMemory(create=True, size=LENGTH.size + capacity)
+        LENGTH.pack_into(self.shm.buf, 0, 0)
+        self.lock = multiprocessing.Lock()
+
+    def set(self, value):
+        data = json.dumps(value).encode("utf-8")[:self.capacity]
+        with self.lock:
+            LENGTH.pack_into(self.shm.buf, 0, len(data))
+            self.shm.buf[LENGTH.size:LENGTH.size + len(data)] = data
+
+    def get(self, default=None):
+        with self.lock:
+            size, = LENGTH.unpack_from(self.shm.buf, 0)
+            data = bytes(self.shm.buf[LENGTH.size:LENGTH.size + size])
+        return json.loads(data.decode("utf-8")) if data else default
+
+    def unlink(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+class Channels:
+    def __init__(self):
+        self.control = RingBuffer()
+        self.correspondence = RingBuffer()
+        self.logging = RingBuffer(4 << 20)
+        self.challengers = Mailbox()
+        self.games = Mailbox()
+
+    def unlink(self):
+        for channel in (self.control, self.correspondence, self.logging, self.challengers, self.games):
+            channel.unlink()
+
+
+class LogChannelHandler(logging.handlers.QueueHandler):
+    def enqueue(self, record):
+        self.queue.put_nowait(record.__dict__)
+
+
+def log_record(message):
+    return logging.makeLogRecord(message)
+
+
+def benchmark_process(channel, count, replies):
+    for _ in range(count):
+        message = channel.get()
+        if replies is not None:
+            replies.put(message)
+
+
+def benchmark(name, make_channel, count=20000):
+    request_channel = make_channel()
+    reply_channel = make_channel()
+    event = {"type": "gameStart", "game": {"id": "abcdefgh", "source": "friend"}}
+
+    latency_process = multiprocessing.Process(target=benchmark_process, args=(request_channel, 1000, reply_channel))
+    latency_process.start()
+    latencies = []
+    for _ in range(1000):
+        start = time.perf_counter()
+        request_channel.put(event)
+        reply_channel.get()
+        latencies.append(time.perf_counter() - start)
+    latency_process.join()
+    latencies.sort()
+
+    throughput_process = multiprocessing.Process(target=benchmark_process, args=(request_channel, count, None))
+    throughput_process.start()
+    start = time.perf_counter()
+    for _ in range(count):
+        request_channel.put(event)
+    throughput_process.join()
+    elapsed = time.perf_counter() - start
+
+    print(f"{name}: round trip p50 {latencies[500] * 1e6:.0f} us, p99 {latencies[990] * 1e6:.0f} us, "
+          f"throughput {count / elapsed:.0f} messages/s")
+
+
+def main():
+    manager = multiprocessing.Manager()
+    benchmark("Manager queue", manager.Queue)
+    channels = []
+
+    def make_ring_buffer():
+        channels.append(RingBuffer())
+        return channels[-1]
+    try:
+        benchmark("Shared memory ring buffer", make_ring_buffer)
+    finally:
+        for channel in channels:
+            channel.unlink()
+
+
+if __name__ == "__main__":
+    main()
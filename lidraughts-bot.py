@@ -8,6 +8,7 @@ import lidraughts
 import logging
 import logging.handlers
 import multiprocessing
+import queue
 import signal
 import time
 import backoff
@@ -16,10 +17,22 @@ import threading
 import os
 import copy
 from config import load_config
+from concurrency_control import ConcurrencyController, move_metrics
+from cpu_scheduler import CpuScheduler
+from opponent_strength import OpponentStrength
+from ponder import PonderManager
+from correspondence_analysis import CorrespondenceAnalysis
+from first_moves import FirstMoveTable
+from game_stats import GameStats
+from ipc import Channels, LogChannelHandler, log_record
+from matchmaking import Matchmaking
+from process_limits import CoreSlots
+from timers import Deadlines, TimerWheel
+from tracing import Tracer, create_trace_file
 from conversation import Conversation, ChatLine
-from requests.exceptions import ChunkedEncodingError, ConnectionError, HTTPError, ReadTimeout
+from requests.exceptions import HTTPError, ReadTimeout, RequestException
 from rich.logging import RichHandler
-from collections import defaultdict
+from collections import defaultdict, deque
 from http.client import RemoteDisconnected
 
 logger = logging.getLogger(__name__)
@@ -65,12 +78,6 @@ def watch_control_stream(control_queue, li):
             pass
 
 
-def do_correspondence_ping(control_queue, period):
-    while not terminated:
-        time.sleep(period)
-        control_queue.put_nowait({"type": "correspondence_ping"})
-
-
 def logging_configurer(level, filename):
     console_handler = RichHandler()
     console_formatter = logging.Formatter("%(message)s")
@@ -94,200 +101,248 @@ def logging_listener_proc(queue, configurer, level, log_filename):
     logger = logging.getLogger()
     while not terminated:
         try:
-            logger.handle(queue.get())
+            logger.handle(log_record(queue.get()))
         except Exception:
             pass
 
 
 def game_logging_configurer(queue, level):
     if sys.platform == "win32":
-        h = logging.handlers.QueueHandler(queue)
+        h = LogChannelHandler(queue)
         root = logging.getLogger()
         root.handlers.clear()
         root.addHandler(h)
         root.setLevel(level)
 
 
-def game_error_handler(error):
+game_channels = None
+game_timers = None
+game_context = None
+
+
+def init_game_worker(channels, li, user_profile, config, logging_level, cpu_scheduler, correspondence_analysis):
+    # Everything that is the same for all games is sent once per worker, so a game task is only its id.
+    global game_channels, game_timers, game_context
+    game_channels = channels
+    game_timers = TimerWheel().start()
+    game_context = (li, user_profile, config, logging_level, cpu_scheduler, correspondence_analysis)
+
+
+def game_error_handler(control_queue, game_id, error):
     logger.exception("Game ended due to error:", exc_info=error)
+    # play_game didn't get to report the end of the game, so its process and cores are freed here.
+    control_queue.put_nowait({"type": "local_game_done", "game_id": game_id})
 
 
 def start(li, user_profile, config, logging_level, log_filename, one_game=False):
     challenge_config = config["challenge"]
     max_games = challenge_config.get("concurrency", 1)
     logger.info(f"You're now connected to {config['url']} and awaiting challenges.")
+    create_trace_file((config.get("tracing") or {}).get("file"))
     manager = multiprocessing.Manager()
-    challenge_queue = manager.list()
-    control_queue = manager.Queue()
-    control_stream = multiprocessing.Process(target=watch_control_stream, args=[control_queue, li])
-    control_stream.start()
-    correspondence_cfg = config.get("correspondence") or {}
-    correspondence_checkin_period = correspondence_cfg.get("checkin_period", 600)
-    correspondence_pinger = multiprocessing.Process(target=do_correspondence_ping,
-                                                    args=[control_queue, correspondence_checkin_period])
-    correspondence_pinger.start()
-    correspondence_queue = manager.Queue()
-    correspondence_queue.put("")
-    startup_correspondence_games = [game["gameId"] for game in li.get_ongoing_games() if game["perf"] == "correspondence"]
-    wait_for_correspondence_ping = False
-    last_check_online_time = time.time()
-
-    busy_processes = 0
-    queued_processes = 0
-
-    logging_queue = manager.Queue()
-    logging_listener = multiprocessing.Process(target=logging_listener_proc,
-                                               args=(logging_queue, logging_configurer, logging_level, log_filename))
-    logging_listener.start()
-
-    def log_proc_count(change, queued, used):
-        symbol = "+++" if change == "Freed" else "---"
-        logger.info(f"{symbol} Process {change}. Total Queued: {queued}. Total Used: {used}")
-
-    play_game_args = [li,
-                      None,  # will hold the game id
-                      control_queue,
-                      user_profile,
-                      config,
-                      challenge_queue,
-                      correspondence_queue,
-                      logging_queue,
-                      game_logging_configurer,
-                      logging_level]
-
-    with multiprocessing.pool.Pool(max_games + 1) as pool:
-        while not terminated:
-            try:
-                event = control_queue.get()
-                if event.get("type") != "ping":
-                    logger.debug(f"Event: {event}")
-            except InterruptedError:
-                continue
+    channels = Channels()
+    control_stream = logging_listener = correspondence_analyser = None
+    try:
+        challenge_queue = []
+        control_queue = channels.control
+        control_stream = multiprocessing.Process(target=watch_control_stream, args=[control_queue, li])
+        control_stream.start()
+        correspondence_cfg = config.get("correspondence") or {}
+        correspondence_checkin_period = correspondence_cfg.get("checkin_period", 600)
+        timers = TimerWheel().start()
+        timers.call_every(correspondence_checkin_period, control_queue.put_nowait, {"type": "correspondence_ping"})
+        timers.call_every(60 * 60, control_queue.put_nowait, {"type": "check_online"})
+        concurrency = ConcurrencyController(config.get("concurrency_control") or {}, max_games)
+        if concurrency.enabled:
+            timers.call_every(concurrency.interval, control_queue.put_nowait, {"type": "concurrency_check"})
+        correspondence_queue = channels.correspondence
+        correspondence_queue.put("")
+        startup_correspondence_games = [game["gameId"] for game in li.get_ongoing_games() if game["perf"] == "correspondence"]
+        wait_for_correspondence_ping = False
+
+        busy_processes = 0
+        queued_processes = 0
+
+        logging_queue = channels.logging
+        logging_listener = multiprocessing.Process(target=logging_listener_proc,
+                                                   args=(logging_queue, logging_configurer, logging_level, log_filename))
+        logging_listener.start()
+
+        cpu_scheduler = CpuScheduler(manager.dict(), config.get("cpu_scheduler") or {})
+        core_slots = CoreSlots((config["engine"].get("limits") or {}).get("cores_per_engine"))
+        matchmaker = Matchmaking(li, config, user_profile)
+        correspondence_analysis = CorrespondenceAnalysis(manager, config)
+        if correspondence_analysis.enabled:
+            correspondence_analyser = multiprocessing.Process(target=correspondence_analysis.run,
+                                                              args=[config, logging_queue, game_logging_configurer,
+                                                                    logging_level])
+            correspondence_analyser.start()
+
+        def log_proc_count(change, queued, used):
+            symbol = "+++" if change == "Freed" else "---"
+            logger.info(f"{symbol} Process {change}. Total Queued: {queued}. Total Used: {used}")
+
+        worker_context = (channels, li, user_profile, config, logging_level, cpu_scheduler, correspondence_analysis)
+
+        def start_game(game_id):
+            pool.apply_async(play_game, [game_id], {"engine_cores": core_slots.acquire(game_id), "dispatch_time": time.time()},
+                             error_callback=lambda error: game_error_handler(control_queue, game_id, error))
+
+        with multiprocessing.pool.Pool(max_games + 1, initializer=init_game_worker, initargs=worker_context) as pool:
+            while not terminated:
+                try:
+                    event = control_queue.get()
+                    if event.get("type") != "ping":
+                        logger.debug(f"Event: {event}")
+                except InterruptedError:
+                    continue
 
-            if event.get("type") is None:
-                logger.warning("Unable to handle response from lidraughts.org:")
-                logger.warning(event)
-                if event.get("error") == "Missing scope":
-                    logger.warning('Please check that the API access token for your bot has the scope "Play games with the bot'
-                                   ' API".')
-                continue
+                if event.get("type") is None:
+                    logger.warning("Unable to handle response from lidraughts.org:")
+                    logger.warning(event)
+                    if event.get("error") == "Missing scope":
+                        logger.warning('Please check that the API access token for your bot has the scope "Play games with '
+                                       'the bot API".')
+                    continue
 
-            if event["type"] == "terminated":
-                break
-            elif event["type"] == "local_game_done":
-                busy_processes -= 1
-                log_proc_count("Freed", queued_processes, busy_processes)
-                if one_game:
+                if event["type"] == "terminated":
                     break
-            elif event["type"] == "challenge":
-                chlng = model.Challenge(event["challenge"])
-                is_supported, decline_reason = chlng.is_supported(challenge_config)
-                if is_supported:
-                    challenge_queue.append(chlng)
-                    if challenge_config.get("sort_by", "best") == "best":
-                        list_c = list(challenge_queue)
-                        list_c.sort(key=lambda c: -c.score())
-                        challenge_queue = list_c
-                else:
-                    li.decline_challenge(chlng.id, reason=decline_reason)
-            elif event["type"] == "gameStart":
-                game_id = event["game"]["id"]
-                if game_id in startup_correspondence_games:
-                    logger.info(f'--- Enqueue {config["url"] + game_id}')
-                    correspondence_queue.put(game_id)
-                    startup_correspondence_games.remove(game_id)
-                else:
-                    if queued_processes > 0:
-                        queued_processes -= 1
-                    busy_processes += 1
-                    log_proc_count("Used", queued_processes, busy_processes)
-                    play_game_args[1] = game_id
-                    pool.apply_async(play_game, play_game_args, error_callback=game_error_handler)
-
-            is_correspondence_ping = event["type"] == "correspondence_ping"
-            is_local_game_done = event["type"] == "local_game_done"
-            if (is_correspondence_ping or (is_local_game_done and not wait_for_correspondence_ping)) and not challenge_queue:
-                if is_correspondence_ping and wait_for_correspondence_ping:
-                    correspondence_queue.put("")
-
-                wait_for_correspondence_ping = False
-                while (busy_processes + queued_processes) < max_games:
-                    game_id = correspondence_queue.get()
-                    # stop checking in on games if we have checked in on all games since the last correspondence_ping
-                    if not game_id:
-                        if is_correspondence_ping and not correspondence_queue.empty():
-                            correspondence_queue.put("")
-                        else:
-                            wait_for_correspondence_ping = True
-                            break
+                elif event["type"] == "move_metrics":
+                    concurrency.record(event, busy_processes)
+                    continue
+                elif event["type"] == "concurrency_check":
+                    concurrency.check(busy_processes + queued_processes)
+                elif event["type"] == "local_game_done":
+                    busy_processes -= 1
+                    log_proc_count("Freed", queued_processes, busy_processes)
+                    core_slots.release(event.get("game_id"))
+                    matchmaker.game_done(event.get("game_id"))
+                    cpu_scheduler.log_utilization()
+                    if one_game:
+                        break
+                elif event["type"] == "challenge":
+                    chlng = model.Challenge(event["challenge"])
+                    is_supported, decline_reason = chlng.is_supported(challenge_config)
+                    if matchmaker.is_own_challenge(chlng):
+                        logger.info(f"Waiting for an answer to {chlng}")
+                    elif is_supported:
+                        challenge_queue.append(chlng)
+                        if challenge_config.get("sort_by", "best") == "best":
+                            list_c = list(challenge_queue)
+                            list_c.sort(key=lambda c: -c.score())
+                            challenge_queue = list_c
                     else:
+                        li.decline_challenge(chlng.id, reason=decline_reason)
+                elif event["type"] in ["challengeDeclined", "challengeCanceled"]:
+                    matchmaker.challenge_declined(event["challenge"]["id"])
+                elif event["type"] == "check_online":
+                    if not li.is_online(user_profile["id"]):
+                        logger.info("Will reset connection with lichess")
+                        li.reset_connection()
+                elif event["type"] == "gameStart":
+                    game_id = event["game"]["id"]
+                    matchmaker.game_started(game_id)
+                    if game_id in startup_correspondence_games:
+                        logger.info(f'--- Enqueue {config["url"] + game_id}')
+                        correspondence_queue.put(game_id)
+                        startup_correspondence_games.remove(game_id)
+                    else:
+                        if queued_processes > 0:
+                            queued_processes -= 1
                         busy_processes += 1
                         log_proc_count("Used", queued_processes, busy_processes)
-                        play_game_args[1] = game_id
-                        pool.apply_async(play_game, play_game_args, error_callback=game_error_handler)
-
-            # Keep processing the queue until empty or max_games is reached.
-            while (queued_processes + busy_processes) < max_games and challenge_queue:
-                chlng = challenge_queue.pop(0)
-                try:
-                    logger.info(f"Accept {chlng}")
-                    queued_processes += 1
-                    li.accept_challenge(chlng.id)
-                    log_proc_count("Queued", queued_processes, busy_processes)
-                except (HTTPError, ReadTimeout) as exception:
-                    if isinstance(exception, HTTPError) and exception.response.status_code == 404:
-                        logger.info(f"Skip missing {chlng}")
-                    queued_processes -= 1
-
-            if time.time() > last_check_online_time + 60 * 60:  # 1 hour.
-                if not li.is_online(user_profile["id"]):
-                    logger.info("Will reset connection with lichess")
-                    li.reset_connection()
-                last_check_online_time = time.time()
+                        start_game(game_id)
+
+                is_correspondence_ping = event["type"] == "correspondence_ping"
+                is_local_game_done = event["type"] == "local_game_done"
+                if ((is_correspondence_ping or (is_local_game_done and not wait_for_correspondence_ping))
+                        and not challenge_queue):
+                    if is_correspondence_ping and wait_for_correspondence_ping:
+                        correspondence_queue.put("")
+
+                    wait_for_correspondence_ping = False
+                    while (busy_processes + queued_processes) < concurrency.limit:
+                        game_id = correspondence_queue.get()
+                        # stop checking in on games if we have checked in on all games since the last correspondence_ping
+                        if not game_id:
+                            if is_correspondence_ping and not correspondence_queue.empty():
+                                correspondence_queue.put("")
+                            else:
+                                wait_for_correspondence_ping = True
+                                break
+                        else:
+                            busy_processes += 1
+                            log_proc_count("Used", queued_processes, busy_processes)
+                            start_game(game_id)
+
+                # Keep processing the queue until empty or max_games is reached.
+                while (queued_processes + busy_processes) < concurrency.limit and challenge_queue:
+                    chlng = challenge_queue.pop(0)
+                    try:
+                        logger.info(f"Accept {chlng}")
+                        queued_processes += 1
+                        li.accept_challenge(chlng.id)
+                        log_proc_count("Queued", queued_processes, busy_processes)
+                    except (HTTPError, ReadTimeout) as exception:
+                        if isinstance(exception, HTTPError) and exception.response.status_code == 404:
+                            logger.info(f"Skip missing {chlng}")
+                        queued_processes -= 1
 
-            control_queue.task_done()
+                if not challenge_queue:
+                    matchmaker.check_challenge(concurrency.limit - busy_processes - queued_processes)
 
-    logger.info("Terminated")
-    control_stream.terminate()
-    control_stream.join()
-    correspondence_pinger.terminate()
-    correspondence_pinger.join()
-    logging_listener.terminate()
-    logging_listener.join()
+                correspondence_analysis.set_live_games(busy_processes + queued_processes > 0)
 
+                channels.challengers.set([chlng.challenger_name for chlng in challenge_queue])
+                channels.games.set(busy_processes)
 
-ponder_results = {}
+        matchmaker.log_stats()
+        logger.info("Terminated")
+    finally:
+        # Shared memory outlives the processes unless it is unlinked, so it is cleaned up after an error as well.
+        for process in (control_stream, logging_listener, correspondence_analyser):
+            if process is not None:
+                process.terminate()
+                process.join()
+        channels.unlink()
 
 
 @backoff.on_exception(backoff.expo, BaseException, max_time=600, giveup=is_final)
-def play_game(li,
-              game_id,
-              control_queue,
-              user_profile,
-              config,
-              challenge_queue,
-              correspondence_queue,
-              logging_queue,
-              game_logging_configurer,
-              logging_level):
-    game_logging_configurer(logging_queue, logging_level)
+def play_game(game_id, engine_cores=None, dispatch_time=None):
+    li, user_profile, config, logging_level, cpu_scheduler, correspondence_analysis = game_context
+    control_queue = game_channels.control
+    correspondence_queue = game_channels.correspondence
+    game_logging_configurer(game_channels.logging, logging_level)
     logger = logging.getLogger(__name__)
+    if dispatch_time is not None:
+        logger.debug(f"Game {game_id} started {(time.time() - dispatch_time) * 1000:.1f} ms after it was dispatched.")
+    tracer = Tracer(config.get("tracing") or {}, game_id)
+    li.tracer = tracer
 
-    response = li.get_game_stream(game_id)
-    lines = response.iter_lines()
+    with tracer.span("open_stream"):
+        response = li.get_game_stream(game_id)
+        lines = response.iter_lines()
 
-    # Initial response of stream will be the full game info. Store it
-    initial_state = json.loads(next(lines).decode("utf-8"))
+        # Initial response of stream will be the full game info. Store it
+        initial_state = json.loads(next(lines).decode("utf-8"))
     logger.debug(f"Initial state: {initial_state}")
     abort_time = config.get("abort_time", 20)
     game = model.Game(initial_state, user_profile["username"], li.baseUrl, abort_time)
 
     initial_time = (game.state["wtime"] if game.my_color == "white" else game.state["btime"]) / 1000
-    variant = parse_variant(game.variant_name)
-    engine = engine_wrapper.create_engine(config, variant, initial_time)
-    conversation = Conversation(game, engine, li, __version__, challenge_queue)
+    variant = engine_wrapper.parse_variant(game.variant_name)
+    with tracer.span("start_engine"):
+        engine = engine_wrapper.create_engine(config, variant, initial_time, game.speed, engine_cores)
+    conversation = Conversation(game, engine, li, __version__, game_channels.challengers)
 
     logger.info(f"+++ {game}")
+    strength = OpponentStrength(config.get("opponent_strength") or {}, config.get("stats") or {}, game)
+    cpu_scheduler.register(game.id, strength.weaker)
+    events = queue.Queue()
+    stream_reader = StreamReader(response, lines, events)
+    deadlines = Deadlines(game_timers, lambda name: events.put({"type": "deadline", "deadline": name}))
+    set_deadlines(deadlines, game)
+    stats = GameStats(config.get("stats") or {}, game)
 
     is_correspondence = game.perf_name == "Correspondence"
     correspondence_cfg = config.get("correspondence") or {}
@@ -295,10 +350,12 @@ def play_game(li,
     correspondence_disconnect_time = correspondence_cfg.get("disconnect_time", 300)
 
     engine_cfg = config["engine"]
+    first_moves = FirstMoveTable(engine_cfg.get("first_moves"))
     ponder_cfg = correspondence_cfg if is_correspondence else engine_cfg
     can_ponder = ponder_cfg.get("ponder", False)
     move_overhead = config.get("move_overhead", 1000)
     move_overhead_inc = config.get("move_overhead_inc", 100)
+    send_move_metrics = (config.get("concurrency_control") or {}).get("enabled", False)
     delay_seconds = config.get("rate_limiting_delay", 0)/1000
 
     greeting_cfg = config.get("greeting") or {}
@@ -313,12 +370,32 @@ def play_game(li,
 
     board = draughts.Game(game.variant_name.lower(), game.initial_fen)
     moves, old_moves = [], []
-    ponder_thread = None
-    ponder_li_one = None
+    ponder = PonderManager(engine, game)
+
+    pending_events = deque()
+
+    def answer_chat(seconds, search):
+        # Chat is answered during the fake think time. The other events are handled by the loop after the move.
+        end = time.perf_counter() + seconds
+        while search.is_alive() if search else time.perf_counter() < end:
+            try:
+                event = events.get(timeout=0.1 if search else max(end - time.perf_counter(), 0))
+            except queue.Empty:
+                continue
+            upd = json.loads(event.decode("utf-8")) if isinstance(event, bytes) and event else event
+            if isinstance(upd, dict) and upd.get("type") == "chatLine":
+                conversation.react(ChatLine(upd), game)
+                continue
+            pending_events.append(upd)
+            if isinstance(upd, Exception) or (isinstance(upd, dict) and upd.get("type") == "gameState"
+                                              and upd.get("status", "started") not in ["created", "started"]):
+                return False
+        return True
 
     first_move = True
     disconnect_time = 0
     prior_game = None
+    reconnects = 0
     while not terminated:
         move_attempted = False
         try:
@@ -326,67 +403,109 @@ def play_game(li,
                 upd = game.state
                 first_move = False
             else:
-                binary_chunk = next(lines)
-                upd = json.loads(binary_chunk.decode("utf-8")) if binary_chunk else None
+                with tracer.span("stream_read"):
+                    event = pending_events.popleft() if pending_events else events.get()
+                if isinstance(event, Exception):
+                    raise event
+                if isinstance(event, dict):
+                    upd = event
+                else:
+                    with tracer.span("json_loads"):
+                        upd = json.loads(event.decode("utf-8")) if event else None
             logger.debug(f"Game state: {upd}")
 
             u_type = upd["type"] if upd else "ping"
             if u_type == "chatLine":
-                conversation.react(ChatLine(upd), game)
+                with tracer.span("chat"):
+                    conversation.react(ChatLine(upd), game)
             elif u_type == "gameState":
                 game.state = upd
+                stats.update_clock()
 
                 start_time = time.perf_counter_ns()
                 if upd["moves"] and len(upd["moves"].split()[-1]) != 4:
                     continue
-                moves = upd["moves"].split()
-                moves_to_get = len(moves) - len(old_moves)
-                if moves_to_get > 0:
-                    for move in moves[-moves_to_get:]:
-                        board.push_str_move(move)
-                old_moves = moves
+                with tracer.span("push_moves"):
+                    moves = upd["moves"].split()
+                    moves_to_get = len(moves) - len(old_moves)
+                    if moves_to_get > 0:
+                        for move in moves[-moves_to_get:]:
+                            board.push_str_move(move)
+                    old_moves = moves
 
                 if len(board.move_stack) == 0:
                     disconnect_time = correspondence_disconnect_time
 
-                if not is_game_over(board) and is_engine_move(game, prior_game, board):
+                engine_to_move = is_engine_move(game, prior_game, board)
+                cpu_scheduler.update(game.id, engine_to_move, game.state[f"{game.my_color[0]}time"])
+                if not is_game_over(board) and engine_to_move:
                     disconnect_time = correspondence_disconnect_time
                     if len(board.move_stack) < 2:
-                        conversation.send_message("player", hello)
-                        conversation.send_message("spectator", hello_spectators)
-                    fake_thinking(config, board, game)
+                        with tracer.span("chat"):
+                            conversation.send_message("player", hello)
+                            conversation.send_message("spectator", hello_spectators)
+                    fake_time = fake_think_time(config, board, game)
                     print_move_number(board)
 
                     draw_offered = check_for_draw_offer(game)
 
-                    if len(board.move_stack) < 2:
-                        best_move = choose_first_move(engine, board, draw_offered)
-                    elif is_correspondence:
-                        best_move = choose_move_time(engine, board, correspondence_move_time, draw_offered)
-                    else:
-                        best_move = get_pondering_results(ponder_thread, ponder_li_one, game, board, engine)
-                        if best_move.move is None:
-                            best_move = choose_move(engine, board, game, draw_offered, start_time, move_overhead,
-                                                    move_overhead_inc)
+                    clock_before = game.state[f"{game.my_color[0]}time"]
+                    search_start_time = time.perf_counter()
+                    with tracer.span("search", ply=len(board.move_stack)):
+                        # The threads of the engine can only be changed while it doesn't search.
+                        ponder_result, ponder_outcome = ponder.finish(board)
+                        threads, _ = cpu_scheduler.allocation(game.id)
+                        engine.set_threads(threads)
+                        if len(board.move_stack) < 2:
+                            best_move = choose_first_move(engine, board, draw_offered, first_moves)
+                        elif is_correspondence:
+                            best_move = correspondence_analysis.get_move(game.id, game.state["moves"], board, engine)
+                            if best_move is None:
+                                best_move = choose_move_time(engine, board, correspondence_move_time, draw_offered)
+                        else:
+                            best_move = ponder_result
+                            if best_move.move is None:
+                                best_move = choose_move(engine, board, game, draw_offered, start_time, move_overhead,
+                                                        move_overhead_inc, strength.move_time_factor())
+                    with tracer.span("fake_thinking"):
+                        best_move = think_at_least(engine, board, best_move, fake_time, search_start_time, draw_offered,
+                                                   answer_chat)
+                    search_time = time.perf_counter() - search_start_time
+                    cpu_scheduler.record_search(game.id, search_time)
+                    strength.record_search(search_time)
                     move_attempted = True
-                    if best_move.resigned and len(board.move_stack) >= 2:
-                        li.resign(game.id)
-                    else:
-                        li.make_move(game.id, best_move)
-                    ponder_thread, ponder_li_one = start_pondering(engine, board, game, can_ponder, best_move,
-                                                                   start_time, move_overhead, move_overhead_inc)
+                    with tracer.span("make_move"):
+                        if best_move.resigned and len(board.move_stack) >= 2:
+                            li.resign(game.id)
+                        else:
+                            li.make_move(game.id, best_move)
+                    latency = (time.perf_counter_ns() - start_time) / 1e9
+                    stats.record_move(len(board.move_stack), clock_before, search_time, latency, engine.last_move_info,
+                                      ponder_outcome, threads, game_channels.games.get())
+                    if send_move_metrics:
+                        control_queue.put_nowait(move_metrics(game.id, engine.last_move_info, search_time, latency,
+                                                              threads))
+                    cpu_scheduler.update(game.id, False, game.state[f"{game.my_color[0]}time"])
+                    # Waiting engines give their spare threads back before they ponder.
+                    waiting_threads, ponder_allowed = cpu_scheduler.allocation(game.id)
+                    engine.set_threads(waiting_threads)
+                    with tracer.span("start_pondering"):
+                        ponder.start(board, best_move, strength.can_ponder(can_ponder and ponder_allowed), start_time,
+                                     move_overhead, move_overhead_inc)
                     time.sleep(delay_seconds)
                 elif is_game_over(board):
                     engine.report_game_result(game, board)
                     tell_user_game_result(game, board)
-                    conversation.send_message("player", goodbye)
-                    conversation.send_message("spectator", goodbye_spectators)
+                    with tracer.span("chat"):
+                        conversation.send_message("player", goodbye)
+                        conversation.send_message("spectator", goodbye_spectators)
 
                 wb = "w" if board.whose_turn() == draughts.WHITE else "b"
                 terminate_time = (upd[f"{wb}time"] + upd[f"{wb}inc"]) / 1000 + 60
                 game.ping(abort_time, terminate_time, disconnect_time)
+                set_deadlines(deadlines, game)
                 prior_game = copy.deepcopy(game)
-            elif u_type == "ping":
+            elif u_type in ["ping", "deadline"]:
                 if is_correspondence and not is_engine_move(game, prior_game, board) and game.should_disconnect_now():
                     break
                 elif game.should_abort_now():
@@ -398,17 +517,57 @@ def play_game(li,
                     if game.is_abortable():
                         li.abort(game.id)
                     break
-        except (HTTPError, ReadTimeout, RemoteDisconnected, ChunkedEncodingError, ConnectionError):
-            if move_attempted:
+                elif u_type == "deadline":
+                    rearm_deadline(deadlines, game, upd["deadline"])
+        except (RequestException, RemoteDisconnected, StopIteration, json.JSONDecodeError) as exception:
+            if move_attempted and not isinstance(exception, StopIteration):
                 continue
+            if is_game_over(board) or game.state.get("status", "started") not in ["created", "started"]:
+                break
             if game.id not in (ongoing_game["gameId"] for ongoing_game in li.get_ongoing_games()):
                 break
-        except StopIteration:
-            break
 
+            # Resync with the game instead of restarting play_game, so the engine and board are kept.
+            reconnects += 1
+            reconnect_start = time.perf_counter()
+            logger.info(f"Game stream of {game.url()} lost ({exception.__class__.__name__}). Reconnecting.")
+            with tracer.span("reconnect"):
+                # The old stream may still be open, e.g. after a line that isn't JSON.
+                stream_reader.stop()
+                try:
+                    response, lines, game_full = reconnect_game_stream(li, game.id)
+                except BaseException:
+                    # play_game is started again with a new engine, so this one is stopped.
+                    ponder.stop()
+                    engine.quit()
+                    deadlines.cancel_all()
+                    cpu_scheduler.unregister(game.id)
+                    raise
+                stream_reader = StreamReader(response, lines, events)
+            game.state = game_full["state"]
+            first_move = True
+            prior_game = None
+            logger.info(f"Reconnected to {game.url()} in {time.perf_counter() - reconnect_start:.2f} s "
+                        f"(reconnect {reconnects}).")
+
+    deadlines.cancel_all()
+    stream_reader.stop()
+    ponder.stop()
     engine.stop()
     engine.quit()
 
+    tracer.finish()
+    if reconnects:
+        logger.info(f"Reconnected {reconnects} times to the game stream of {game.url()}.")
+
+    utilization = cpu_scheduler.utilization(game.id)
+    if utilization is not None:
+        logger.info(f"Engine utilization in {game.url()}: {utilization:.0%}")
+    cpu_scheduler.unregister(game.id)
+    strength.report()
+    ponder.report()
+
+    stats.save(board)
     try:
         print_pgn_game_record(li, config, game, board, engine)
     except Exception:
@@ -416,26 +575,78 @@ def play_game(li,
 
     if is_correspondence and not is_game_over(board):
         logger.info(f"--- Disconnecting from {game.url()}")
+        correspondence_analysis.add_position(game)
         correspondence_queue.put(game_id)
     else:
+        correspondence_analysis.remove(game_id)
         logger.info(f"--- {game.url()} Game over")
 
-    control_queue.put_nowait({"type": "local_game_done"})
+    control_queue.put_nowait({"type": "local_game_done", "game_id": game_id})
 
 
-def parse_variant(variant):
-    variant = variant.lower()
+class StreamReader:
+    """
+    Reads a game stream in a thread, so the deadlines of the game can be handled while the stream is silent.
 
-    if variant in ["standard", "from position"]:
-        return "normal"
-    elif variant == "breakthrough":
-        return "bt"
-    elif variant == "antidraughts":
-        return "losing"
-    elif variant == "frysk!":
-        return "frisian"
+    The end of the stream or an error is put in `events` as well. After `stop`, nothing is put in `events` anymore.
+    """
+    def __init__(self, response, lines, events):
+        self.response = response
+        self.lines = lines
+        self.events = events
+        self.lock = threading.Lock()
+        self.stopped = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def put(self, event):
+        with self.lock:
+            if not self.stopped:
+                self.events.put(event)
+
+    def run(self):
+        try:
+            for line in self.lines:
+                self.put(line)
+            self.put(StopIteration())
+        except Exception as exception:
+            self.put(exception)
+
+    def stop(self):
+        with self.lock:
+            self.stopped = True
+        self.response.close()
+        # A read that is blocked may only end when the next line arrives, and it is thrown away then.
+        self.thread.join(5)
+
+
+def set_deadlines(deadlines, game):
+    if game.is_abortable():
+        deadlines.set("abort", game.abort_at)
     else:
-        return variant
+        deadlines.cancel("abort")
+    deadlines.set("terminate", game.terminate_at)
+    if game.perf_name == "Correspondence":
+        deadlines.set("disconnect", game.disconnect_at)
+
+
+def rearm_deadline(deadlines, game, name):
+    # The deadline fired before it was due, e.g. because the clock of the timer wheel and time.time() differ a little.
+    at = {"abort": game.abort_at, "terminate": game.terminate_at, "disconnect": game.disconnect_at}[name]
+    if at >= time.time():
+        deadlines.set(name, at)
+
+
+@backoff.on_exception(backoff.expo, (RequestException, RemoteDisconnected, StopIteration, json.JSONDecodeError),
+                      max_time=60, giveup=is_final)
+def reconnect_game_stream(li, game_id):
+    response = li.get_game_stream(game_id)
+    lines = response.iter_lines()
+    game_full = json.loads(next(lines).decode("utf-8"))
+    if "state" not in game_full:
+        response.close()
+        raise StopIteration
+    return response, lines, game_full
 
 
 def choose_move_time(engine, board, search_time, draw_offered):
@@ -443,83 +654,85 @@ def choose_move_time(engine, board, search_time, draw_offered):
     return engine.search_for(board, search_time, draw_offered)
 
 
-def choose_first_move(engine, board, draw_offered):
+def choose_first_move(engine, board, draw_offered, first_moves):
+    move = first_moves.choose(board)
+    if move is not None:
+        logger.info(f"Playing {move.pdn_move} from the first move table")
+        return engine.process_playresult(board, draughts.engine.PlayResult(move, None, {}))
     # need to hardcode first movetime (10000 ms) since Lidraughts has 30 sec limit.
     search_time = 10000
     logger.info(f"Searching for time {search_time}")
     return engine.first_search(board, search_time, draw_offered)
 
 
-def choose_move(engine, board, game, draw_offered, start_time, move_overhead, move_overhead_inc):
+def choose_move(engine, board, game, draw_offered, start_time, move_overhead, move_overhead_inc, time_factor=1):
     pre_move_time = int((time.perf_counter_ns() - start_time) / 1e6)
     overhead = pre_move_time + move_overhead
     wb = "w" if board.whose_turn() == draughts.WHITE else "b"
     game.state[f"{wb}time"] = max(0, game.state[f"{wb}time"] - overhead)
     game.state[f"{wb}inc"] = max(0, game.state[f"{wb}inc"] - move_overhead_inc)
-    logger.info("Searching for wtime {wtime} btime {btime}".format_map(game.state))
-    return engine.search_with_ponder(board, game.state["wtime"], game.state["btime"], game.state["winc"],
-                                     game.state["binc"], False, draw_offered)
-
-
-def start_pondering(engine, board, game, can_ponder, best_move, start_time, move_overhead, move_overhead_inc):
-    if not can_ponder or best_move.ponder is None:
-        return None, None
-
-    ponder_board = board.copy()
-    for move in best_move.move.board_move:
-        ponder_board.move(move)
-    for move in best_move.ponder.board_move:
-        ponder_board.move(move)
-
-    wtime = game.state["wtime"]
-    btime = game.state["btime"]
-    winc = game.state["winc"]
-    binc = game.state["binc"]
-    setup_time = int((time.perf_counter_ns() - start_time) / 1000000)
-    if board.whose_turn() == draughts.WHITE:
-        wtime = wtime - move_overhead - setup_time + winc
-        winc = winc - move_overhead_inc
-    else:
-        btime = btime - move_overhead - setup_time + binc
-        binc = binc - move_overhead_inc
-
-    def ponder_thread_func(game, engine, board, wtime, btime, winc, binc):
-        global ponder_results
-        best_move = engine.search_with_ponder(board, wtime, btime, winc, binc, True, False)
-        ponder_results[game.id] = best_move
-
-    logger.info(f"Pondering for wtime {wtime} btime {btime}")
-    ponder_thread = threading.Thread(target=ponder_thread_func, args=(game, engine, ponder_board, wtime, btime, winc, binc))
-    ponder_thread.start()
-    return ponder_thread, best_move.ponder.li_one_move
-
-
-def get_pondering_results(ponder_thread, ponder_li_one, game, board, engine):
-    no_move = draughts.engine.PlayResult(None, None)
-    if ponder_thread is None:
-        return no_move
-
-    move_li_one = board.move_stack[-1].li_one_move
-    if ponder_li_one == move_li_one:
-        engine.ponderhit()
-        ponder_thread.join()
-        return ponder_results[game.id]
-    else:
-        engine.stop()
-        ponder_thread.join()
-        return no_move
+    times = {clock: game.state[clock] for clock in ["wtime", "btime", "winc", "binc"]}
+    if time_factor != 1:
+        # The engine is told it has less time, so it searches shorter.
+        times[f"{wb}time"] = int(times[f"{wb}time"] * time_factor)
+        times[f"{wb}inc"] = int(times[f"{wb}inc"] * time_factor)
+    logger.info("Searching for wtime {wtime} btime {btime}".format_map(times))
+    return engine.search_with_ponder(board, times["wtime"], times["btime"], times["winc"], times["binc"], False,
+                                     draw_offered)
 
 
 def check_for_draw_offer(game):
     return game.state.get(f"{game.opponent_color[0]}draw", False)
 
 
-def fake_thinking(config, board, game):
+def fake_think_time(config, board, game):
     if config.get("fake_think_time") and len(board.move_stack) > 9:
         delay = min(game.clock_initial, game.my_remaining_seconds()) * 0.015
         accel = 1 - max(0, min(100, len(board.move_stack) - 20)) / 150
-        sleep = min(5, delay * accel)
-        time.sleep(sleep)
+        return min(5, delay * accel)
+    return 0
+
+
+def wait_for_search(seconds, search):
+    if search is None:
+        time.sleep(seconds)
+    else:
+        search.join()
+    return True
+
+
+def think_at_least(engine, board, best_move, min_time, start_time, draw_offered, wait=wait_for_search):
+    """
+    `wait(seconds, search)` waits for the fake think time to pass or for the `search` thread to end, so the caller can
+    handle the events of the game meanwhile. It returns False if the game ended.
+    """
+    # The fake think time is spent searching, so the delay makes the move stronger instead of only costing time.
+    remaining = min_time - (time.perf_counter() - start_time)
+    if remaining <= 0 or best_move.move is None:
+        return best_move
+    if remaining < 0.1 or not engine.can_search_again:
+        wait(remaining, None)
+        return best_move
+    logger.info(f"Searching {remaining:.2f} s longer to fill the fake think time.")
+    results = []
+
+    def search_longer():
+        try:
+            results.append(engine.search_longer(board, remaining * 1000, draw_offered, best_move))
+        except Exception:
+            logger.exception("Searching longer failed:")
+    search = threading.Thread(target=search_longer)
+    search.start()
+    if not wait(remaining, search):
+        engine.stop()
+        search.join()
+        return results[0] if results else best_move
+    search.join()
+    # Engines that don't use the time limit, like RandomMove, return at once.
+    remaining = min_time - (time.perf_counter() - start_time)
+    if remaining > 0:
+        wait(remaining, None)
+    return results[0] if results else best_move
 
 
 def print_move_number(board):
@@ -1,10 +1,12 @@
 import requests
+import json
 from urllib.parse import urljoin
 from requests.exceptions import ConnectionError, HTTPError, ReadTimeout
 from http.client import RemoteDisconnected
 import backoff
 import logging
 import time
+from tracing import Tracer
 
 ENDPOINTS = {
     "profile": "/api/account",
@@ -17,6 +19,9 @@ ENDPOINTS = {
     "abort": "/api/bot/game/{}/abort",
     "accept": "/api/challenge/{}/accept",
     "decline": "/api/challenge/{}/decline",
+    "challenge": "/api/challenge/{}",
+    "cancel": "/api/challenge/{}/cancel",
+    "online_bots": "/api/bot/online",
     "upgrade": "/api/bot/account/upgrade",
     "resign": "/api/bot/game/{}/resign",
     "export": "/game/export/{}",
@@ -47,6 +52,7 @@ class Lidraughts:
         self.session.headers.update(self.header)
         self.set_user_agent("?")
         self.logging_level = logging_level
+        self.tracer = Tracer({})
 
     def is_final(exception):
         return isinstance(exception, HTTPError) and exception.response.status_code < 500
@@ -61,7 +67,8 @@ class Lidraughts:
     def api_get(self, path, raise_for_status=True, get_raw_text=False, params=None):
         logging.getLogger("backoff").setLevel(self.logging_level)
         url = urljoin(self.baseUrl, path)
-        response = self.session.get(url, timeout=2, params=params)
+        with self.tracer.span("api_get", path=path):
+            response = self.session.get(url, timeout=2, params=params)
         if rate_limit_check(response) or raise_for_status:
             response.raise_for_status()
         return response.text if get_raw_text else response.json()
@@ -76,7 +83,8 @@ class Lidraughts:
     def api_post(self, path, data=None, headers=None, params=None, raise_for_status=True):
         logging.getLogger("backoff").setLevel(self.logging_level)
         url = urljoin(self.baseUrl, path)
-        response = self.session.post(url, data=data, headers=headers, params=params, timeout=2)
+        with self.tracer.span("api_post", path=path):
+            response = self.session.post(url, data=data, headers=headers, params=params, timeout=2)
         if rate_limit_check(response) or raise_for_status:
             response.raise_for_status()
         return response.json()
@@ -114,6 +122,16 @@ class Lidraughts:
         return self.api_post(ENDPOINTS["decline"].format(challenge_id), data=f"reason={reason}",
                              headers={"Content-Type": "application/x-www-form-urlencoded"})
 
+    def challenge(self, username, params):
+        return self.api_post(ENDPOINTS["challenge"].format(username), data=params)
+
+    def cancel(self, challenge_id):
+        return self.api_post(ENDPOINTS["cancel"].format(challenge_id))
+
+    def get_online_bots(self):
+        online_bots = self.api_get(ENDPOINTS["online_bots"], get_raw_text=True)
+        return [json.loads(bot) for bot in online_bots.split("\n") if bot]
+
     def get_profile(self):
         profile = self.api_get(ENDPOINTS["profile"])
         self.set_user_agent(profile["username"])
@@ -0,0 +1,153 @@
+import json
+import random
+import time
+import logging
+from requests.exceptions import HTTPError, RequestException
+
+logger = logging.getLogger(__name__)
+
+
+def game_speed(base, increment):
+    # Same estimate as lidraughts: the base time plus 40 increments.
+    duration = base + 40 * increment
+    if duration < 30:
+        return "ultraBullet"
+    elif duration < 180:
+        return "bullet"
+    elif duration < 480:
+        return "blitz"
+    elif duration < 1500:
+        return "rapid"
+    return "classical"
+
+
+class Matchmaking:
+    def __init__(self, li, config, user_profile):
+        self.li = li
+        self.matchmaking_cfg = config.get("matchmaking") or {}
+        self.enabled = self.matchmaking_cfg.get("allow_matchmaking", False)
+        self.username = user_profile["username"]
+        self.idle_time = self.matchmaking_cfg.get("idle_time", 5) * 60
+        self.challenge_interval = self.matchmaking_cfg.get("challenge_interval", 2) * 60
+        self.challenge_timeout = self.matchmaking_cfg.get("challenge_timeout", 1) * 60
+        self.opponent_cooldown = self.matchmaking_cfg.get("opponent_cooldown", 60) * 60
+        self.rate_limit_pause = 30 * 60
+        self.last_game_ended_time = time.time()
+        self.last_challenge_time = 0
+        self.paused_until = 0
+        self.challenge_id = None
+        self.last_challenged = {}
+        self.games = {}
+        self.challenges_sent = 0
+        self.challenges_accepted = 0
+        self.busy_seconds = 0
+
+    def should_create_challenge(self, free_slots):
+        now = time.time()
+        return (self.enabled
+                and free_slots > 0
+                and self.challenge_id is None
+                and now > self.paused_until
+                and now > self.last_game_ended_time + self.idle_time
+                and now > self.last_challenge_time + self.challenge_interval)
+
+    def check_challenge(self, free_slots):
+        if self.challenge_id and time.time() > self.last_challenge_time + self.challenge_timeout:
+            logger.info(f"Cancelling unanswered matchmaking challenge {self.challenge_id}")
+            try:
+                self.li.cancel(self.challenge_id)
+            except RequestException:
+                pass
+            self.challenge_id = None
+
+        if self.should_create_challenge(free_slots):
+            self.challenge()
+
+    def choose_time_control(self):
+        base, increment = random.choice(self.matchmaking_cfg.get("time_controls") or ["1+1"]).split("+")
+        return int(float(base) * 60), int(increment)
+
+    def perf_name(self, variant, base, increment):
+        return game_speed(base, increment) if variant == "standard" else variant
+
+    def choose_opponent(self, variant, perf_name):
+        min_rating = self.matchmaking_cfg.get("min_rating", 0)
+        max_rating = self.matchmaking_cfg.get("max_rating", 4000)
+        now = time.time()
+
+        def is_suitable(bot):
+            name = bot.get("username", "")
+            rating = bot.get("perfs", {}).get(perf_name, {}).get("rating", 1500)
+            return (name.lower() != self.username.lower()
+                    and not bot.get("disabled")
+                    and min_rating <= rating <= max_rating
+                    and now > self.last_challenged.get(name.lower(), 0) + self.opponent_cooldown)
+
+        try:
+            online_bots = self.li.get_online_bots()
+        except (RequestException, json.JSONDecodeError) as exception:
+            # The next check tries again.
+            logger.warning(f"Could not get the online bots: {exception}")
+            return None
+        bots = list(filter(is_suitable, online_bots))
+        return random.choice(bots)["username"] if bots else None
+
+    def challenge(self):
+        variant = random.choice(self.matchmaking_cfg.get("variants") or ["standard"])
+        base, increment = self.choose_time_control()
+        opponent = self.choose_opponent(variant, self.perf_name(variant, base, increment))
+        self.last_challenge_time = time.time()
+        if opponent is None:
+            logger.info("No suitable bot online to challenge.")
+            return
+
+        params = {"rated": str(self.matchmaking_cfg.get("rated", True)).lower(),
+                  "clock.limit": base,
+                  "clock.increment": increment,
+                  "variant": variant,
+                  "color": "random"}
+        logger.info(f"Challenging {opponent} to a {variant} {base // 60}+{increment} game.")
+        try:
+            response = self.li.challenge(opponent, params) or {}
+        except HTTPError as exception:
+            if exception.response.status_code == 429:
+                logger.warning("Matchmaking is rate limited. Pausing it for 30 minutes.")
+                self.paused_until = time.time() + self.rate_limit_pause
+            else:
+                logger.warning(f"Could not challenge {opponent}: {exception}")
+            self.last_challenged[opponent.lower()] = time.time()
+            return
+        except (RequestException, json.JSONDecodeError) as exception:
+            # E.g. a timeout or a lost connection. The challenge is sent again after the challenge interval.
+            logger.warning(f"Could not challenge {opponent}: {exception}")
+            return
+
+        self.last_challenged[opponent.lower()] = time.time()
+        self.challenge_id = response.get("challenge", response).get("id")
+        self.challenges_sent += 1
+
+    def is_own_challenge(self, challenge):
+        return challenge.challenger_name.lower() == self.username.lower()
+
+    def game_started(self, game_id):
+        if self.challenge_id is not None and game_id == self.challenge_id:
+            self.challenges_accepted += 1
+            self.games[game_id] = time.time()
+            self.challenge_id = None
+
+    def game_done(self, game_id):
+        self.last_game_ended_time = time.time()
+        start_time = self.games.pop(game_id, None)
+        if start_time is not None:
+            self.busy_seconds += time.time() - start_time
+            self.log_stats()
+
+    def challenge_declined(self, challenge_id):
+        if challenge_id == self.challenge_id:
+            self.challenge_id = None
+
+    def log_stats(self):
+        if not self.enabled:
+            return
+        logger.info(f"Matchmaking: {self.challenges_sent} challenges sent, {self.challenges_accepted} accepted, "
+                    f"{self.busy_seconds / 3600:.2f} hours played that would have been idle.")
@@ -0,0 +1,77 @@
+import logging
+import sqlite3
+from game_stats import connect
+
+logger = logging.getLogger(__name__)
+
+
+def history(database, opponent):
+    """The number of finished games against an account and the score of the bot in them."""
+    try:
+        connection = connect(database)
+        results = [row[0] for row in connection.execute("SELECT result FROM games WHERE opponent = ? AND "
+                                                        "result IN ('win', 'draw', 'loss')", (opponent,))]
+        connection.close()
+    except sqlite3.Error:
+        logger.exception(f"Could not read the games against {opponent}:")
+        return 0, None
+    if not results:
+        return 0, None
+    return len(results), (results.count("win") + results.count("draw") / 2) / len(results)
+
+
+class OpponentStrength:
+    """
+    Searches less and doesn't ponder against opponents that are much weaker than the bot, so that the engines of the
+    other games get the CPU.
+    """
+    def __init__(self, config, stats_config, game):
+        self.enabled = config.get("enabled", False)
+        self.rating_gap = config.get("rating_gap", 300)
+        self.time_factor = config.get("time_factor", 0.5)
+        self.min_games = config.get("min_games", 3)
+        self.min_score = config.get("min_score", 0.8)
+        self.database = stats_config.get("database")
+        self.game = game
+        self.search_time = 0
+        self.moves = 0
+        self.ponders_skipped = 0
+        self.weaker = self.enabled and game.speed != "correspondence" and self.is_weaker()
+        if self.weaker:
+            logger.info(f"{game.opponent} is much weaker. Searching with {self.time_factor:.0%} of the time "
+                        "and not pondering.")
+
+    def is_weaker(self):
+        me = self.game.me
+        opponent = self.game.opponent
+        if self.database and opponent.name:
+            # Our results against the account count more than its rating.
+            games, score = history(self.database, opponent.name)
+            if games >= self.min_games:
+                return score >= self.min_score
+        if opponent.title and opponent.title != "BOT":
+            return False
+        if opponent.provisional or opponent.rating is None or me.rating is None:
+            return False
+        return me.rating - opponent.rating >= self.rating_gap
+
+    def move_time_factor(self):
+        return self.time_factor if self.weaker else 1
+
+    def can_ponder(self, can_ponder):
+        if self.weaker and can_ponder:
+            self.ponders_skipped += 1
+            return False
+        return can_ponder
+
+    def record_search(self, seconds):
+        if self.weaker:
+            self.search_time += seconds
+            self.moves += 1
+
+    def report(self):
+        if not self.weaker or not self.moves:
+            return
+        saved = self.search_time * (1 / self.time_factor - 1)
+        logger.info(f"Against {self.game.opponent}: {self.moves} moves in {self.search_time:.1f} s of search time, "
+                    f"about {saved:.1f} s saved, {self.ponders_skipped} times not pondered.")
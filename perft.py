@@ -0,0 +1,187 @@
+"""
+Perft and move generation benchmark of pydraughts for every variant on lidraughts.
+
+Counting the positions after every sequence of moves up to a depth (perft) from the start positions checks that the
+move generation is correct, and the number of positions per second shows how fast it is. Save a run and compare a
+later one (e.g. after updating pydraughts) with it:
+python3 perft.py --depth 3 --output perft.json
+python3 perft.py --depth 3 --compare perft.json
+"""
+
+import argparse
+import draughts
+import importlib.metadata
+import json
+import logging
+import platform
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = ["standard", "frisian", "frysk!", "antidraughts", "breakthrough", "russian", "brazilian"]
+# Published perft results of the start position.
+REFERENCE = {"standard": [9, 81, 658, 4265, 27117, 167140, 1049442]}
+
+
+def perft(board, depth):
+    if depth == 0:
+        return 1
+    board_moves = board.legal_moves()[0]
+    if depth == 1:
+        return len(board_moves)
+    nodes = 0
+    for board_move in board_moves:
+        board.push(board_move)
+        nodes += perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+
+def sample_positions(board, depth, positions):
+    positions.append(board.copy())
+    if depth > 0:
+        for board_move in board.legal_moves()[0]:
+            board.push(board_move)
+            sample_positions(board, depth - 1, positions)
+            board.pop()
+    return positions
+
+
+def operations_per_second(operation, positions, seconds):
+    count = 0
+    start_time = time.perf_counter()
+    while time.perf_counter() - start_time < seconds:
+        for position in positions:
+            operation(position)
+        count += len(positions)
+    return count / (time.perf_counter() - start_time)
+
+
+def push_pop(board):
+    board.push(board.legal_moves()[0][0])
+    board.pop()
+
+
+def push_str_move_per_second(positions, seconds):
+    # The moves are made on copies, which are made outside of the measured time.
+    str_moves = [f"{board_move[0][0]:02}{board_move[0][1]:02}"
+                 for board_move in (position.legal_moves()[0][0] for position in positions)]
+    count = 0
+    elapsed = 0
+    while elapsed < seconds:
+        copies = [position.copy() for position in positions]
+        start_time = time.perf_counter()
+        for board, str_move in zip(copies, str_moves):
+            board.push_str_move(str_move)
+        elapsed += time.perf_counter() - start_time
+        count += len(copies)
+    return count / elapsed
+
+
+def benchmark_variant(variant, fen, depth, seconds):
+    board = draughts.Game(variant, fen)
+    counts = []
+    start_time = time.perf_counter()
+    for current_depth in range(1, depth + 1):
+        counts.append(perft(board, current_depth))
+    perft_time = time.perf_counter() - start_time
+    reference = REFERENCE.get(variant) if fen == "startpos" else None
+    positions = sample_positions(board, 2, [])
+
+    def legal_moves(position):
+        position.legal_moves()
+
+    def copy(position):
+        position.copy()
+
+    return {"fen": fen, "perft": counts, "correct": reference[:depth] == counts if reference else None,
+            "perft_nps": sum(counts) / perft_time,
+            "legal_moves_per_second": operations_per_second(legal_moves, positions, seconds),
+            "copy_per_second": operations_per_second(copy, positions, seconds),
+            "push_pop_per_second": operations_per_second(push_pop, positions, seconds),
+            "push_str_move_per_second": push_str_move_per_second(positions, seconds)}
+
+
+def run(variants, fens, depth, seconds):
+    results = {"pydraughts": importlib.metadata.version("pydraughts"), "python": platform.python_version(),
+               "time": time.time(), "depth": depth, "variants": {}}
+    for variant in variants:
+        for fen in fens:
+            logger.info(f"{variant} {fen}")
+            results["variants"][f"{variant} {fen}"] = {"variant": variant,
+                                                       **benchmark_variant(variant, fen, depth, seconds)}
+    return results
+
+
+def compare(results, baseline):
+    """The differences in perft counts with the baseline and the speed relative to it."""
+    errors = []
+    speed = {}
+    for key, result in results["variants"].items():
+        old = baseline["variants"].get(key)
+        if old is None:
+            continue
+        depth = min(len(result["perft"]), len(old["perft"]))
+        if result["perft"][:depth] != old["perft"][:depth]:
+            errors.append(f"{key}: perft {result['perft'][:depth]} instead of {old['perft'][:depth]}")
+        speed[key] = {metric: result[metric] / old[metric] for metric in result
+                      if metric.endswith("per_second") or metric == "perft_nps"}
+    return errors, speed
+
+
+def print_results(results):
+    print(f"pydraughts {results['pydraughts']}, Python {results['python']}")
+    print(f"{'position':<32} {'perft':>24} {'perft nps':>10} {'legal_moves/s':>14} {'copy/s':>9} {'push+pop/s':>11} "
+          f"{'push_str_move/s':>16}")
+    for key, result in results["variants"].items():
+        counts = " ".join(map(str, result["perft"]))
+        flag = {True: " ok", False: " WRONG", None: ""}[result["correct"]]
+        print(f"{key[:32]:<32} {counts + flag:>24} {result['perft_nps']:>10.0f} {result['legal_moves_per_second']:>14.0f} "
+              f"{result['copy_per_second']:>9.0f} {result['push_pop_per_second']:>11.0f} "
+              f"{result['push_str_move_per_second']:>16.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perft and move generation benchmark of every variant")
+    parser.add_argument("--variants", nargs="+", default=VARIANTS, help="Variants as named on lidraughts.")
+    parser.add_argument("--fens", help="File with one position (FEN) per line, used for every variant. "
+                                       "Defaults to the start positions.")
+    parser.add_argument("--depth", type=int, default=3, help="Depth of the perft.")
+    parser.add_argument("--seconds", type=float, default=0.5, help="Seconds to measure every operation for.")
+    parser.add_argument("--output", help="Save the results to this JSON file.")
+    parser.add_argument("--compare", help="Compare with the results in this JSON file.")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    fens = ["startpos"]
+    if args.fens:
+        with open(args.fens) as fens_file:
+            fens = [line.strip() for line in fens_file if line.strip() and not line.startswith("#")]
+    results = run([variant.lower() for variant in args.variants], fens, args.depth, args.seconds)
+    errors = [f"{key}: perft {result['perft']} is wrong" for key, result in results["variants"].items()
+              if result["correct"] is False]
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            compare_errors, results["compared_with"] = compare(results, json.load(baseline_file))
+        errors += compare_errors
+    results["errors"] = errors
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
+        for key, speed in results.get("compared_with", {}).items():
+            print(f"{key}: " + ", ".join(f"{metric} {ratio:.0%}" for metric, ratio in speed.items()) + " of the baseline")
+        for error in errors:
+            print(f"ERROR: {error}")
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import draughts
+import draughts.engine
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PonderManager:
+    """
+    Ponders in one game: the engine searches the position after the reply it expects while the opponent thinks.
+
+    On a miss the ponder search is only stopped. The engine isn't restarted or told that a new game started, so its hash
+    table keeps the positions it searched and the search of the actual position can use them.
+    """
+    def __init__(self, engine, game):
+        self.engine = engine
+        self.game = game
+        self.thread = None
+        self.result = None
+        self.expected_li_one = None
+        self.start_time = None
+        self.end_time = None
+        self.hits = 0
+        self.misses = 0
+        self.ponder_time = 0
+        self.time_saved = 0
+
+    def start(self, board, best_move, can_ponder, start_time, move_overhead, move_overhead_inc):
+        if not can_ponder or best_move.ponder is None:
+            return
+
+        ponder_board = board.copy()
+        for move in best_move.move.board_move:
+            ponder_board.move(move)
+        for move in best_move.ponder.board_move:
+            ponder_board.move(move)
+
+        wtime = self.game.state["wtime"]
+        btime = self.game.state["btime"]
+        winc = self.game.state["winc"]
+        binc = self.game.state["binc"]
+        setup_time = int((time.perf_counter_ns() - start_time) / 1000000)
+        if board.whose_turn() == draughts.WHITE:
+            wtime = wtime - move_overhead - setup_time + winc
+            winc = winc - move_overhead_inc
+        else:
+            btime = btime - move_overhead - setup_time + binc
+            binc = binc - move_overhead_inc
+
+        logger.info(f"Pondering for wtime {wtime} btime {btime}")
+        self.result = None
+        self.expected_li_one = best_move.ponder.li_one_move
+        self.start_time = time.perf_counter()
+        self.end_time = None
+        self.thread = threading.Thread(target=self.search, args=(ponder_board, wtime, btime, winc, binc))
+        self.thread.start()
+
+    def search(self, board, wtime, btime, winc, binc):
+        try:
+            self.result = self.engine.search_with_ponder(board, wtime, btime, winc, binc, True, False)
+        except Exception:
+            logger.exception(f"Pondering failed in {self.game.url()}:")
+        finally:
+            self.end_time = time.perf_counter()
+
+    def finish(self, board):
+        """
+        The result of the ponder search and whether the opponent played the expected move ("hit", "miss" or None if the
+        engine didn't ponder). The result has no move unless it is a hit.
+        """
+        no_move = draughts.engine.PlayResult(None, None)
+        if self.thread is None:
+            return no_move, None
+
+        hit = self.expected_li_one == board.move_stack[-1].li_one_move
+        # Engines that can't ponder return at once, so only the time until the search returned counts.
+        pondered = (self.end_time or time.perf_counter()) - self.start_time
+        if hit:
+            self.engine.ponderhit()
+        else:
+            self.engine.stop()
+        result = self.join()
+        self.ponder_time += pondered
+        if hit:
+            self.hits += 1
+            if result is not None and result.move is not None:
+                # The engine had searched the position for this long before the opponent moved.
+                self.time_saved += pondered
+                return result, "hit"
+            return no_move, "hit"
+        self.misses += 1
+        return no_move, "miss"
+
+    def join(self):
+        self.thread.join()
+        self.thread = None
+        result = self.result
+        self.result = None
+        return result
+
+    def stop(self):
+        """Stop pondering when the game ends."""
+        if self.thread is not None:
+            self.engine.stop()
+            self.join()
+
+    def report(self):
+        searches = self.hits + self.misses
+        if not searches:
+            return
+        logger.info(f"Pondering in {self.game.url()}: {self.hits} of {searches} hits ({self.hits / searches:.0%}), "
+                    f"{self.ponder_time:.1f} s pondered, about {self.time_saved:.1f} s saved.")
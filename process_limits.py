@@ -0,0 +1,92 @@
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def available_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+class CoreSlots:
+    """Hands out a dedicated set of cores to the engine of every game and takes it back when the game ends."""
+    def __init__(self, cores_per_engine):
+        cores = available_cores()
+        self.slots = []
+        if cores_per_engine:
+            slot_starts = range(0, len(cores) - cores_per_engine + 1, cores_per_engine)
+            self.slots = [cores[start:start + cores_per_engine] for start in slot_starts]
+        self.used = {}
+
+    def acquire(self, game_id):
+        free_slots = [slot for slot in self.slots if slot not in self.used.values()]
+        if not free_slots:
+            if self.slots:
+                logger.warning(f"No free cores for the engine of {game_id}. It will not be pinned.")
+            return None
+        self.used[game_id] = free_slots[0]
+        logger.debug(f"Cores {free_slots[0]} reserved for {game_id}")
+        return free_slots[0]
+
+    def release(self, game_id):
+        cores = self.used.pop(game_id, None)
+        if cores is not None:
+            logger.debug(f"Cores {cores} released by {game_id}")
+
+
+def process_tree(pid):
+    # The engine is started through a shell, so the actual engine may be a child process.
+    pids = [pid]
+    for task in thread_ids(pid):
+        try:
+            with open(f"/proc/{pid}/task/{task}/children") as children:
+                for child in children.read().split():
+                    pids += process_tree(int(child))
+        except OSError:
+            pass
+    return pids
+
+
+def thread_ids(pid):
+    try:
+        return [int(task) for task in os.listdir(f"/proc/{pid}/task")]
+    except OSError:
+        return [pid]
+
+
+def limit_process(pid, cores=None, memory=None, nice=None):
+    """Pin all threads of a process and its children to `cores`, limit their memory (in MB) and set their nice level."""
+    for process_id in process_tree(pid):
+        if memory is not None and hasattr(resource, "prlimit"):
+            limit = int(memory) * 1024 * 1024
+            resource.prlimit(process_id, resource.RLIMIT_AS, (limit, limit))
+        for thread_id in thread_ids(process_id):
+            if cores is not None and hasattr(os, "sched_setaffinity"):
+                os.sched_setaffinity(thread_id, cores)
+            if nice is not None and hasattr(os, "setpriority"):
+                os.setpriority(os.PRIO_PROCESS, thread_id, nice)
+
+
+def limit_engine_process(engine, limits, cores):
+    memory = limits.get("memory")
+    nice = limits.get("nice")
+    if cores is None and memory is None and nice is None:
+        return
+
+    pid = engine.process_id()
+    if pid is None:
+        logger.warning("The engine doesn't run in a separate process. Its cores and memory can't be limited.")
+        return
+
+    try:
+        limit_process(pid, cores, memory, nice)
+        logger.info(f"Engine process {pid} limited to cores {cores}, memory {memory} MB, nice {nice}")
+    except (OSError, ValueError):
+        logger.exception(f"Could not limit the resources of engine process {pid}:")
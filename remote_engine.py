@@ -0,0 +1,304 @@
+"""
+Engines running on other machines.
+
+`python3 remote_engine.py --config worker.yml --port 7070` starts a worker that hosts the engine of `worker.yml`.
+A bot with `protocol: "remote"` starts the engine of every game on the least loaded worker. Messages are JSON, one per
+line. Every search sends the whole game, so a search can be repeated on another worker when a worker goes down.
+"""
+
+import argparse
+import draughts
+import draughts.engine
+import engine_wrapper
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+import yaml
+from config import check_engine
+from engine_wrapper import EngineWrapper
+from rich.logging import RichHandler
+
+logger = logging.getLogger(__name__)
+
+
+def send_message(sock, lock, message):
+    data = (json.dumps(message, default=str) + "\n").encode("utf-8")
+    with lock:
+        sock.sendall(data)
+
+
+def read_message(reader):
+    line = reader.readline()
+    if not line:
+        raise ConnectionError("The connection was closed.")
+    return json.loads(line)
+
+
+def parse_address(address):
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
+
+
+def request(address, message, timeout):
+    """Send one message to a worker on a new connection and return the reply."""
+    with socket.create_connection(parse_address(address), timeout=timeout) as sock:
+        send_message(sock, threading.Lock(), message)
+        with sock.makefile("r", encoding="utf-8") as reader:
+            return read_message(reader)
+
+
+def worker_status(address, timeout):
+    start_time = time.perf_counter()
+    try:
+        status = request(address, {"cmd": "status"}, timeout)
+    except (OSError, ValueError) as err:
+        logger.warning(f"Engine worker {address} is not available: {err}")
+        return None
+    status["latency"] = time.perf_counter() - start_time
+    return status
+
+
+def select_worker(workers, timeout, exclude=()):
+    """Return the healthy worker with the lowest load, preferring the one with the lowest latency."""
+    candidates = []
+    for address in workers:
+        if address in exclude:
+            continue
+        status = worker_status(address, timeout)
+        if status and status["engines"] < status["capacity"]:
+            candidates.append((status["engines"] / status["capacity"], status["latency"], address))
+    if not candidates:
+        raise ConnectionError(f"No engine worker of {list(workers)} can start an engine.")
+    load, latency, address = min(candidates)
+    logger.debug(f"Engine worker {address} has load {load:.2f} and latency {latency * 1000:.1f} ms.")
+    return address
+
+
+def board_message(board):
+    return {"variant": board.variant, "fen": board.initial_fen, "moves": [move.board_move for move in board.move_stack]}
+
+
+def message_board(message):
+    board = draughts.Game(message["variant"], message["fen"])
+    for move in message["moves"]:
+        board.push(move)
+    return board
+
+
+class RemoteEngine(EngineWrapper):
+    def __init__(self, remote_cfg, variant, initial_time, speed, options, draw_or_resign):
+        super().__init__(options, draw_or_resign)
+        self.workers = remote_cfg.get("workers") or []
+        self.timeout = remote_cfg.get("timeout", 5)
+        self.start_message = {"cmd": "start", "variant": variant, "initial_time": initial_time, "speed": speed}
+        self.latency = 0
+        self.failed_workers = set()
+        self.sock = None
+        self.connect()
+
+    def connect(self):
+        self.address = select_worker(self.workers, self.timeout, self.failed_workers)
+        self.sock = socket.create_connection(parse_address(self.address), timeout=self.timeout)
+        self.sock.settimeout(None)
+        self.reader = self.sock.makefile("r", encoding="utf-8")
+        self.lock = threading.Lock()
+        start_time = time.perf_counter()
+        self.send(self.start_message)
+        reply = read_message(self.reader)
+        if "error" in reply:
+            raise ConnectionError(f"Engine worker {self.address} could not start the engine: {reply['error']}")
+        self.latency = time.perf_counter() - start_time - reply["elapsed"]
+        self.engine_name = reply["name"]
+        logger.info(f"Using {self.engine_name} on engine worker {self.address} "
+                    f"(latency {self.latency * 1000:.1f} ms).")
+
+    def send(self, message):
+        send_message(self.sock, self.lock, message)
+
+    def subtract_latency(self, time_limit):
+        # The time the messages take is part of our clock, so the engine gets that much less time.
+        if time_limit.time is not None:
+            time_limit.time = max(0, time_limit.time - self.latency)
+        if time_limit.movetime is not None:
+            time_limit.movetime = max(0.01, time_limit.movetime - self.latency)
+        return time_limit
+
+    def remote_search(self, board, time_limit, ponder, draw_offered):
+        limit = {"time": time_limit.time, "inc": time_limit.inc, "movetime": time_limit.movetime,
+                 "depth": time_limit.depth, "nodes": time_limit.nodes}
+        start_time = time.perf_counter()
+        self.send({"cmd": "search", **board_message(board), "limit": limit, "ponder": ponder,
+                   "draw_offered": draw_offered})
+        reply = read_message(self.reader)
+        if "error" in reply:
+            raise RuntimeError(f"Engine worker {self.address}: {reply['error']}")
+        if not ponder:
+            # A weighted average, so one slow message doesn't take time from every following move.
+            self.latency = 0.7 * self.latency + 0.3 * max(0, time.perf_counter() - start_time - reply["elapsed"])
+        return reply
+
+    def search(self, board, time_limit, ponder, draw_offered):
+        time_limit = self.subtract_latency(self.add_go_commands(time_limit))
+        try:
+            reply = self.remote_search(board, time_limit, ponder, draw_offered)
+        except (OSError, ValueError) as err:
+            if ponder:
+                return draughts.engine.PlayResult(None, None)
+            logger.warning(f"Lost the connection to engine worker {self.address}: {err}. Searching on another worker.")
+            self.failed_workers.add(self.address)
+            self.close()
+            self.connect()
+            reply = self.remote_search(board, time_limit, ponder, draw_offered)
+
+        if reply["move"] is None:
+            return draughts.engine.PlayResult(None, None)
+        move = draughts.Move(board, board_move=reply["move"])
+        ponder_move = None
+        if reply["ponder"] is not None:
+            ponder_board = board.copy()
+            ponder_board.push(reply["move"])
+            ponder_move = draughts.Move(ponder_board, board_move=reply["ponder"])
+        result = draughts.engine.PlayResult(move, ponder_move, reply["info"] or {})
+        return self.process_playresult(board, result)
+
+    def name(self):
+        return self.engine_name
+
+    def stop(self):
+        self.send({"cmd": "stop"})
+
+    def ponderhit(self):
+        self.send({"cmd": "ponderhit"})
+
+    def close(self):
+        if self.sock is not None:
+            self.reader.close()
+            self.sock.close()
+            self.sock = None
+
+    def quit(self):
+        try:
+            self.send({"cmd": "quit"})
+        except OSError:
+            pass
+        self.close()
+
+    def kill_process(self):
+        self.close()
+
+
+class WorkerHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.lock = threading.Lock()
+        self.engine = None
+        self.search_thread = None
+        try:
+            message = read_message(self.rfile)
+            if message["cmd"] == "status":
+                self.reply({"engines": self.server.engines, "capacity": self.server.capacity})
+                return
+            if message["cmd"] == "start" and self.start_engine(message):
+                self.serve()
+        except (OSError, ValueError):
+            pass
+        finally:
+            if self.engine is not None:
+                self.engine.stop()
+                if self.search_thread is not None:
+                    self.search_thread.join()
+                self.engine.quit()
+                with self.server.engines_lock:
+                    self.server.engines -= 1
+                logger.info(f"Engine for {self.client_address[0]} stopped.")
+
+    def reply(self, message):
+        send_message(self.request, self.lock, message)
+
+    def start_engine(self, message):
+        with self.server.engines_lock:
+            if self.server.engines >= self.server.capacity:
+                self.reply({"error": f"All {self.server.capacity} engines are in use."})
+                return False
+            self.server.engines += 1
+        start_time = time.perf_counter()
+        try:
+            self.engine = engine_wrapper.create_engine(self.server.config, message["variant"], message["initial_time"],
+                                                       message["speed"])
+        except Exception as err:
+            with self.server.engines_lock:
+                self.server.engines -= 1
+            logger.exception("Could not start the engine:")
+            self.reply({"error": str(err)})
+            return False
+        logger.info(f"Engine for {self.client_address[0]} started ({message['variant']} {message['speed']}).")
+        self.reply({"name": self.engine.name(), "elapsed": time.perf_counter() - start_time})
+        return True
+
+    def serve(self):
+        while True:
+            message = read_message(self.rfile)
+            if message["cmd"] == "search":
+                if self.search_thread is not None:
+                    self.search_thread.join()
+                self.search_thread = threading.Thread(target=self.search, args=(message,))
+                self.search_thread.start()
+            elif message["cmd"] == "stop":
+                self.engine.stop()
+            elif message["cmd"] == "ponderhit":
+                self.engine.ponderhit()
+            elif message["cmd"] == "quit":
+                return
+
+    def search(self, message):
+        start_time = time.perf_counter()
+        try:
+            board = message_board(message)
+            result = self.engine.search(board, draughts.engine.Limit(**message["limit"]), message["ponder"],
+                                        message["draw_offered"])
+            self.reply({"move": result.move.board_move if result.move else None,
+                        "ponder": result.ponder.board_move if result.ponder else None,
+                        "info": result.info, "elapsed": time.perf_counter() - start_time})
+        except OSError:
+            pass
+        except Exception as err:
+            logger.exception("Search failed:")
+            self.reply({"error": str(err)})
+
+
+class EngineWorker(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, engine_cfg, capacity):
+        super().__init__(address, WorkerHandler)
+        # The bot decides about draws and resigning with its own settings.
+        self.config = {"engine": {**engine_cfg, "draw_or_resign": {}}}
+        self.capacity = capacity
+        self.engines = 0
+        self.engines_lock = threading.Lock()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host engines for lidraughts-bots on other machines")
+    parser.add_argument("--config", default="./config.yml", help="Configuration file of the engine.")
+    parser.add_argument("--host", default="0.0.0.0", help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=7070, help="Port to listen on.")
+    parser.add_argument("--capacity", type=int, default=os.cpu_count(), help="Maximum number of engines at once.")
+    parser.add_argument("-v", action="store_true", help="Make output more verbose.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.v else logging.INFO, handlers=[RichHandler()], format="%(message)s")
+    with open(args.config) as stream:
+        config = yaml.safe_load(stream)
+    check_engine(config["engine"], "engine")
+    with EngineWorker((args.host, args.port), config["engine"], args.capacity) as server:
+        logger.info(f"Engine worker listening on {args.host}:{args.port} for up to {args.capacity} engines.")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,9 @@ And some handy classes to extend
 import draughts
 from draughts.engine import PlayResult
 import random
-from engine_wrapper import EngineWrapper
+import threading
+import time
+from engine_wrapper import EngineWrapper, clock_budget, position_key
 
 
 class FillerEngine:
@@ -78,6 +80,131 @@ class MinimalEngine(EngineWrapper):
         pass
 
 
+class SearchStopped(Exception):
+    """Raised by `IterativeDeepeningEngine.check_stop` to abandon the depth that is being searched."""
+
+
+class IterativeDeepeningEngine(MinimalEngine):
+    """
+    Subclass this and implement `search_depth` instead of `search`
+
+    The position is searched to depth 1, 2, 3, ... until the time for the move
+    (calculated from the clock like for the other engines) is used, and the best
+    move of the deepest finished search is played. `stop` and `ponderhit` work,
+    so the engine can ponder.
+
+    `search_depth` has to call `self.check_stop()` at every node it searches.
+    """
+    moves_to_go = 30
+    max_fraction = 0.5
+    max_depth = 100
+    hash_size = 1 << 16
+
+    def __init__(self, commands, options, stderr, draw_or_resign, name=None, **popen_args):
+        super().__init__(commands, options, stderr, draw_or_resign, name, **popen_args)
+        self.stop_event = threading.Event()
+        self.ponderhit_event = threading.Event()
+        self.pondering = False
+        self.budget = None
+        self.node_limit = None
+        self.start_time = 0
+        self.nodes = 0
+        # Kept between searches, also after a ponder search that is stopped because the opponent played another move.
+        self.hash_table = {}
+
+    def search_depth(self, board, depth):
+        """
+        Search `board` `depth` plies deep.
+
+        NOTE: This method must return the best move (a board move), its score in cp
+        for the side to move and the principal variation (a list of board moves)
+        """
+        raise NotImplementedError("The search_depth method is not implemented")
+
+    def hash_move(self, board):
+        """The best move found in an earlier search of this position, or None."""
+        return self.hash_table.get(position_key(board))
+
+    def store_hash_move(self, board, board_move):
+        if len(self.hash_table) >= self.hash_size:
+            self.hash_table.clear()
+        self.hash_table[position_key(board)] = board_move
+
+    def check_stop(self):
+        """Count a node and raise SearchStopped if the search has to stop."""
+        self.nodes += 1
+        if self.should_stop():
+            raise SearchStopped()
+
+    def should_stop(self):
+        if self.stop_event.is_set():
+            return True
+        if self.pondering:
+            if not self.ponderhit_event.is_set():
+                return False
+            # The opponent played the expected move, so the time for our move starts now.
+            self.pondering = False
+            self.start_time = time.monotonic()
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            return True
+        return self.budget is not None and time.monotonic() - self.start_time >= self.budget
+
+    def enough_time_used(self):
+        # The next depth takes longer than all the depths before it together.
+        return not self.pondering and self.budget is not None and time.monotonic() - self.start_time >= self.budget / 2
+
+    def search(self, board, time_limit, ponder, draw_offered):
+        if not ponder:
+            # A search to move runs in the thread of the caller, so a stop or ponderhit sent before it is left over,
+            # e.g. from a ponder search that had already ended. A ponder search runs in its own thread and can be
+            # stopped before it starts.
+            self.stop_event.clear()
+            self.ponderhit_event.clear()
+        time_limit = self.add_go_commands(time_limit)
+        self.budget = clock_budget(time_limit, self.moves_to_go, self.max_fraction)
+        self.node_limit = time_limit.nodes
+        self.pondering = ponder
+        self.start_time = time.monotonic()
+        search_start = time.monotonic()
+        self.nodes = 0
+        legal_moves = board.legal_moves()[0]
+        best_move, score, pv, depth = legal_moves[0], 0, [legal_moves[0]], 0
+        try:
+            max_depth = min(time_limit.depth or self.max_depth, self.max_depth)
+            while len(legal_moves) > 1 and depth < max_depth and not self.should_stop():
+                try:
+                    best_move, score, pv = self.search_depth(board, depth + 1)
+                except SearchStopped:
+                    break
+                depth += 1
+                if self.enough_time_used():
+                    break
+            # A move found while pondering can only be played after `ponderhit`.
+            while self.pondering and not self.stop_event.wait(0.01):
+                self.should_stop()
+        finally:
+            self.stop_event.clear()
+            self.ponderhit_event.clear()
+            self.pondering = False
+
+        elapsed = time.monotonic() - search_start
+        pv_board = board.copy()
+        pv_moves = []
+        for board_move in pv:
+            pv_moves.append(draughts.Move(pv_board, board_move=board_move))
+            pv_board.push(board_move)
+        info = {"depth": depth, "nodes": self.nodes, "nps": round(self.nodes / max(elapsed, 1e-6)), "time": elapsed,
+                "score": {"cp": score}, "pv": f'"{" ".join(move.hub_move for move in pv_moves)}"'}
+        ponder_move = pv_moves[1] if len(pv_moves) > 1 else None
+        return self.process_playresult(board, PlayResult(draughts.Move(board, board_move=best_move), ponder_move, info))
+
+    def stop(self):
+        self.stop_event.set()
+
+    def ponderhit(self):
+        self.ponderhit_event.set()
+
+
 class ExampleEngine(MinimalEngine):
     pass
 
@@ -117,3 +244,57 @@ class FirstMovePDN(ExampleEngine):
                                                               board_move=board_move), moves))
         pdn_moves.sort(key=lambda move: move.pdn_move)
         return PlayResult(pdn_moves[0], None, {})
+
+
+class MaterialSearch(IterativeDeepeningEngine):
+    """An alpha-beta search that only counts material (a king is worth 3 men)"""
+    # Looking up the hash table costs more than it saves close to the leaves.
+    hash_depth = 2
+
+    def evaluate(self, board):
+        score = 0
+        for piece in board.board.pieces:
+            value = 300 if piece.king else 100
+            score += value if piece.player == board.whose_turn() else -value
+        return score
+
+    def negamax(self, board, depth, alpha, beta, first_move=None):
+        self.check_stop()
+        if board.is_over():
+            winner = board.get_winner()
+            return (0 if winner is None else 10000 if winner == board.whose_turn() else -10000), []
+        if depth == 0:
+            return self.evaluate(board), []
+        moves = board.legal_moves()[0]
+        if first_move is None and depth >= self.hash_depth:
+            first_move = self.hash_move(board)
+        if first_move in moves:
+            moves.remove(first_move)
+            moves.insert(0, first_move)
+        best_pv = []
+        for board_move in moves:
+            board.push(board_move)
+            try:
+                score, pv = self.negamax(board, depth - 1, -beta, -alpha)
+            finally:
+                board.pop()
+            score = -score
+            if score > alpha or not best_pv:
+                alpha = max(alpha, score)
+                best_pv = [board_move] + pv
+            if alpha >= beta:
+                break
+        if depth >= self.hash_depth:
+            self.store_hash_move(board, best_pv[0])
+        return alpha, best_pv
+
+    def search_depth(self, board, depth):
+        # The best move of the previous depth is searched first, so that alpha-beta cuts off more moves.
+        first_move = self.last_pv[0] if depth > 1 and self.last_pv else None
+        score, pv = self.negamax(board.copy(), depth, -20000, 20000, first_move)
+        self.last_pv = pv
+        return pv[0], score, pv
+
+    def search(self, board, *args):
+        self.last_pv = []
+        return super().search(board, *args)
@@ -106,6 +106,9 @@ class GameStream:
                 new_game_state["status"] = "started"
                 yield json.dumps(new_game_state).encode("utf-8")
 
+    def close(self):
+        pass
+
 
 class EventStream:
     def __init__(self, sent_game=False):
@@ -178,8 +181,13 @@ class Lidraughts:
 
     def make_move(self, game_id, move):
         self.moves.append(move)
-        with open("./logs/states.txt") as file:
-            contents = file.read().split("\n")
+        while True:
+            with open("./logs/states.txt") as file:
+                contents = file.read().split("\n")
+            # The test may be writing the clocks, so the file can be empty for a moment.
+            if len(contents) > 1:
+                break
+            time.sleep(0.001)
         for move_part in move.move.li_api_move:
             contents[0] += f" {move_part}"
         with open("./logs/states.txt", "w") as file:
@@ -0,0 +1,58 @@
+import json
+import os
+import sys
+import yaml
+import analyse
+from config import engine_profile_config
+if __name__ == "__main__":
+    sys.exit(f"The script {os.path.basename(__file__)} should only be run by pytest.")
+
+GAMES = """[Event "Test"]
+[White "bot"]
+[Black "opponent"]
+[Result "*"]
+[GameType "20"]
+
+1. 32-28 19-23 2. 28x19 14x23 3. 37-32 10-14 *
+
+[Event "Test"]
+[White "opponent"]
+[Black "bot"]
+[Result "*"]
+[GameType "20"]
+
+1. 31-27 17-21 2. 33-28 *
+"""
+
+
+def test_resume(tmp_path):
+    with open("./config.yml.default") as file:
+        config = yaml.safe_load(file)
+    config["engine"]["protocol"] = "homemade"
+    config["engine"]["name"] = "RandomMove"
+    engine_cfg = engine_profile_config(config["engine"], None)
+    pdn_file = str(tmp_path / "games.pdn")
+    with open(pdn_file, "w") as file:
+        file.write(GAMES)
+    output_file = str(tmp_path / "analysis.jsonl")
+
+    assert analyse.analyse(engine_cfg, [pdn_file], output_file, 1, 10) == 9
+    # Stop partway, in the middle of writing the fifth result.
+    with open(output_file) as output:
+        lines = output.readlines()
+    with open(output_file, "w") as output:
+        output.writelines(lines[:4] + [lines[4][:10]])
+    assert len(analyse.read_progress(output_file)) == 4
+
+    assert analyse.analyse(engine_cfg, [tmp_path], output_file, 1, 10) == 5
+    assert analyse.analyse(engine_cfg, [tmp_path], output_file, 1, 10) == 0
+    keys = []
+    with open(output_file) as output:
+        for line in output:
+            try:
+                analysis = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            keys.append((analysis["game"], analysis["ply"]))
+            assert analysis["best"] is not None
+    assert sorted(keys) == [(0, ply) for ply in range(6)] + [(1, ply) for ply in range(3)]
@@ -11,6 +11,7 @@ import sys
 import stat
 import shutil
 import importlib
+import json
 if __name__ == "__main__":
     sys.exit(f"The script {os.path.basename(__file__)} should only be run by pytest.")
 shutil.copyfile("lidraughts.py", "correct_lidraughts.py")
@@ -67,7 +68,17 @@ lidraughts_bot.logging_configurer(logging_level, None)
 lidraughts_bot.logger.info("Downloaded engines")
 
 
-def run_bot(CONFIG, logging_level):
+def read_states():
+    # The bot may be writing its move, so the file can be empty for a moment.
+    while True:
+        with open("./logs/states.txt") as states:
+            state = states.read()
+        if "\n" in state:
+            return state
+        time.sleep(0.001)
+
+
+def run_bot(CONFIG, logging_level, opponent_command=hub_engine_path):
     lidraughts_bot.logger.info(lidraughts_bot.intro())
     li = lidraughts_bot.lidraughts.Lidraughts(CONFIG["token"], CONFIG["url"], lidraughts_bot.__version__)
 
@@ -97,7 +108,7 @@ def run_bot(CONFIG, logging_level):
                 with open("./logs/states.txt", "w") as file:
                     file.write(f"\n{wtime},{btime}")
 
-                engine = draughts.engine.HubEngine(hub_engine_path)
+                engine = draughts.engine.HubEngine(opponent_command)
                 engine.init()
 
                 while True:
@@ -118,8 +129,7 @@ def run_bot(CONFIG, logging_level):
                         for move_part in move.move.li_api_move:
                             board.push_str_move(move_part)
 
-                        with open("./logs/states.txt") as states:
-                            state = states.read().split("\n")
+                        state = read_states().split("\n")
                         for move_part in move.move.li_api_move:
                             state[0] += f" {move_part}"
                         state = "\n".join(state)
@@ -129,8 +139,7 @@ def run_bot(CONFIG, logging_level):
                     else:  # lidraughts-bot move
                         start_time = time.perf_counter_ns()
                         while True:
-                            with open("./logs/states.txt") as states:
-                                state2 = states.read()
+                            state2 = read_states()
                             time.sleep(0.001)
                             moves = state2.split("\n")[0]
                             temp_board = draughts.Game()
@@ -142,8 +151,7 @@ def run_bot(CONFIG, logging_level):
                                     moves_are_correct = False
                             if state != state2 and moves_are_correct:
                                 break
-                        with open("./logs/states.txt") as states:
-                            state2 = states.read()
+                        state2 = read_states()
                         end_time = time.perf_counter_ns()
                         if len(board.move_stack) > 1:
                             btime -= (end_time - start_time) / 1e9
@@ -155,8 +163,7 @@ def run_bot(CONFIG, logging_level):
                             board.push_str_move(move_part)
 
                     time.sleep(0.001)
-                    with open("./logs/states.txt") as states:
-                        state = states.read().split("\n")
+                    state = read_states().split("\n")
                     state[1] = f"{wtime},{btime}"
                     state = "\n".join(state)
                     with open("./logs/states.txt", "w") as file:
@@ -238,3 +245,59 @@ class Scan(ExampleEngine):
     lidraughts_bot.logger.info("Finished Testing Homemade")
     assert win == "1"
     assert os.path.isfile(os.path.join(CONFIG["pgn_directory"], "bo vs b - zzzzzzzz.pgn"))
+
+
+@pytest.mark.timeout(150, method="thread")
+def test_fake_engine():
+    if os.path.exists("logs"):
+        shutil.rmtree("logs")
+    os.mkdir("logs")
+    with open("./config.yml.default") as file:
+        CONFIG = yaml.safe_load(file)
+    CONFIG["token"] = ""
+    CONFIG["engine"]["dir"] = "./"
+    CONFIG["engine"]["name"] = "fake_engine.py"
+    CONFIG["engine"]["working_dir"] = ""
+    CONFIG["engine"]["hub_options"] = {}
+    CONFIG["engine"]["engine_options"] = {"think-time": 20}
+    CONFIG["engine"]["transcript_dir"] = "TEMP/transcripts"
+    CONFIG["pgn_directory"] = "TEMP/fake_engine_game_record"
+    run_bot(CONFIG, logging_level, [sys.executable, "fake_engine.py", "--seed=1", "--think-time=1"])
+    shutil.rmtree("logs")
+    lidraughts_bot.logger.info("Finished Testing the fake engine")
+    assert os.path.isfile(os.path.join(CONFIG["pgn_directory"], "bo vs b - zzzzzzzz.pgn"))
+
+    transcripts = os.listdir(CONFIG["engine"]["transcript_dir"])
+    assert len(transcripts) == 1
+    with open(os.path.join(CONFIG["engine"]["transcript_dir"], transcripts[0])) as file:
+        lines = [json.loads(line) for line in file]
+    sent = [line["line"] for line in lines if line["direction"] == "send"]
+    received = [line["line"] for line in lines if line["direction"] == "receive"]
+    assert sent[0] == "hub" and "init" in sent and "ready" in received and sent[-1] == "quit"
+    # Every search of the bot was answered with a move.
+    searches = [line for line in sent if line.startswith("go ")]
+    assert searches and len(searches) == len([line for line in received if line.startswith("done move=")])
+    assert [line["time"] for line in lines] == sorted(line["time"] for line in lines)
+
+
+def test_stream_reader():
+    class Response:
+        def __init__(self):
+            self.closed = threading.Event()
+
+        def iter_lines(self):
+            yield b"1"
+            self.closed.wait(5)
+            yield b"2"
+
+        def close(self):
+            self.closed.set()
+
+    events = lidraughts_bot.queue.Queue()
+    response = Response()
+    reader = lidraughts_bot.StreamReader(response, response.iter_lines(), events)
+    assert events.get(timeout=5) == b"1"
+    reader.stop()
+    assert response.closed.is_set() and not reader.thread.is_alive()
+    # Lines read after stop, and the end of the stream, don't reach the game.
+    assert events.empty()
@@ -0,0 +1,15 @@
+import os
+import sys
+import clock_simulator
+if __name__ == "__main__":
+    sys.exit(f"The script {os.path.basename(__file__)} should only be run by pytest.")
+
+
+def test_simulation_is_deterministic():
+    latency = clock_simulator.LatencyModel(80, 600)
+    samples = [{"usage": 0.2, "bot_overhead": 100}, {"usage": 0.05, "bot_overhead": 20}]
+    grid = [(0, 0, False), (3000, 500, False)]
+    results = clock_simulator.simulate(30000, 0, samples, [40], latency, grid, 20, 1)
+    assert results == clock_simulator.simulate(30000, 0, samples, [40], latency, grid, 20, 1)
+    assert results[0]["flag_probability"] >= results[1]["flag_probability"]
+    assert clock_simulator.recommend(results, 1, False)["move_overhead"] == 0
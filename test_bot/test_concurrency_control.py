@@ -0,0 +1,43 @@
+import os
+import sys
+import concurrency_control
+from concurrency_control import ConcurrencyController
+if __name__ == "__main__":
+    sys.exit(f"The script {os.path.basename(__file__)} should only be run by pytest.")
+
+
+def metrics(nps, latency=0.2):
+    return {"type": "move_metrics", "game_id": "zzzzzzzz", "nps": nps, "threads": 1, "search_time": 0.1,
+            "latency": latency}
+
+
+def test_concurrency_control(monkeypatch, tmp_path):
+    monkeypatch.setattr(concurrency_control, "load_per_core", lambda: 0.2)
+    metrics_file = tmp_path / "concurrency.jsonl"
+    controller = ConcurrencyController({"enabled": True, "min_games": 1, "raise_after": 2,
+                                        "metrics_file": str(metrics_file)}, 4)
+    assert controller.limit == 4
+    for _ in range(5):
+        controller.record(metrics(1000), 1)
+    assert controller.baseline() == 1000
+    assert controller.check(1) == 4
+
+    # The engines are slow with 4 games, so one game less.
+    for _ in range(5):
+        controller.record(metrics(500), 4)
+    assert controller.check(4) == 3
+    # Slow sending of moves is an overload too.
+    controller.record(metrics(1000, latency=2), 3)
+    assert controller.check(3) == 2
+
+    # Only raised after two good checks in a row with all games in use.
+    controller.record(metrics(950), 2)
+    assert controller.check(2) == 2
+    controller.record(metrics(950), 2)
+    assert controller.check(2) == 3
+    assert controller.check(1) == 3
+    assert len(metrics_file.read_text().splitlines()) == 6
+
+    disabled = ConcurrencyController({}, 4)
+    disabled.record(metrics(1), 4)
+    assert disabled.check(4) == 4
@@ -0,0 +1,72 @@
+import os
+import sys
+import pytest
+import yaml
+from config import engine_profile_config, load_config
+from engine_wrapper import select_engine_profile
+if __name__ == "__main__":
+    sys.exit(f"The script {os.path.basename(__file__)} should only be run by pytest.")
+
+ENGINE = {"dir": "./engines/", "name": "scan", "protocol": "hub",
+          "hub_options": {"hash": 24, "threads": 1}, "draw_or_resign": {"offer_draw_enabled": True},
+          "go_commands": ["depth 10"],
+          "profiles": {"bullet": {"hub_options": {"hash": 20}, "go_commands": ["nodes 1000"]},
+                       "correspondence": {"name": "scan_slow", "hub_options": {"threads": 4}},
+                       "empty": None},
+          "routing": [{"speeds": ["bullet", "ultraBullet"], "profile": "bullet"},
+                      {"variants": ["frisian"], "speeds": ["correspondence"], "profile": "empty"},
+                      {"speeds": ["correspondence"], "profile": "correspondence"}]}
+
+
+def test_profile_merge():
+    bullet = engine_profile_config(ENGINE, "bullet")
+    # Dictionaries are merged key by key. Other values, lists included, are replaced.
+    assert bullet["hub_options"] == {"hash": 20, "threads": 1}
+    assert bullet["go_commands"] == ["nodes 1000"]
+    assert bullet["name"] == "scan" and bullet["draw_or_resign"] == {"offer_draw_enabled": True}
+    assert "profiles" not in bullet and "routing" not in bullet
+
+    correspondence = engine_profile_config(ENGINE, "correspondence")
+    assert correspondence["name"] == "scan_slow" and correspondence["hub_options"] == {"hash": 24, "threads": 4}
+
+    base = engine_profile_config(ENGINE, None)
+    assert base == engine_profile_config(ENGINE, "empty")
+    assert base["hub_options"] == {"hash": 24, "threads": 1} and "profiles" not in base
+
+    # The result is a copy, so changing it doesn't change the config.
+    bullet["hub_options"]["hash"] = 1
+    base["go_commands"].append("movetime 5")
+    assert ENGINE["hub_options"]["hash"] == 24 and ENGINE["go_commands"] == ["depth 10"]
+    assert ENGINE["profiles"]["bullet"]["hub_options"] == {"hash": 20}
+
+
+def test_profile_selection():
+    config = {"engine": ENGINE}
+    assert select_engine_profile(config, "normal", "bullet") == "bullet"
+    assert select_engine_profile(config, "frisian", "ultraBullet") == "bullet"
+    # The first matching rule wins.
+    assert select_engine_profile(config, "frisian", "correspondence") == "empty"
+    assert select_engine_profile(config, "normal", "correspondence") == "correspondence"
+    assert select_engine_profile(config, "normal", "blitz") is None
+    assert select_engine_profile(config, "normal", None) is None
+    assert select_engine_profile({"engine": {"routing": [{"profile": "bullet"}]}}, "bt", "rapid") == "bullet"
+    assert select_engine_profile({"engine": {}}, "normal", "bullet") is None
+
+
+def test_unknown_profile(tmp_path):
+    with open("./config.yml.default") as file:
+        config = yaml.safe_load(file)
+    config["token"] = "a" * 16
+    config["engine"].update({"dir": "./", "name": "RandomMove", "protocol": "homemade", "working_dir": "",
+                             "profiles": {"bullet": {"name": "FirstMove"}},
+                             "routing": [{"speeds": ["bullet"], "profile": "blitz"}]})
+    config_file = tmp_path / "config.yml"
+    with open(config_file, "w") as file:
+        yaml.safe_dump(config, file)
+    with pytest.raises(Exception, match="unknown profile `blitz`"):
+        load_config(config_file)
+
+    config["engine"]["routing"][0]["profile"] = "bullet"
+    with open(config_file, "w") as file:
+        yaml.safe_dump(config, file)
+    assert load_config(config_file)["engine"]["profiles"] == {"bullet": {"name": "FirstMove"}}
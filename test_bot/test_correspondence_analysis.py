@@ -0,0 +1,85 @@
+import os
+import sys
+import threading
+import draughts
+import draughts.engine
+import model
+import strategies
+from correspondence_analysis import CorrespondenceAnalysis
+if __name__ == "__main__":
+    sys.exit(f"The script {os.path.basename(__file__)} should only be run by pytest.")
+
+
+class FakeManager:
+    def dict(self):
+        return {}
+
+    def Event(self):
+        return threading.Event()
+
+
+class RecordingEngine(strategies.MinimalEngine):
+    """Plays the first legal move at once and records how long it was asked to search."""
+    def __init__(self):
+        super().__init__(None, {}, None, {})
+        self.movetimes = []
+
+    def search(self, board, time_limit, ponder, draw_offered):
+        self.movetimes.append(time_limit.movetime)
+        board_move = sorted(board.legal_moves()[0])[0]
+        return draughts.engine.PlayResult(draughts.Move(board, board_move=board_move), None, {"depth": 10})
+
+
+def make_game(moves="", color="white"):
+    players = [{"name": "bot", "rating": 2000}, {"name": "opponent", "rating": 2000}]
+    white, black = players if color == "white" else players[::-1]
+    game_info = {"id": "zzzzzzzz", "speed": "correspondence", "clock": None, "variant": {"name": "Standard"},
+                 "initialFen": "startpos", "white": white, "black": black,
+                 "state": {"moves": moves, "wtime": 0, "btime": 0, "winc": 0, "binc": 0}}
+    return model.Game(game_info, "bot", "https://lidraughts.org/", 20)
+
+
+def make_analysis():
+    config = {"correspondence": {"background_analysis": True, "analysis_slice": 30, "move_time": 60}}
+    return CorrespondenceAnalysis(FakeManager(), config)
+
+
+def test_searches_get_longer():
+    analysis = make_analysis()
+    engine = RecordingEngine()
+    engines = {"normal": engine}
+    game = make_game()
+    analysis.add_position(game)
+    board = draughts.Game("standard", "startpos")
+
+    # Two slices of 30 s are not a search of 60 s.
+    analysis.analyse(engines, {}, game.id, analysis.positions[game.id])
+    assert engine.movetimes == [30]
+    assert analysis.get_move(game.id, "", board, engine) is None
+    analysis.analyse(engines, {}, game.id, analysis.positions[game.id])
+    assert engine.movetimes == [30, 60]
+    best_move = analysis.get_move(game.id, "", board, engine)
+    assert best_move.move.li_api_move == analysis.results[game.id][""]["move"]
+    analysis.analyse(engines, {}, game.id, analysis.positions[game.id])
+    assert engine.movetimes == [30, 60, 60]
+
+
+def test_opponent_turn():
+    analysis = make_analysis()
+    engine = RecordingEngine()
+    game = make_game(color="black")
+    analysis.add_position(game)
+    analysis.analyse({"normal": engine}, {}, game.id, analysis.positions[game.id])
+    # The expected reply is searched briefly, then the position after it.
+    assert engine.movetimes == [7.5, 30]
+    key, = analysis.results[game.id]
+    assert len(key.split()) == 1
+
+    # The opponent played another move, so the stored analysis is dropped.
+    board = draughts.Game("standard", "startpos")
+    other_moves = [move for move in board.legal_moves()[0] if move != sorted(board.legal_moves()[0])[0]]
+    game.state["moves"] = " ".join(draughts.Move(board, board_move=other_moves[0]).li_api_move)
+    analysis.add_position(game)
+    assert analysis.results[game.id] == {}
+    analysis.remove(game.id)
+    assert game.id not in analysis.positions and game.id not in analysis.results
@@ -0,0 +1,45 @@
+import os
+import sys
+from cpu_scheduler import CpuScheduler
+if __name__ == "__main__":
+    sys.exit(f"The script {os.path.basename(__file__)} should only be run by pytest.")
+
+
+def make_scheduler(threads, max_threads=None):
+    scheduler = CpuScheduler({}, {"enabled": True, "threads": threads, "max_threads_per_engine": max_threads})
+    for game_id, to_move, clock, low_priority in [("fast", True, 10, False), ("slow", True, 30, False),
+                                                  ("weak", True, 5, True), ("waiting_short", False, 5, False),
+                                                  ("waiting_long", False, 50, False)]:
+        scheduler.register(game_id, low_priority)
+        scheduler.update(game_id, to_move, clock)
+    return scheduler
+
+
+def test_spare_threads():
+    threads, ponder = make_scheduler(8).allocations()
+    # The three spare threads go to the engines that have to move, the least time left first. The engine playing a weak
+    # opponent and the waiting engines keep one thread.
+    assert threads == {"fast": 3, "slow": 2, "weak": 1, "waiting_short": 1, "waiting_long": 1}
+    assert ponder == {"fast": False, "slow": False, "weak": False, "waiting_short": True, "waiting_long": True}
+
+    threads, _ = make_scheduler(16, 4).allocations()
+    assert threads["fast"] == 4 and threads["slow"] == 4 and threads["weak"] == 1
+
+
+def test_pondering_needs_free_cores():
+    threads, ponder = make_scheduler(4).allocations()
+    assert set(threads.values()) == {1}
+    # Only one core is left after the engines that have to move, for the waiting engine with the least time.
+    assert ponder["waiting_short"] and not ponder["waiting_long"]
+
+
+def test_allocation():
+    scheduler = make_scheduler(8)
+    assert scheduler.allocation("fast") == (3, False)
+    assert scheduler.state["fast"]["threads"] == 3
+    scheduler.update("fast", False, 10)
+    assert scheduler.allocation("slow") == (4, False)
+    assert scheduler.allocation("fast") == (1, True)
+    scheduler.unregister("slow")
+    assert scheduler.allocation("slow") == (None, True)
+    assert CpuScheduler({}, {}).allocation("fast") == (None, True)
@@ -0,0 +1,55 @@
+import importlib
+import os
+import sys
+import time
+import draughts
+import draughts.engine
+import engine_wrapper
+import strategies
+if __name__ == "__main__":
+    sys.exit(f"The script {os.path.basename(__file__)} should only be run by pytest.")
+
+
+class SlowEngine(engine_wrapper.DeadlineEngine):
+    """Finds its move at once the first time and doesn't finish in time after that."""
+    def __init__(self):
+        super().__init__({"deadline": {"grace": 1}}, {})
+        self.delay = 0
+
+    def search(self, board, time_limit, ponder, draw_offered):
+        def search(budget):
+            time.sleep(self.delay)
+            board_move = sorted(board.legal_moves()[0])[-1]
+            return draughts.engine.PlayResult(draughts.Move(board, board_move=board_move), None, {"score": {"cp": 5}})
+        return self.search_with_deadline(board, time_limit, search)
+
+
+def test_search_longer_keeps_move():
+    engine = SlowEngine()
+    board = draughts.Game("standard")
+    result = engine.search_for(board, 1000, False)
+    engine.delay = 1
+    # The search again misses its deadline, so the move found before is played instead of a fallback move.
+    assert engine.search_longer(board, 200, False, result) is result
+    assert engine.overruns == 0
+    assert len(engine.move_commentary) == 1 and engine.scores == [{"cp": 5}]
+
+
+def test_think_at_least_homemade_engine():
+    lidraughts_bot = importlib.import_module("lidraughts-bot")
+    engine = strategies.RandomMove(None, {}, None, {})
+    board = draughts.Game("standard")
+    start_time = time.perf_counter()
+    best_move = engine.search_for(board, 1000, False)
+    assert engine.search_longer(board, 100, False, best_move).move is not None
+    searches = []
+
+    def wait(seconds, search):
+        searches.append(search)
+        return lidraughts_bot.wait_for_search(seconds, search)
+    # RandomMove returns a bare PlayResult, so neither search adds commentary to drop.
+    best_move = lidraughts_bot.think_at_least(engine, board, best_move, 0.5, start_time, False, wait)
+    assert best_move.move is not None
+    assert time.perf_counter() - start_time >= 0.5
+    assert searches[0] is not None
+    assert engine.move_commentary == [] and engine.scores == []
@@ -0,0 +1,38 @@
+import glob
+import os
+import sys
+import yaml
+import draughts
+import engine_wrapper
+if __name__ == "__main__":
+    sys.exit(f"The script {os.path.basename(__file__)} should only be run by pytest.")
+
+
+def play_moves(CONFIG, moves):
+    engine = engine_wrapper.create_engine(CONFIG, "normal", 60)
+    board = draughts.Game("standard")
+    played = []
+    try:
+        for _ in range(moves):
+            result = engine.search_with_ponder(board, 60000, 60000, 0, 0, False, False)
+            played.append(result.move.hub_move)
+            board.push(result.move.board_move)
+    finally:
+        engine.quit()
+    return played
+
+
+def test_record_and_replay(tmp_path):
+    with open("./config.yml.default") as file:
+        CONFIG = yaml.safe_load(file)
+    CONFIG["engine"].update({"dir": "./", "working_dir": "", "name": "fake_engine.py", "engine_argument": "hub",
+                             "hub_options": {}, "engine_options": {"think-time": 20, "seed": 1},
+                             "transcript_dir": str(tmp_path)})
+    recorded = play_moves(CONFIG, 4)
+    transcripts = glob.glob(str(tmp_path / "hub-*.jsonl"))
+    assert len(transcripts) == 1
+
+    # Another seed would play other moves, so these are the recorded ones.
+    CONFIG["engine"].update({"engine_options": {"think-time": 20, "seed": 2, "transcripts": transcripts[0]},
+                             "transcript_dir": None})
+    assert play_moves(CONFIG, 4) == recorded
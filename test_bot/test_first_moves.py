@@ -0,0 +1,25 @@
+import os
+import sys
+import yaml
+import draughts
+import first_moves
+if __name__ == "__main__":
+    sys.exit(f"The script {os.path.basename(__file__)} should only be run by pytest.")
+
+
+def test_build_and_choose():
+    with open("./config.yml.default") as file:
+        CONFIG = yaml.safe_load(file)
+    CONFIG["engine"]["protocol"] = "homemade"
+    CONFIG["engine"]["name"] = "FirstMovePDN"
+    table = first_moves.build_table(CONFIG["engine"], [("standard", "startpos")], 10, 30, 15, {})
+    assert len(table) == 10
+
+    first_move_table = first_moves.FirstMoveTable(None)
+    first_move_table.table = table
+    board = draughts.Game("standard")
+    for _ in range(2):
+        move = first_move_table.choose(board)
+        assert move.board_move in board.legal_moves()[0]
+        board.push(move.board_move)
+    assert first_move_table.choose(board) is None
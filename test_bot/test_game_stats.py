@@ -0,0 +1,33 @@
+import os
+import sys
+import draughts
+import game_stats
+import model
+if __name__ == "__main__":
+    sys.exit(f"The script {os.path.basename(__file__)} should only be run by pytest.")
+
+
+def test_save_and_summarize(tmp_path):
+    database = str(tmp_path / "stats.sqlite")
+    game_info = {"id": "zzzzzzzz", "speed": "bullet", "clock": {"initial": 60000, "increment": 1000},
+                 "perf": {"name": "Bullet"}, "variant": {"name": "Standard"}, "initialFen": "startpos",
+                 "white": {"name": "bo"}, "black": {"name": "opponent", "rating": 1500},
+                 "state": {"moves": "", "wtime": 60000, "btime": 60000, "winc": 1000, "binc": 1000, "status": "started"}}
+    game = model.Game(game_info, "bo", "https://lidraughts.org/", 20)
+    stats = game_stats.GameStats({"database": database}, game)
+    board = draughts.Game()
+    stats.record_move(0, 60000, 1.5, 1.6, {"depth": 10, "nps": 100000, "score": {"cp": 20}}, None, None, 2)
+    board.push_str_move("3228")
+    game.state = {**game.state, "moves": "3228", "wtime": 59400}
+    stats.update_clock()
+    stats.record_move(2, 58000, 50.0, 50.1, {"depth": 4}, "miss", None, 2)
+    game.state = {**game.state, "wtime": 0, "status": "outoftime", "winner": "black"}
+    stats.save(board)
+
+    connection = game_stats.connect(database)
+    assert connection.execute("SELECT clock_after FROM moves ORDER BY ply").fetchall() == [(59400,), (0,)]
+    summary = game_stats.speed_summary(connection, "bullet", 0)
+    assert summary["games"] == summary["losses"] == summary["flags"] == 1
+    assert summary["ponder_hit_rate"] == 0
+    assert summary["nps_by_concurrency"] == {2: 100000}
+    assert len(summary["risks"]) == 3
@@ -0,0 +1,53 @@
+import io
+import os
+import sys
+import threading
+import time
+import yaml
+import draughts
+import draughts.engine
+import engine_wrapper
+from homemade_hub import HubServer
+if __name__ == "__main__":
+    sys.exit(f"The script {os.path.basename(__file__)} should only be run by pytest.")
+
+
+def test_homemade_process():
+    with open("./config.yml.default") as file:
+        CONFIG = yaml.safe_load(file)
+    CONFIG["engine"]["protocol"] = "homemade"
+    CONFIG["engine"]["name"] = "MaterialSearch"
+    CONFIG["engine"]["homemade_process"] = True
+    engine = engine_wrapper.create_engine(CONFIG, "normal", 60)
+    try:
+        assert engine.name() == "MaterialSearch"
+        assert engine.process_id() is not None
+        board = draughts.Game("standard")
+        result = engine.search_for(board, 500, False)
+        assert result.move.board_move in board.legal_moves()[0]
+        assert result.info["depth"] >= 1 and result.info["nodes"] > 0
+
+        board.push(result.move.board_move)
+        results = []
+        thread = threading.Thread(target=lambda: results.append(engine.search_with_ponder(board, 60000, 60000, 0, 0,
+                                                                                          True, False)))
+        thread.start()
+        time.sleep(0.5)
+        assert thread.is_alive()
+        engine.ponderhit()
+        thread.join(10)
+        assert not thread.is_alive() and results[0].move.board_move in board.legal_moves()[0]
+    finally:
+        engine.quit()
+
+
+def test_stop_before_go():
+    output = io.StringIO()
+    server = HubServer("MaterialSearch", output)
+    for line in ["init", "stop", "ponder-hit", "pos pos=Wbbbbbbbbbbbbbbbbbbbbeeeeeeeeeewwwwwwwwwwwwwwwwwwww",
+                 "level move-time=1", "go think"]:
+        server.handle(line)
+    server.wait_for_search()
+    # The stop sent while no search was running doesn't end this search at depth 0.
+    info = [line for line in output.getvalue().split("\n") if line.startswith("info ")]
+    assert "depth=0" not in info[0] and "depth=" in info[0]
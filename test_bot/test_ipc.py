@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+import sys
+import pytest
+from queue import Empty, Full
+from ipc import Mailbox, RingBuffer
+if __name__ == "__main__":
+    sys.exit(f"The script {os.path.basename(__file__)} should only be run by pytest.")
+
+
+def produce(channel, producer, count):
+    for number in range(count):
+        channel.put({"producer": producer, "number": number})
+
+
+def test_ring_buffer_wraparound():
+    channel = RingBuffer(64)
+    try:
+        # Every message takes 4 + 24 bytes, so they soon start at the end of the buffer and continue at its start.
+        for number in range(100):
+            message = {"number": f"{number:010}"}
+            channel.put(message)
+            assert channel.get() == message
+        assert channel.empty()
+        with pytest.raises(Empty):
+            channel.get_nowait()
+    finally:
+        channel.unlink()
+
+
+def test_ring_buffer_full():
+    channel = RingBuffer(64)
+    try:
+        channel.put("a" * 20)
+        channel.put("b" * 20)
+        with pytest.raises(Full):
+            channel.put_nowait("c" * 20)
+        with pytest.raises(Full):
+            channel.put("c" * 20, timeout=0.01)
+        with pytest.raises(ValueError):
+            channel.put("d" * 100)
+        assert channel.get() == "a" * 20
+        channel.put_nowait("c" * 20)
+        assert [channel.get(), channel.get()] == ["b" * 20, "c" * 20]
+    finally:
+        channel.unlink()
+
+
+def test_ring_buffer_producers():
+    channel = RingBuffer(1024)
+    producers = [multiprocessing.Process(target=produce, args=(channel, producer, 200)) for producer in range(4)]
+    try:
+        for process in producers:
+            process.start()
+        messages = [channel.get(timeout=10) for _ in range(800)]
+        for process in producers:
+            process.join()
+        assert channel.empty()
+        for producer in range(4):
+            # The messages of one producer keep their order.
+            numbers = [message["number"] for message in messages if message["producer"] == producer]
+            assert numbers == list(range(200))
+    finally:
+        for process in producers:
+            if process.is_alive():
+                process.terminate()
+        channel.unlink()
+
+
+def test_mailbox():
+    mailbox = Mailbox()
+    try:
+        assert mailbox.get() is None
+        assert mailbox.get([]) == []
+        mailbox.set(["bot1", "bot2"])
+        mailbox.set(["bot3"])
+        assert mailbox.get() == ["bot3"]
+        mailbox.set(0)
+        assert mailbox.get(5) == 0
+    finally:
+        mailbox.unlink()
@@ -0,0 +1,85 @@
+import os
+import sys
+import time
+import requests
+from matchmaking import Matchmaking
+if __name__ == "__main__":
+    sys.exit(f"The script {os.path.basename(__file__)} should only be run by pytest.")
+
+
+def make_bot(username, rating, disabled=False):
+    return {"username": username, "disabled": disabled, "perfs": {"blitz": {"rating": rating}}}
+
+
+class FakeLi:
+    def __init__(self, bots, error=None):
+        self.bots = bots
+        self.error = error
+        self.challenged = []
+        self.cancelled = []
+
+    def get_online_bots(self):
+        return self.bots
+
+    def challenge(self, username, params):
+        self.challenged.append(username)
+        if self.error is not None:
+            raise self.error
+        return {"challenge": {"id": f"challenge{len(self.challenged)}"}}
+
+    def cancel(self, challenge_id):
+        self.cancelled.append(challenge_id)
+        raise requests.exceptions.ConnectionError("Connection lost")
+
+
+def make_matchmaking(li, **settings):
+    config = {"matchmaking": {"allow_matchmaking": True, "idle_time": 0, "challenge_interval": 0,
+                              "time_controls": ["3+2"], **settings}}
+    matchmaking = Matchmaking(li, config, {"username": "Bot"})
+    matchmaking.last_game_ended_time = 0
+    return matchmaking
+
+
+def test_rating_filter():
+    li = FakeLi([make_bot("Bot", 1600), make_bot("Weak", 1000), make_bot("Strong", 2500), make_bot("Off", 1600, True),
+                 make_bot("Equal", 1600)])
+    matchmaking = make_matchmaking(li, min_rating=1200, max_rating=2000)
+    for _ in range(10):
+        assert matchmaking.choose_opponent("standard", "blitz") == "Equal"
+
+
+def test_opponent_cooldown():
+    li = FakeLi([make_bot("Equal", 1600)])
+    matchmaking = make_matchmaking(li, opponent_cooldown=60)
+    matchmaking.check_challenge(1)
+    assert li.challenged == ["Equal"] and matchmaking.challenge_id == "challenge1"
+
+    # The challenge isn't answered in time. Cancelling it fails, but it is forgotten anyway.
+    matchmaking.last_challenge_time -= matchmaking.challenge_timeout + 1
+    matchmaking.check_challenge(1)
+    assert li.cancelled == ["challenge1"] and li.challenged == ["Equal"]
+    assert matchmaking.challenge_id is None
+
+    matchmaking.last_challenged["equal"] -= 60 * 60 + 1
+    matchmaking.check_challenge(1)
+    assert li.challenged == ["Equal", "Equal"]
+
+
+def test_pause_after_rate_limit():
+    response = requests.Response()
+    response.status_code = 429
+    li = FakeLi([make_bot("Equal", 1600)], requests.exceptions.HTTPError(response=response))
+    matchmaking = make_matchmaking(li)
+    matchmaking.check_challenge(1)
+    assert li.challenged == ["Equal"] and matchmaking.challenge_id is None
+    assert matchmaking.paused_until > time.time() + 29 * 60
+    matchmaking.last_challenged.clear()
+    matchmaking.check_challenge(1)
+    assert li.challenged == ["Equal"]
+
+
+def test_connection_error():
+    li = FakeLi([make_bot("Equal", 1600)], requests.exceptions.ConnectionError("Connection refused"))
+    matchmaking = make_matchmaking(li)
+    matchmaking.check_challenge(1)
+    assert li.challenged == ["Equal"] and matchmaking.challenge_id is None and matchmaking.paused_until == 0
@@ -0,0 +1,34 @@
+import os
+import sys
+import model
+from game_stats import connect
+from opponent_strength import OpponentStrength
+if __name__ == "__main__":
+    sys.exit(f"The script {os.path.basename(__file__)} should only be run by pytest.")
+
+
+def make_game(opponent_rating, opponent_title=None):
+    game_info = {"id": "zzzzzzzz", "speed": "blitz", "clock": {"initial": 180000, "increment": 2000},
+                 "variant": {"name": "Standard"}, "initialFen": "startpos",
+                 "white": {"name": "bot", "rating": 2000},
+                 "black": {"name": "opponent", "rating": opponent_rating, "title": opponent_title},
+                 "state": {"moves": "", "wtime": 180000, "btime": 180000, "winc": 2000, "binc": 2000}}
+    return model.Game(game_info, "bot", "https://lidraughts.org/", 20)
+
+
+def test_opponent_strength(tmp_path):
+    config = {"enabled": True, "rating_gap": 300, "time_factor": 0.5, "min_games": 3, "min_score": 0.8}
+    assert OpponentStrength(config, {}, make_game(1500)).weaker
+    assert not OpponentStrength(config, {}, make_game(1800)).weaker
+    assert not OpponentStrength(config, {}, make_game(1500, "GM")).weaker
+    assert not OpponentStrength({**config, "enabled": False}, {}, make_game(1500)).weaker
+
+    # Losing to an account makes it a full opponent, whatever its rating.
+    database = str(tmp_path / "stats.sqlite")
+    connection = connect(database)
+    with connection:
+        connection.executemany("INSERT INTO games (game_id, opponent, result) VALUES (?, 'opponent', ?)",
+                               [("a", "win"), ("b", "loss"), ("c", "loss")])
+    connection.close()
+    strength = OpponentStrength(config, {"database": database}, make_game(1500))
+    assert not strength.weaker and strength.move_time_factor() == 1 and strength.can_ponder(True)
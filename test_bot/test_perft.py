@@ -0,0 +1,16 @@
+import os
+import sys
+import perft
+if __name__ == "__main__":
+    sys.exit(f"The script {os.path.basename(__file__)} should only be run by pytest.")
+
+
+def test_perft():
+    results = perft.run(["standard", "russian"], ["startpos"], 2, 0.01)
+    standard = results["variants"]["standard startpos"]
+    assert standard["perft"] == [9, 81] and standard["correct"]
+    assert standard["legal_moves_per_second"] > 0 and standard["push_str_move_per_second"] > 0
+
+    baseline = {"variants": {"standard startpos": {**standard, "perft": [9, 80]}}}
+    errors, speed = perft.compare(results, baseline)
+    assert len(errors) == 1 and list(speed) == ["standard startpos"]
@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+import draughts
+import draughts.engine
+import model
+import strategies
+from ponder import PonderManager
+if __name__ == "__main__":
+    sys.exit(f"The script {os.path.basename(__file__)} should only be run by pytest.")
+
+
+def make_game():
+    game_info = {"id": "zzzzzzzz", "speed": "blitz", "clock": {"initial": 60000, "increment": 0},
+                 "variant": {"name": "Standard"}, "initialFen": "startpos",
+                 "white": {"name": "bot", "rating": 2000}, "black": {"name": "opponent", "rating": 2000},
+                 "state": {"moves": "", "wtime": 60000, "btime": 60000, "winc": 0, "binc": 0}}
+    return model.Game(game_info, "bot", "https://lidraughts.org/", 20)
+
+
+def ponder_after_search(ponder, engine, board):
+    best_move = engine.search(board, draughts.engine.Limit(movetime=1), False, False)
+    assert best_move.ponder is not None
+    ponder.start(board, best_move, True, time.perf_counter_ns(), 0, 0)
+    board.push(best_move.move.board_move)
+    time.sleep(0.3)
+    return best_move
+
+
+def test_ponder_manager():
+    engine = strategies.MaterialSearch([], {}, None, {})
+    game = make_game()
+    ponder = PonderManager(engine, game)
+    board = draughts.Game("standard")
+    assert ponder.finish(board)[1] is None
+
+    best_move = ponder_after_search(ponder, engine, board)
+    board.push(best_move.ponder.board_move)
+    result, outcome = ponder.finish(board)
+    assert outcome == "hit" and result.move.board_move in board.legal_moves()[0]
+    assert ponder.time_saved >= 0.3 and ponder.thread is None
+
+    best_move = ponder_after_search(ponder, engine, board)
+    other_moves = [board_move for board_move in board.legal_moves()[0] if board_move != best_move.ponder.board_move]
+    if other_moves:
+        hash_size = len(engine.hash_table)
+        board.push(other_moves[0])
+        result, outcome = ponder.finish(board)
+        assert outcome == "miss" and result.move is None
+        # The positions searched while pondering are kept.
+        assert len(engine.hash_table) >= hash_size > 0
+    assert ponder.hits == 1 and ponder.ponder_time >= ponder.time_saved
+    ponder.stop()
+    ponder.report()
@@ -0,0 +1,47 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+import pytest
+import process_limits
+from process_limits import CoreSlots, limit_process, process_tree
+if __name__ == "__main__":
+    sys.exit(f"The script {os.path.basename(__file__)} should only be run by pytest.")
+
+
+def test_core_slots(monkeypatch):
+    monkeypatch.setattr(process_limits, "available_cores", lambda: [0, 1, 2, 3, 4])
+    core_slots = CoreSlots(2)
+    assert core_slots.acquire("game1") == [0, 1]
+    assert core_slots.acquire("game2") == [2, 3]
+    # The fifth core isn't enough for another engine.
+    assert core_slots.acquire("game3") is None
+    core_slots.release("game1")
+    core_slots.release("unknown")
+    assert core_slots.acquire("game3") == [0, 1]
+    assert CoreSlots(None).acquire("game4") is None
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_setaffinity") or not os.path.isdir("/proc"), reason="Linux only")
+def test_limit_process():
+    # The shell waits for sleep, so the engine-like process has a child.
+    shell = subprocess.Popen("sleep 10; true", shell=True)
+    try:
+        for _ in range(50):
+            pids = process_tree(shell.pid)
+            if len(pids) > 1:
+                break
+            time.sleep(0.1)
+        assert len(pids) == 2
+        core = sorted(os.sched_getaffinity(0))[0]
+        nice = os.getpriority(os.PRIO_PROCESS, shell.pid) + 1
+        limit_process(shell.pid, cores=[core], memory=512, nice=nice)
+        for pid in pids:
+            assert os.sched_getaffinity(pid) == {core}
+            assert os.getpriority(os.PRIO_PROCESS, pid) == nice
+            assert process_limits.resource.prlimit(pid, process_limits.resource.RLIMIT_AS) == (512 << 20, 512 << 20)
+    finally:
+        for pid in process_tree(shell.pid)[::-1]:
+            os.kill(pid, signal.SIGKILL)
+        shell.wait()
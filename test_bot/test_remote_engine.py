@@ -0,0 +1,43 @@
+import pytest
+import yaml
+import os
+import sys
+import threading
+import draughts
+import engine_wrapper
+import remote_engine
+if __name__ == "__main__":
+    sys.exit(f"The script {os.path.basename(__file__)} should only be run by pytest.")
+
+
+@pytest.mark.timeout(60, method="thread")
+def test_localhost_workers():
+    with open("./config.yml.default") as file:
+        CONFIG = yaml.safe_load(file)
+    CONFIG["engine"]["protocol"] = "homemade"
+    CONFIG["engine"]["name"] = "RandomMove"
+    workers = [remote_engine.EngineWorker(("127.0.0.1", 0), CONFIG["engine"], capacity) for capacity in (1, 2)]
+    for worker in workers:
+        threading.Thread(target=worker.serve_forever, daemon=True).start()
+    addresses = [f"127.0.0.1:{worker.server_address[1]}" for worker in workers]
+
+    CONFIG["engine"]["protocol"] = "remote"
+    CONFIG["engine"]["remote"] = {"workers": addresses}
+    engines = [engine_wrapper.create_engine(CONFIG, "normal", 60) for _ in range(3)]
+    assert sorted(engine.address for engine in engines) == sorted([addresses[0], addresses[1], addresses[1]])
+    with pytest.raises(ConnectionError):
+        engine_wrapper.create_engine(CONFIG, "normal", 60)
+
+    board = draughts.Game("standard")
+    for _ in range(6):
+        result = engines[0].search_with_ponder(board, 60000, 60000, 1000, 1000, False, False)
+        assert result.move.board_move in board.legal_moves()[0]
+        board.push(result.move.board_move)
+    assert engines[0].name() == "RandomMove"
+    assert engines[0].latency >= 0
+
+    for engine in engines:
+        engine.quit()
+    for worker in workers:
+        worker.shutdown()
+        worker.server_close()
@@ -0,0 +1,52 @@
+import os
+import sys
+import threading
+import time
+import draughts
+import draughts.engine
+import strategies
+if __name__ == "__main__":
+    sys.exit(f"The script {os.path.basename(__file__)} should only be run by pytest.")
+
+
+def ponder(engine, board):
+    results = []
+    thread = threading.Thread(target=lambda: results.append(engine.search(board, draughts.engine.Limit(time=60, inc=0),
+                                                                          True, False)))
+    thread.start()
+    time.sleep(0.3)
+    return thread, results
+
+
+def test_iterative_deepening():
+    engine = strategies.MaterialSearch([], {}, None, {})
+    board = draughts.Game("standard")
+    result = engine.search(board, draughts.engine.Limit(movetime=0.5), False, False)
+    assert result.move.board_move in board.legal_moves()[0]
+    assert result.info["depth"] >= 1 and result.info["nodes"] > 0 and "nps" in result.info
+    assert any(stat.startswith("ponderpv: ") for stat in engine.get_stats(for_chat=True))
+
+    # Pondering only ends with stop or ponderhit.
+    thread, results = ponder(engine, board)
+    assert thread.is_alive()
+    engine.stop()
+    thread.join(1)
+    assert not thread.is_alive() and results[0].move.board_move in board.legal_moves()[0]
+
+    thread, results = ponder(engine, board)
+    start_time = time.monotonic()
+    engine.ponderhit()
+    thread.join(5)
+    assert not thread.is_alive() and results[0].info["depth"] >= 1
+    # The time after ponderhit is the time of a normal search with this clock.
+    assert time.monotonic() - start_time < 60 / engine.moves_to_go + 0.5
+
+
+def test_stop_while_idle():
+    engine = strategies.MaterialSearch([], {}, None, {})
+    board = draughts.Game("standard")
+    # E.g. the stop at the end of a ponder search that had already returned.
+    engine.stop()
+    engine.ponderhit()
+    result = engine.search(board, draughts.engine.Limit(movetime=0.5), False, False)
+    assert result.info["depth"] >= 1
@@ -0,0 +1,41 @@
+import os
+import sys
+from timers import TimerWheel
+if __name__ == "__main__":
+    sys.exit(f"The script {os.path.basename(__file__)} should only be run by pytest.")
+
+
+def test_timer_wheel():
+    wheel = TimerWheel(tick=0.1, slots=8, now=0)
+    fired = []
+    wheel.call_later(0.25, fired.append, "soon")
+    later = wheel.call_later(2.05, fired.append, "after a full turn of the wheel")
+    cancelled = wheel.call_later(0.5, fired.append, "cancelled")
+    wheel.call_every(1, fired.append, "periodic")
+    wheel.cancel(cancelled)
+
+    wheel.advance(0.31)
+    assert fired == []
+    wheel.advance(0.41)
+    assert fired == ["soon"]
+    wheel.advance(1.11)
+    assert fired == ["soon", "periodic"]
+    wheel.advance(2.11)
+    assert fired == ["soon", "periodic", "periodic"]
+    wheel.advance(2.21)
+    assert fired == ["soon", "periodic", "periodic", "after a full turn of the wheel"]
+    wheel.cancel(later)
+    wheel.advance(3.11)
+    assert fired.count("periodic") == 3
+
+
+def test_timer_armed_mid_tick():
+    wheel = TimerWheel(tick=0.1, slots=8, now=0)
+    fired = []
+    wheel.advance(0.25)
+    # Due at 0.35, so the tick at 0.3 is too early.
+    wheel.call_later(0.1, fired.append, "due")
+    wheel.advance(0.31)
+    assert fired == []
+    wheel.advance(0.4)
+    assert fired == ["due"]
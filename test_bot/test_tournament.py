@@ -0,0 +1,45 @@
+import pytest
+import yaml
+import os
+import sys
+import tournament
+if __name__ == "__main__":
+    sys.exit(f"The script {os.path.basename(__file__)} should only be run by pytest.")
+
+
+def test_elo_and_sprt():
+    elo, elo_low, elo_high = tournament.elo_estimate(60, 20, 20)
+    assert elo_low < elo < elo_high
+    assert elo == pytest.approx(147.2, abs=0.1)
+    llr, lower_bound, upper_bound = tournament.sprt(600, 200, 200, 0, 10, 0.05, 0.05)
+    assert llr >= upper_bound
+    llr, lower_bound, upper_bound = tournament.sprt(200, 200, 600, 0, 10, 0.05, 0.05)
+    assert llr <= lower_bound
+
+
+def test_sprt_without_draws():
+    llr, lower_bound, upper_bound = tournament.sprt(600, 0, 400, 0, 10, 0.05, 0.05)
+    assert llr >= upper_bound
+    llr, lower_bound, upper_bound = tournament.sprt(0, 0, 100, 0, 10, 0.05, 0.05)
+    assert llr <= lower_bound
+    llr, lower_bound, upper_bound = tournament.sprt(100, 0, 0, -10, 0, 0.05, 0.05)
+    assert llr >= upper_bound
+    assert lower_bound < tournament.sprt(1, 0, 1, 0, 10, 0.05, 0.05)[0] < upper_bound
+
+
+@pytest.mark.timeout(150, method="thread")
+def test_homemade_match(tmp_path):
+    with open("./config.yml.default") as file:
+        CONFIG = yaml.safe_load(file)
+    CONFIG["engine"]["protocol"] = "homemade"
+    CONFIG["engine"]["name"] = "RandomMove"
+    config_file = tmp_path / "config.yml"
+    with open(config_file, "w") as file:
+        yaml.safe_dump(CONFIG, file)
+    pdn_file = tmp_path / "match.pdn"
+
+    engines = [tournament.EngineConfig(config_file), tournament.EngineConfig(config_file)]
+    wins, draws, losses = tournament.run_tournament(engines, "standard", ["startpos"], 2, 1, 60, 1, pdn_file, None)
+    assert wins + draws + losses == 2
+    with open(pdn_file) as file:
+        assert file.read().count('[Event "lidraughts-bot tournament"]') == 2
@@ -0,0 +1,73 @@
+import importlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+import pytest
+from ipc import Channels
+from tracing import NO_SPAN, Tracer, create_trace_file
+if __name__ == "__main__":
+    sys.exit(f"The script {os.path.basename(__file__)} should only be run by pytest.")
+
+
+def test_span_timing(tmp_path):
+    trace_file = str(tmp_path / "trace.json")
+    create_trace_file(trace_file)
+    tracer = Tracer({"file": trace_file}, "zzzzzzzz")
+    with tracer.span("search", move=3):
+        time.sleep(0.05)
+    with pytest.raises(ValueError):
+        with tracer.span("failed"):
+            raise ValueError
+    assert 50e6 <= tracer.durations["search"][0] < 1e9
+    assert len(tracer.durations["failed"]) == 1
+    tracer.finish()
+    assert tracer.events == []
+
+    with open(trace_file) as file:
+        assert file.readline() == "[\n"
+        events = [json.loads(line.rstrip(",\n")) for line in file]
+    assert [event["name"] for event in events] == ["search", "failed"]
+    assert events[0]["ph"] == "X" and events[0]["cat"] == "zzzzzzzz" and events[0]["dur"] >= 50000
+    assert events[0]["args"] == {"game": "zzzzzzzz", "move": 3}
+    assert events[1]["ts"] >= events[0]["ts"] + events[0]["dur"]
+
+
+def test_disabled_tracer():
+    tracer = Tracer({})
+    assert not tracer.enabled and tracer.span("search") is NO_SPAN
+    tracer.finish()
+    assert tracer.durations == {} and tracer.summary() == []
+
+
+def test_summary():
+    tracer = Tracer({"summary": True}, "zzzzzzzz")
+    for milliseconds in range(100, 0, -1):
+        tracer.add("search", 0, milliseconds * 1000000, {})
+    tracer.add("chat", 0, 500000, {})
+    # Nothing is written without a trace file.
+    assert tracer.events == []
+    assert tracer.summary() == ["chat: n=1 p50=0.50ms p90=0.50ms p99=0.50ms max=0.50ms total=0ms",
+                                "search: n=100 p50=51.00ms p90=91.00ms p99=100.00ms max=100.00ms total=5050ms"]
+
+
+def worker_state(game_id):
+    lidraughts_bot = importlib.import_module("lidraughts-bot")
+    lidraughts_bot.game_channels.control.put_nowait({"type": "local_game_done", "game_id": game_id})
+    return lidraughts_bot.game_context, lidraughts_bot.game_timers.thread.is_alive()
+
+
+def test_init_game_worker():
+    lidraughts_bot = importlib.import_module("lidraughts-bot")
+    channels = Channels()
+    context = ("li", {"username": "bot"}, {"url": "https://lidraughts.org/"}, 20, "cpu_scheduler", "analysis")
+    try:
+        # Every worker gets the channels and the context once, so a game is dispatched with only its id.
+        with multiprocessing.Pool(2, initializer=lidraughts_bot.init_game_worker, initargs=(channels, *context)) as pool:
+            results = pool.map(worker_state, ["game1", "game2", "game3"])
+        assert results == [(context, True)] * 3
+        done = sorted(channels.control.get(timeout=5)["game_id"] for _ in range(3))
+        assert done == ["game1", "game2", "game3"]
+    finally:
+        channels.unlink()
@@ -0,0 +1,116 @@
+import math
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Timer:
+    __slots__ = ("callback", "args", "interval", "slot", "rounds")
+
+    def __init__(self, callback, args, interval):
+        self.callback = callback
+        self.args = args
+        self.interval = interval
+        self.slot = None
+        self.rounds = 0
+
+
+class TimerWheel:
+    """
+    A hashed timer wheel: arming and cancelling a timer take O(1) time however many timers there are.
+
+    Timers never fire early and at most two ticks late. `start` runs the wheel in a thread, `advance` runs it by hand.
+    """
+    def __init__(self, tick=0.05, slots=512, now=None):
+        self.tick = tick
+        self.slots = [set() for _ in range(slots)]
+        self.current = 0
+        self.start_time = time.monotonic() if now is None else now
+        self.ticks = 0
+        self.next_tick_time = self.start_time + tick
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def _arm(self, timer, delay, mid_tick=True):
+        # Between ticks part of the current tick has passed already, so the delay is counted from the next tick.
+        ticks = max(1, math.ceil(delay / self.tick) + mid_tick)
+        timer.slot = (self.current + ticks) % len(self.slots)
+        timer.rounds = (ticks - 1) // len(self.slots)
+        self.slots[timer.slot].add(timer)
+
+    def call_later(self, delay, callback, *args):
+        timer = Timer(callback, args, None)
+        with self.lock:
+            self._arm(timer, delay)
+        return timer
+
+    def call_every(self, interval, callback, *args):
+        timer = Timer(callback, args, interval)
+        with self.lock:
+            self._arm(timer, interval)
+        return timer
+
+    def cancel(self, timer):
+        with self.lock:
+            if timer.slot is not None:
+                self.slots[timer.slot].discard(timer)
+                timer.slot = None
+
+    def advance(self, now=None):
+        """Fire the timers that are due at `now`."""
+        now = time.monotonic() if now is None else now
+        due = []
+        with self.lock:
+            while self.next_tick_time <= now:
+                self.ticks += 1
+                self.next_tick_time = self.start_time + (self.ticks + 1) * self.tick
+                self.current = (self.current + 1) % len(self.slots)
+                slot = self.slots[self.current]
+                for timer in list(slot):
+                    if timer.rounds > 0:
+                        timer.rounds -= 1
+                        continue
+                    slot.discard(timer)
+                    timer.slot = None
+                    due.append(timer)
+                    if timer.interval is not None:
+                        self._arm(timer, timer.interval, mid_tick=False)
+        for timer in due:
+            try:
+                timer.callback(*timer.args)
+            except Exception:
+                logger.exception("Error in timer callback:")
+
+    def run(self):
+        while True:
+            time.sleep(max(0, self.next_tick_time - time.monotonic()))
+            self.advance()
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        return self
+
+
+class Deadlines:
+    """Named deadlines of one game on a timer wheel. Setting a deadline again replaces the old one."""
+    def __init__(self, wheel, callback):
+        self.wheel = wheel
+        self.callback = callback
+        self.timers = {}
+
+    def set(self, name, at):
+        self.cancel(name)
+        self.timers[name] = self.wheel.call_later(max(0, at - time.time()), self.callback, name)
+
+    def cancel(self, name):
+        timer = self.timers.pop(name, None)
+        if timer is not None:
+            self.wheel.cancel(timer)
+
+    def cancel_all(self):
+        for name in list(self.timers):
+            self.cancel(name)
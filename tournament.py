@@ -0,0 +1,188 @@
+import argparse
+import draughts
+import draughts.engine
+import engine_wrapper
+import logging
+import math
+import multiprocessing
+import random
+import time
+import yaml
+from draughts.PDN import PDNWriter
+from config import check_engine, engine_profile_config
+from rich.logging import RichHandler
+
+logger = logging.getLogger(__name__)
+
+MAX_PLIES = 400
+
+
+class EngineConfig:
+    def __init__(self, config_file, profile=None):
+        with open(config_file) as stream:
+            config = yaml.safe_load(stream)
+        self.engine_cfg = engine_profile_config(config["engine"], profile)
+        check_engine(self.engine_cfg, f"engine in {config_file}")
+        self.name = f'{self.engine_cfg["name"]}{f" ({profile})" if profile else ""}'
+
+
+def read_openings(filename):
+    if not filename:
+        return ["startpos"]
+    with open(filename) as openings_file:
+        return [line.strip() for line in openings_file if line.strip() and not line.startswith("#")]
+
+
+def setup_board(variant, opening):
+    # An opening is either a FEN or a list of moves from the start position.
+    if opening[0] in "WB" and ":" in opening:
+        return draughts.Game(variant, opening)
+    board = draughts.Game(variant)
+    if opening != "startpos":
+        for move in opening.split():
+            board.push_str_move(move)
+    return board
+
+
+def play_game(engines, variant, opening, base_time, increment, round_number):
+    """Play one game between two engines with a real clock. Returns the score of the first engine and the PDN."""
+    engine_variant = engine_wrapper.parse_variant(variant)
+    white, black = engines if round_number % 2 == 0 else engines[::-1]
+    players = [engine_wrapper.create_engine({"engine": engine.engine_cfg}, engine_variant, base_time)
+               for engine in (white, black)]
+    board = setup_board(variant, opening)
+    clocks = [base_time * 1000, base_time * 1000]
+    increment_ms = increment * 1000
+    result = "*"
+    termination = "normal"
+    try:
+        while not board.is_over() and len(board.move_stack) < MAX_PLIES:
+            side = 0 if board.whose_turn() == draughts.WHITE else 1
+            start_time = time.perf_counter_ns()
+            best_move = players[side].search_with_ponder(board, clocks[0], clocks[1], increment_ms, increment_ms,
+                                                         False, False)
+            clocks[side] -= (time.perf_counter_ns() - start_time) / 1e6
+            if clocks[side] < 0 or best_move.move is None:
+                result = "0-2" if side == 0 else "2-0"
+                termination = "time forfeit" if clocks[side] < 0 else "no move"
+                break
+            clocks[side] += increment_ms
+            for move in best_move.move.li_api_move:
+                board.push_str_move(move)
+        else:
+            winner = board.get_winner()
+            result = "2-0" if winner == draughts.WHITE else "0-2" if winner == draughts.BLACK else "1-1"
+    finally:
+        for player in players:
+            player.quit()
+
+    pdn = PDNWriter(None, board=board, game_ending=result).pdn_text
+    tags = {"Event": "lidraughts-bot tournament", "Round": round_number + 1, "White": white.name,
+            "Black": black.name, "Result": result, "Termination": termination, "Opening": opening}
+    pdn = "".join(f'[{tag} "{value}"]\n' for tag, value in tags.items()) + pdn
+    white_score = {"2-0": 1, "1-1": 0.5, "0-2": 0}[result]
+    first_engine_score = white_score if round_number % 2 == 0 else 1 - white_score
+    logger.info(f"Game {round_number + 1} ({opening}): {white.name} - {black.name} {result}")
+    return first_engine_score, pdn
+
+
+def play_game_args(args):
+    return play_game(*args)
+
+
+def elo_difference(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+def elo_estimate(wins, draws, losses):
+    """Elo difference and 95% confidence interval from the results of the first engine."""
+    games = wins + draws + losses
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = 1.96 * math.sqrt(variance / games)
+    return elo_difference(score), elo_difference(score - margin), elo_difference(score + margin)
+
+
+def sprt(wins, draws, losses, elo0, elo1, alpha, beta):
+    """The log-likelihood ratio of the results (BayesElo model) and the lower and upper bounds to stop."""
+    lower_bound = math.log(beta / (1 - alpha))
+    upper_bound = math.log((1 - beta) / alpha)
+    # Half a game of each outcome is added to estimate the draw Elo, so that matches without draws, wins or losses
+    # can stop too.
+    games = wins + draws + losses + 1.5
+    win_rate = (wins + 0.5) / games
+    loss_rate = (losses + 0.5) / games
+    draw_elo = 200 * math.log10((1 - loss_rate) / loss_rate * (1 - win_rate) / win_rate)
+
+    def probabilities(elo):
+        win = 1 / (1 + 10 ** ((draw_elo - elo) / 400))
+        loss = 1 / (1 + 10 ** ((draw_elo + elo) / 400))
+        return win, 1 - win - loss, loss
+
+    p0 = probabilities(elo0)
+    p1 = probabilities(elo1)
+    llr = (wins * math.log(p1[0] / p0[0]) + draws * math.log(p1[1] / p0[1])
+           + losses * math.log(p1[2] / p0[2]))
+    return llr, lower_bound, upper_bound
+
+
+def run_tournament(engines, variant, openings, games, concurrency, base_time, increment, pdn_file, sprt_args):
+    rounds = [(engines, variant, openings[(number // 2) % len(openings)], base_time, increment, number)
+              for number in range(games)]
+    wins = draws = losses = 0
+    with multiprocessing.Pool(concurrency) as pool:
+        for score, pdn in pool.imap_unordered(play_game_args, rounds):
+            wins += score == 1
+            draws += score == 0.5
+            losses += score == 0
+            if pdn_file:
+                with open(pdn_file, "a") as pdn_destination:
+                    pdn_destination.write(pdn)
+
+            elo, elo_low, elo_high = elo_estimate(wins, draws, losses)
+            logger.info(f"Score of {engines[0].name} vs {engines[1].name}: {wins} - {losses} - {draws}. "
+                        f"Elo: {elo:.1f} [{elo_low:.1f}, {elo_high:.1f}]")
+            if sprt_args:
+                llr, lower_bound, upper_bound = sprt(wins, draws, losses, *sprt_args)
+                logger.info(f"SPRT: llr {llr:.2f} [{lower_bound:.2f}, {upper_bound:.2f}]")
+                if llr >= upper_bound or llr <= lower_bound:
+                    logger.info(f"SPRT stopped: H{1 if llr >= upper_bound else 0} accepted.")
+                    pool.terminate()
+                    break
+    return wins, draws, losses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a local engine-vs-engine match")
+    parser.add_argument("--config1", required=True, help="Configuration file of the first engine.")
+    parser.add_argument("--config2", help="Configuration file of the second engine (defaults to --config1).")
+    parser.add_argument("--profile1", help="Engine profile of the first engine.")
+    parser.add_argument("--profile2", help="Engine profile of the second engine.")
+    parser.add_argument("--variant", default="standard", help="Variant to play (e.g. standard, frisian, russian).")
+    parser.add_argument("--games", type=int, default=100, help="Number of games to play.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Number of games played at the same time.")
+    parser.add_argument("--tc", default="60+0.5", help="Time control as base seconds+increment seconds.")
+    parser.add_argument("--openings", help="File with one opening (FEN or moves) per line.")
+    parser.add_argument("--shuffle", action="store_true", help="Play the openings in random order.")
+    parser.add_argument("--pdn", help="Append the games to this PDN file.")
+    parser.add_argument("--sprt", nargs=4, type=float, metavar=("ELO0", "ELO1", "ALPHA", "BETA"),
+                        help="Stop early with a sequential probability ratio test.")
+    parser.add_argument("-v", action="store_true", help="Make output more verbose.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.v else logging.INFO, handlers=[RichHandler()], format="%(message)s")
+    engines = [EngineConfig(args.config1, args.profile1), EngineConfig(args.config2 or args.config1, args.profile2)]
+    openings = read_openings(args.openings)
+    if args.shuffle:
+        random.shuffle(openings)
+    base_time, increment = map(float, args.tc.split("+"))
+    wins, draws, losses = run_tournament(engines, args.variant, openings, args.games, args.concurrency, base_time,
+                                         increment, args.pdn, args.sprt)
+    if wins + draws + losses:
+        elo, elo_low, elo_high = elo_estimate(wins, draws, losses)
+        logger.info(f"Final: {wins} - {losses} - {draws}. Elo: {elo:.1f} [{elo_low:.1f}, {elo_high:.1f}]")
+
+
+if __name__ == "__main__":
+    main()
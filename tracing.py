@@ -0,0 +1,82 @@
+import contextlib
+import json
+import os
+import threading
+import time
+import logging
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+NO_SPAN = contextlib.nullcontext()
+
+
+def create_trace_file(filename):
+    # The Chrome trace format allows leaving out the closing bracket, so every process can append its events.
+    if filename:
+        with open(filename, "w") as trace_file:
+            trace_file.write("[\n")
+
+
+class Span:
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.tracer.add(self.name, self.start, time.perf_counter_ns() - self.start, self.args)
+        return False
+
+
+class Tracer:
+    """Records how long each phase of a game takes, as Chrome trace events and/or for a summary."""
+    def __init__(self, config, game_id=None):
+        self.filename = config.get("file")
+        self.print_summary = config.get("summary", False)
+        self.enabled = bool(self.filename or self.print_summary)
+        self.game_id = game_id
+        self.events = []
+        self.durations = defaultdict(list)
+
+    def span(self, name, **args):
+        if not self.enabled:
+            return NO_SPAN
+        return Span(self, name, args)
+
+    def add(self, name, start, duration, args):
+        self.durations[name].append(duration)
+        if self.filename:
+            self.events.append({"name": name, "cat": self.game_id or "bot", "ph": "X", "ts": start // 1000,
+                                "dur": duration // 1000, "pid": os.getpid(), "tid": threading.get_ident(),
+                                "args": {"game": self.game_id, **args}})
+
+    def flush(self):
+        if self.filename and self.events:
+            lines = "".join(json.dumps(event) + ",\n" for event in self.events)
+            with open(self.filename, "a") as trace_file:
+                trace_file.write(lines)
+            self.events = []
+
+    def summary(self):
+        lines = []
+        for name, durations in sorted(self.durations.items()):
+            durations = sorted(durations)
+
+            def percentile(fraction):
+                return durations[min(len(durations) - 1, int(fraction * len(durations)))] / 1e6
+            lines.append(f"{name}: n={len(durations)} p50={percentile(0.5):.2f}ms p90={percentile(0.9):.2f}ms "
+                         f"p99={percentile(0.99):.2f}ms max={durations[-1] / 1e6:.2f}ms "
+                         f"total={sum(durations) / 1e6:.0f}ms")
+        return lines
+
+    def finish(self):
+        self.flush()
+        if self.print_summary:
+            logger.info(f"Time per phase in {self.game_id}:")
+            for line in self.summary():
+                logger.info(line)